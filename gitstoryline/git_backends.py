@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Git Backends
+=========================
+Pluggable access to the git object database for the history index. A backend
+answers the handful of questions the miners ask git:
+
+    ref_tips()          commits every ref points at (what `--all` walks from)
+    head()              the commit HEAD points at, or None
+    is_rewritten(tips)  whether any recorded tip is unreachable from the refs
+    log(exclude=None)   (commit, changes) for every commit reachable from the
+                        refs but not from `exclude`, in `git log` order
+    ls_tree(rev)        (path, blob id) for every blob in a tree
+    read_blob(blob_id)  raw blob bytes, or None
+
+Commits and changes use the shapes stored by git_history_index: `changes` are
+(ordinal, status, old_path, path, old_blob, new_blob, insertions, deletions,
+display_path) tuples, rename-detected and diffed against the first parent.
+
+Backends:
+    subprocess  runs the git CLI and parses its text output (always available)
+    pygit2      reads the object database in-process, without fork/exec or
+                text parsing (needs `pip install pygit2`)
+
+Usage:
+    python git_backends.py [--repo PATH]
+
+checks that every installed backend returns identical results for a repo;
+test_git_backends.py runs the same comparison on a generated repo.
+"""
+
+import argparse
+import heapq
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from git_blob_reader import get_blob_reader
+from git_mining_state import get_ref_tips, history_was_rewritten, new_commit_revs
+from git_profiling import record_git_bytes, record_git_process
+
+try:
+    import pygit2
+except ImportError:  # Optional dependency
+    pygit2 = None
+
+EMPTY_BLOB = "0" * 40
+
+
+def iter_records(lines, separator="\x1e"):
+    """Join a stream of text lines back up and split it into `separator`-delimited records.
+
+    Only one record is held at a time, however long the stream is.
+    """
+    pending = []
+    for line in lines:
+        while separator in line:
+            head, _, line = line.partition(separator)
+            pending.append(head)
+            yield "".join(pending)
+            pending = []
+        pending.append(line)
+    yield "".join(pending)
+
+
+def parse_history(output):
+    """Parse the subprocess backend's `git log` stream into (commit, changes) pairs.
+
+    `output` is the whole text or an iterable of its lines.
+    """
+    for record in iter_records([output] if isinstance(output, str) else output):
+        parts = record.split("\x1f", 8)
+        if len(parts) < 9:
+            continue
+        commit_hash, parents, author, author_date, commit_time, commit_date, subject, message = (
+            p.strip() for p in parts[:8]
+        )
+        commit = make_commit(commit_hash, parents.split(), author, author_date,
+                             int(commit_time), commit_date, subject, message)
+
+        raw = []
+        numstat = []
+        for line in parts[8].split("\n"):
+            if line.startswith(":"):
+                meta, _, paths = line.partition("\t")
+                fields = meta.split(" ")
+                names = paths.split("\t")
+                if len(fields) < 5 or not names:
+                    continue
+                status = fields[4][:1]
+                old_path = names[0] if len(names) > 1 else None
+                raw.append((status, old_path, names[-1],
+                            None if fields[2] == EMPTY_BLOB else fields[2],
+                            None if fields[3] == EMPTY_BLOB else fields[3]))
+            elif "\t" in line:
+                ins, dels, display_path = line.split("\t", 2)
+                numstat.append((int(ins) if ins.isdigit() else None,
+                                int(dels) if dels.isdigit() else None,
+                                display_path))
+
+        # --raw and --numstat list the same file pairs in the same order
+        changes = []
+        for ordinal, (status, old_path, path, old_blob, new_blob) in enumerate(raw):
+            ins, dels, display_path = numstat[ordinal] if ordinal < len(numstat) else (None, None, path)
+            changes.append((ordinal, status, old_path, path, old_blob, new_blob, ins, dels, display_path))
+        yield commit, changes
+
+
+def make_commit(commit_hash, parents, author, author_date, commit_time, commit_date, subject, message):
+    """Build the commit record shared by all backends."""
+    return {
+        "hash": commit_hash,
+        "parents": " ".join(parents),
+        "first_parent": parents[0] if parents else None,
+        "is_merge": int(len(parents) > 1),
+        "author": author,
+        "author_date": author_date,
+        "author_day": author_date[:10],
+        "author_month": author_date[:7],
+        "commit_time": commit_time,
+        "commit_day": commit_date[:10],
+        "subject": subject,
+        "message": message,
+    }
+
+
+class SubprocessBackend:
+    """Backend that runs the git CLI, one process per query."""
+
+    name = "subprocess"
+
+    def __init__(self, repo_path):
+        self.repo_path = Path(repo_path)
+
+    def run(self, cmd):
+        """Run a git command line and return its output."""
+        result = subprocess.run(
+            cmd, cwd=self.repo_path, capture_output=True, text=True, shell=True
+        )
+        record_git_process(len(result.stdout))
+        return result.stdout
+
+    def run_lines(self, cmd):
+        """Run a git command line and yield its output line by line as git writes it."""
+        process = subprocess.Popen(
+            cmd, cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, shell=True
+        )
+        bytes_read = 0
+        try:
+            for line in process.stdout:
+                bytes_read += len(line)
+                yield line
+        finally:
+            process.stdout.close()
+            process.wait()
+            record_git_process(bytes_read)
+
+    def ref_tips(self):
+        return get_ref_tips(self.repo_path)
+
+    def head(self):
+        return self.run("git rev-parse --verify -q HEAD").strip() or None
+
+    def is_rewritten(self, tips):
+        return history_was_rewritten(self.repo_path, tips)
+
+    def log(self, exclude=None):
+        revs = new_commit_revs(exclude) if exclude else "--all"
+        cmd = (f'git log {revs} -M --raw --numstat --no-abbrev --diff-merges=first-parent '
+               '--pretty=format:"%x1e%H%x1f%P%x1f%an%x1f%ad%x1f%ct%x1f%cd%x1f%s%x1f%B%x1f" '
+               '--date=iso-strict')
+        return parse_history(self.run_lines(cmd))
+
+    def ls_tree(self, rev="HEAD"):
+        for line in self.run_lines(f"git ls-tree -r {rev}"):
+            meta, _, file_path = line.rstrip("\n").partition("\t")
+            parts = meta.split(" ")
+            if len(parts) == 3 and parts[1] == "blob":
+                yield file_path, parts[2]
+
+    def read_blob(self, blob_id):
+        return get_blob_reader(self.repo_path).read(blob_id)
+
+    def close(self):
+        pass
+
+
+# Characters git escapes in quoted paths (core.quotePath)
+C_ESCAPES = {7: "a", 8: "b", 9: "t", 10: "n", 11: "v", 12: "f", 13: "r", 34: '"', 92: "\\"}
+
+
+def quote_path(path):
+    """Quote a path the way git prints it, if it needs quoting."""
+    raw = path.encode("utf-8", "surrogateescape")
+    if not any(b < 0x20 or b >= 0x7f or b in (34, 92) for b in raw):
+        return path
+    out = []
+    for b in raw:
+        if b in C_ESCAPES:
+            out.append("\\" + C_ESCAPES[b])
+        elif b < 0x20 or b >= 0x7f:
+            out.append(f"\\{b:03o}")
+        else:
+            out.append(chr(b))
+    return '"' + "".join(out) + '"'
+
+
+def format_rename(old_path, new_path):
+    """Format a rename like `git diff --numstat` ("dir/{old => new}.js")."""
+    if quote_path(old_path) != old_path or quote_path(new_path) != new_path:
+        return f"{quote_path(old_path)} => {quote_path(new_path)}"
+
+    # Common prefix, ending with a slash
+    pfx = 0
+    i = 0
+    while i < len(old_path) and i < len(new_path) and old_path[i] == new_path[i]:
+        if old_path[i] == "/":
+            pfx = i + 1
+        i += 1
+
+    # Common suffix, starting with a slash (may share that slash with the prefix)
+    sfx = 0
+    a, b = len(old_path), len(new_path)
+    floor = pfx - (1 if pfx else 0)
+    while a >= floor and b >= floor:
+        ca = old_path[a] if a < len(old_path) else ""
+        cb = new_path[b] if b < len(new_path) else ""
+        if ca != cb:
+            break
+        if ca == "/":
+            sfx = len(old_path) - a
+        a -= 1
+        b -= 1
+
+    a_mid = old_path[pfx:max(pfx, len(old_path) - sfx)]
+    b_mid = new_path[pfx:max(pfx, len(new_path) - sfx)]
+    if pfx + sfx:
+        return f"{old_path[:pfx]}{{{a_mid} => {b_mid}}}{old_path[len(old_path) - sfx:]}"
+    return f"{a_mid} => {b_mid}"
+
+
+def format_subject(message):
+    """First paragraph of a message on one line, like `%s`."""
+    lines = []
+    for line in message.lstrip("\n").split("\n"):
+        if not line.strip():
+            break
+        lines.append(line.rstrip())
+    return " ".join(lines)
+
+
+def format_date(signature):
+    """ISO 8601 date in the signature's own timezone, like `--date=iso-strict`."""
+    tz = timezone(timedelta(minutes=signature.offset))
+    return datetime.fromtimestamp(signature.time, tz).isoformat()
+
+
+class Pygit2Backend:
+    """In-process backend reading the object database through pygit2."""
+
+    name = "pygit2"
+
+    def __init__(self, repo_path):
+        if pygit2 is None:
+            raise RuntimeError("The pygit2 backend needs pygit2 (pip install pygit2)")
+        self.repo_path = Path(repo_path)
+        self.repo = pygit2.Repository(str(self.repo_path))
+        self.find_renames = (getattr(pygit2, "GIT_DIFF_FIND_RENAMES", None)
+                             or pygit2.enums.DiffFind.FIND_RENAMES)
+
+    def _peel(self, name):
+        try:
+            return self.repo.revparse_single(name).peel(pygit2.Commit)
+        except (KeyError, ValueError, pygit2.GitError):
+            return None
+
+    def _ref_commits(self):
+        """Commits `--all` starts from: every ref in name order, then HEAD."""
+        commits = []
+        for name in [*sorted(self.repo.references), "HEAD"]:
+            commit = self._peel(name)
+            if commit is not None:
+                commits.append(commit)
+        return commits
+
+    def _ancestors(self, tips):
+        seen = set()
+        stack = []
+        for tip in tips:
+            try:
+                stack.append(pygit2.Oid(hex=tip))
+            except ValueError:
+                pass
+        while stack:
+            oid = stack.pop()
+            if oid in seen or oid not in self.repo:
+                continue
+            seen.add(oid)
+            stack.extend(self.repo[oid].parent_ids)
+        return seen
+
+    def ref_tips(self):
+        return sorted({str(commit.id) for commit in self._ref_commits()})
+
+    def head(self):
+        if self.repo.head_is_unborn:
+            return None
+        return str(self.repo.head.peel(pygit2.Commit).id)
+
+    def is_rewritten(self, tips):
+        if not tips:
+            return True
+        current = [commit.id for commit in self._ref_commits()]
+        for tip in tips:
+            try:
+                oid = pygit2.Oid(hex=tip)
+            except ValueError:
+                return True
+            if oid not in self.repo:
+                return True
+            if not any(ref == oid or self.repo.descendant_of(ref, oid) for ref in current):
+                return True
+        return False
+
+    def log(self, exclude=None):
+        # Same order as `git log`: a queue by committer date, newest first,
+        # first-in first-out among equal dates
+        hidden = self._ancestors(exclude or [])
+        seen = set()
+        seeds = []
+        for commit in self._ref_commits():
+            if commit.id not in seen:
+                seen.add(commit.id)
+                seeds.append(commit)
+        queue = [
+            (-commit.commit_time, order, commit)
+            for order, commit in enumerate(sorted(seeds, key=lambda c: -c.commit_time))
+        ]
+        counter = len(queue)
+
+        while queue:
+            _, _, commit = heapq.heappop(queue)
+            for parent_id in commit.parent_ids:
+                if parent_id not in seen:
+                    seen.add(parent_id)
+                    parent = self.repo[parent_id]
+                    heapq.heappush(queue, (-parent.commit_time, counter, parent))
+                    counter += 1
+            if commit.id in hidden:
+                continue
+
+            parents = [str(oid) for oid in commit.parent_ids]
+            message = commit.message.strip()
+            yield make_commit(
+                str(commit.id), parents, commit.author.name, format_date(commit.author),
+                commit.committer.time, format_date(commit.committer),
+                format_subject(message), message
+            ), self._changes(commit)
+
+    def _changes(self, commit):
+        if commit.parents:
+            diff = commit.parents[0].tree.diff_to_tree(commit.tree)
+        else:
+            diff = commit.tree.diff_to_tree(swap=True)
+        diff.find_similar(flags=self.find_renames)
+
+        changes = []
+        for ordinal, patch in enumerate(diff):
+            delta = patch.delta
+            status = delta.status_char()
+            old_path = quote_path(delta.old_file.path)
+            path = quote_path(delta.new_file.path)
+            old_blob = str(delta.old_file.id)
+            new_blob = str(delta.new_file.id)
+            if delta.is_binary:
+                ins = dels = None
+            else:
+                _, ins, dels = patch.line_stats
+            changes.append((
+                ordinal, status, old_path if status == "R" else None, path,
+                None if old_blob == EMPTY_BLOB else old_blob,
+                None if new_blob == EMPTY_BLOB else new_blob,
+                ins, dels,
+                format_rename(delta.old_file.path, delta.new_file.path) if status == "R" else path
+            ))
+        return changes
+
+    def ls_tree(self, rev="HEAD"):
+        commit = self._peel(rev)
+        if commit is None:
+            return
+
+        def walk(tree, prefix):
+            for entry in tree:
+                if entry.type_str == "tree":
+                    yield from walk(self.repo[entry.id], f"{prefix}{entry.name}/")
+                elif entry.type_str == "blob":
+                    yield quote_path(f"{prefix}{entry.name}"), str(entry.id)
+
+        yield from walk(commit.tree, "")
+
+    def read_blob(self, blob_id):
+        try:
+            obj = self.repo[pygit2.Oid(hex=blob_id)]
+        except (KeyError, ValueError):
+            return None
+        if obj.type_str != "blob":
+            return None
+        data = obj.data
+        record_git_bytes(len(data))
+        return data
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    "subprocess": SubprocessBackend,
+    "pygit2": Pygit2Backend,
+}
+
+
+def available_backends():
+    """Names of the backends usable in this environment."""
+    return [name for name in BACKENDS if name != "pygit2" or pygit2 is not None]
+
+
+def get_backend(name, repo_path):
+    """Create a backend by name; "auto" prefers the in-process backend when installed."""
+    if name == "auto":
+        name = "pygit2" if pygit2 is not None else "subprocess"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown git backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](repo_path)
+
+
+def snapshot(backend):
+    """Everything the miners read from a backend, for comparison."""
+    tips = backend.ref_tips()
+    head = backend.head()
+    commits = list(backend.log())
+    tree = list(backend.ls_tree("HEAD")) if head else []
+    data = {
+        "ref_tips": tips,
+        "head": head,
+        "log": commits,
+        "ls_tree": tree,
+        "blobs": {blob_id: backend.read_blob(blob_id) for _, blob_id in tree},
+        "is_rewritten": backend.is_rewritten(tips),
+    }
+    # Exercise the incremental walk from HEAD's first parent
+    if commits and head:
+        first_parent = next((c["first_parent"] for c, _ in commits if c["hash"] == head), None)
+        if first_parent:
+            data["log_since_parent"] = list(backend.log(exclude=[first_parent]))
+    return data
+
+
+def check_parity(repo_path, names=None):
+    """Compare every backend against the subprocess one. Returns a list of mismatches."""
+    names = names or available_backends()
+    reference = snapshot(SubprocessBackend(repo_path))
+    mismatches = []
+    for name in names:
+        if name == "subprocess":
+            continue
+        candidate = snapshot(get_backend(name, repo_path))
+        for key, expected in reference.items():
+            actual = candidate.get(key)
+            if actual == expected:
+                continue
+            if key.startswith("log") and actual and expected:
+                for (exp_commit, exp_changes), (act_commit, act_changes) in zip(expected, actual):
+                    if exp_commit != act_commit or exp_changes != act_changes:
+                        mismatches.append(f"{name}: {key} differs at commit {exp_commit['hash']}")
+                        break
+                else:
+                    mismatches.append(f"{name}: {key} has {len(actual)} commits, expected {len(expected)}")
+            else:
+                mismatches.append(f"{name}: {key} differs")
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that all installed git backends agree.")
+    parser.add_argument("--repo", default=str(Path(__file__).parent.parent.resolve()),
+                        help="Repository to check (default: this repository)")
+    args = parser.parse_args(argv)
+
+    names = available_backends()
+    print(f"🔌 Git backends available: {', '.join(names)}")
+    if names == ["subprocess"]:
+        print("   Nothing to compare; install pygit2 to check the in-process backend")
+        return 0
+
+    mismatches = check_parity(args.repo, names)
+    for mismatch in mismatches:
+        print(f"   ❌ {mismatch}")
+    if mismatches:
+        return 1
+    print("✅ All backends agree")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Benchmarks
+=======================
+Measures how the mining scripts scale, on synthetic repositories.
+
+    1. A generator builds local git repos with a configurable number of
+       commits, files, churn, renames, deletions and merged branches
+       (through `git fast-import`, so large repos take seconds).
+    2. Every public function of git_timeline_mining.py and git_race_mining.py
+       is timed (best of --repeat runs, against a warm history index) and
+       measured for peak Python memory (tracemalloc) and git processes.
+    3. A differential check runs both scripts from a reference revision (by
+       default HEAD's parent, or HEAD while the scripts have uncommitted
+       changes) and from the working tree against each repo and compares the
+       JSON output, so an optimized code path can be shown to produce the
+       same data.
+    4. With --memory, both scripts are also run as separate processes
+       against each repo and their peak resident memory (from --profile)
+       is recorded, with and without the git processes they start. Run it
+       over several sizes to see how memory grows with history length.
+       Both scripts peak while the commit store (every commit and change,
+       see git_commit_store.py) is loaded, so their peak grows with the
+       number of commits and changes, not with the size of their diffs.
+
+Results are saved to gitstoryline/benchmark_results/ and every run is
+compared against the previous saved result, so regressions between versions
+show up as ratios.
+
+Usage:
+    python git_benchmark.py [--sizes small medium large] [--repeat N]
+                            [--reference REV] [--no-diff] [--memory] [--keep DIR]
+    python git_benchmark.py --sizes custom --commits 3000 --files 200 --branches 8
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import git_race_mining as race
+import git_timeline_mining as timeline
+from git_churn_index import ChurnIndex, load_churn_index
+from git_commit_store import CommitStore, load_commit_store
+from git_file_lineage import FileLineage
+from git_history_index import HistoryIndex
+from git_profiling import GIT_COUNTERS
+from git_stage_executor import run_stages
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+PACKAGE_ROOT = SCRIPT_DIR.parent
+RESULTS_DIR = SCRIPT_DIR / "benchmark_results"
+MINER_SCRIPTS = ["git_timeline_mining.py", "git_race_mining.py"]
+OUTPUT_FILES = ["timeline_data.json", "race_data.json"]
+
+# Synthetic repository shapes
+#   commits    total commits, including branch commits and merges
+#   files      number of live files the history grows towards
+#   churn      lines added per file touched (up to half as many are removed)
+#   renames    chance that a commit renames a file
+#   deletions  chance that a commit deletes a file
+#   branches   feature branches forked from and merged back into main
+SIZES = {
+    "small": {"commits": 200, "files": 40, "churn": 20, "renames": 0.03, "deletions": 0.03, "branches": 2},
+    "medium": {"commits": 1000, "files": 150, "churn": 30, "renames": 0.03, "deletions": 0.03, "branches": 5},
+    "large": {"commits": 5000, "files": 400, "churn": 40, "renames": 0.02, "deletions": 0.02, "branches": 10},
+}
+
+# Where synthetic files live, so every race category and phase rule is exercised
+SYNTHETIC_DIRS = [
+    ("js/components", ".js"),
+    ("js/services", ".js"),
+    ("js/ai", ".js"),
+    ("js/engines", ".js"),
+    ("js/managers", ".js"),
+    ("js/repositories", ".js"),
+    ("js/utils", ".js"),
+    ("css", ".css"),
+    ("tests", ".test.js"),
+    ("docs", "-contract.md"),
+]
+
+COMMIT_MESSAGES = [
+    "feat: add {name}",
+    "fix: bug in {name}",
+    "refactor {name}",
+    "docs: describe {name}",
+    "planning: wire up {name}",
+    "Tech debt cleanup in {name}",
+    "compliance fixes for {name}",
+    "style: tweak {name}",
+    "chore: touch {name}",
+]
+
+AUTHORS = [
+    ("Ada Lovelace", "ada@example.com"),
+    ("Grace Hopper", "grace@example.com"),
+    ("Alan Turing", "alan@example.com"),
+    ("Edsger Dijkstra", "edsger@example.com"),
+]
+
+START_TIME = 1672531200  # 2023-01-01T00:00:00Z
+
+
+class FastImportWriter:
+    """Writes commits as a `git fast-import` stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.marks = 0
+
+    def data(self, text):
+        payload = text.encode("utf-8")
+        self.stream.write(b"data %d\n" % len(payload) + payload + b"\n")
+
+    def commit(self, branch, author, timestamp, message, parents, operations):
+        """Write one commit and return its mark. `parents` are marks, first parent first."""
+        self.marks += 1
+        name, email = author
+        self.stream.write(
+            f"commit refs/heads/{branch}\nmark :{self.marks}\n"
+            f"author {name} <{email}> {timestamp} +0000\n"
+            f"committer {name} <{email}> {timestamp} +0000\n".encode("utf-8")
+        )
+        self.data(message)
+        for i, parent in enumerate(parents):
+            self.stream.write(f"{'from' if i == 0 else 'merge'} :{parent}\n".encode("utf-8"))
+        for operation in operations:
+            if operation[0] == "M":
+                self.stream.write(f"M 100644 inline {operation[1]}\n".encode("utf-8"))
+                self.data("\n".join(operation[2]) + "\n")
+            elif operation[0] == "D":
+                self.stream.write(f"D {operation[1]}\n".encode("utf-8"))
+            else:
+                self.stream.write(f"R {operation[1]} {operation[2]}\n".encode("utf-8"))
+        return self.marks
+
+
+def generate_repo(path, commits=200, files=40, churn=20, renames=0.03, deletions=0.03,
+                  branches=2, seed=1):
+    """Build a synthetic git repository at `path` and check out main.
+
+    The history is deterministic for a given seed. index.html grows to a few
+    thousand lines and is then cut down, js/main.js is touched throughout,
+    and each branch adds its own components before being merged with --no-ff.
+    """
+    path = Path(path)
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+    subprocess.run(["git", "init", "-q", "-b", "main"], cwd=path, check=True)
+
+    rnd = random.Random(seed)
+    tree = {}  # path -> lines on main
+    serial = 0
+    timestamp = START_TIME
+
+    def new_lines(name, count):
+        nonlocal serial
+        serial += count
+        return [f"// {name} line {n}" for n in range(serial - count, serial)]
+
+    def new_path(index):
+        directory, suffix = rnd.choice(SYNTHETIC_DIRS)
+        return f"{directory}/File{index}{suffix}"
+
+    def edit(file_path, lines):
+        name = file_path.rsplit("/", 1)[-1]
+        lines = lines + new_lines(name, rnd.randint(1, churn))
+        if len(lines) > churn and rnd.random() < 0.5:
+            start = rnd.randrange(len(lines))
+            del lines[start:start + rnd.randint(0, churn // 2)]
+        return lines
+
+    def tick():
+        nonlocal timestamp
+        timestamp += rnd.randint(1800, 2 * 86400)
+        return timestamp
+
+    def message(file_path):
+        return rnd.choice(COMMIT_MESSAGES).format(name=file_path.rsplit("/", 1)[-1])
+
+    # Merge points spread over the history; each branch takes 4 commits
+    # (3 on the branch, 1 merge) out of the budget
+    branch_starts = {commits * (k + 1) // (branches + 1): k for k in range(branches)}
+    index_drop = int(commits * 0.6)
+
+    process = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=path, stdin=subprocess.PIPE)
+    writer = FastImportWriter(process.stdin)
+    head = None
+    made = 0
+    dropped = False
+    while made < commits:
+        if made == 0:
+            tree["index.html"] = new_lines("index.html", 50)
+            tree["js/main.js"] = new_lines("main.js", 20)
+            tree["README.md"] = ["# Synthetic repository"]
+            operations = [("M", p, lines) for p, lines in tree.items()]
+            head = writer.commit("main", AUTHORS[0], tick(), "Initial commit", [], operations)
+            made += 1
+            continue
+
+        if made in branch_starts and made + 4 <= commits:
+            k = branch_starts[made]
+            branch = f"feature-{k}"
+            branch_files = {}
+            branch_head = head
+            for step in range(3):
+                if step == 0 or rnd.random() < 0.5:
+                    file_path = f"js/components/Feature{k}Part{step}.js"
+                else:
+                    file_path = rnd.choice(list(branch_files))
+                branch_files[file_path] = edit(file_path, branch_files.get(file_path, []))
+                branch_head = writer.commit(branch, rnd.choice(AUTHORS), tick(), message(file_path),
+                                            [branch_head], [("M", file_path, branch_files[file_path])])
+            tree.update(branch_files)
+            head = writer.commit("main", rnd.choice(AUTHORS), tick(), f"Merge branch '{branch}'",
+                                 [head, branch_head],
+                                 [("M", p, lines) for p, lines in branch_files.items()])
+            made += 4
+            continue
+
+        removable = [p for p in tree if p not in ("index.html", "js/main.js", "README.md")]
+        roll = rnd.random()
+        if made >= index_drop and not dropped:
+            dropped = True
+            file_path = "index.html"
+            tree[file_path] = tree[file_path][: len(tree[file_path]) // 10]
+            operations = [("M", file_path, tree[file_path])]
+        elif len(tree) < files and rnd.random() < max(0.15, 1 - len(tree) / files):
+            file_path = new_path(made)
+            tree[file_path] = new_lines(file_path, rnd.randint(churn, churn * 5))
+            operations = [("M", file_path, tree[file_path])]
+        elif removable and roll < deletions:
+            file_path = rnd.choice(removable)
+            del tree[file_path]
+            operations = [("D", file_path)]
+        elif removable and roll < deletions + renames:
+            file_path = rnd.choice(removable)
+            directory, name = file_path.rsplit("/", 1)
+            renamed = f"{directory}/Renamed{made}{name[name.index('.'):]}"
+            tree[renamed] = tree.pop(file_path)
+            operations = [("R", file_path, renamed)]
+        else:
+            operations = []
+            candidates = list(tree)
+            if not dropped:
+                candidates += ["index.html"] * 3  # Grow the monolith
+            for file_path in {rnd.choice(candidates) for _ in range(rnd.randint(1, 3))}:
+                tree[file_path] = edit(file_path, tree[file_path])
+                operations.append(("M", file_path, tree[file_path]))
+            file_path = operations[0][1]
+        head = writer.commit("main", rnd.choice(AUTHORS), tick(), message(file_path), [head], operations)
+        made += 1
+
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"git fast-import failed for {path}")
+    subprocess.run(["git", "checkout", "-q", "-f", "main"], cwd=path, check=True)
+    return path
+
+
+def point_miners_at(repo, out_dir):
+    """Redirect both mining modules' configuration to a synthetic repo."""
+    for module in (timeline, race):
+        module.configure_paths(repo, out_dir)
+
+
+def race_inputs(index):
+    """Intermediate race data, built the way generate_race_frames() builds it."""
+    all_dates = [d for d in race.get_all_dates_with_commits(index) if d]
+    lineage = FileLineage.load(index)
+    former_paths = lineage.former_paths()
+    all_files = race.get_all_files_ever(index, lineage=lineage)
+    file_info = race.get_file_infos(index, lineage, all_files, former_paths)
+    signatures = race.get_date_signatures(index, file_info, all_dates, lineage=lineage)
+    sampled_dates, _ = race.select_frame_dates(signatures)
+    snapshots, _, _ = race.replay_file_sizes(index, all_files, sampled_dates, lineage=lineage)
+    commit_index = race.CommitTimeIndex.load(index)
+    frames = race.build_frames(snapshots, {}, file_info, commit_index)
+    return {
+        "lineage": lineage,
+        "former_paths": former_paths,
+        "all_files": all_files,
+        "file_info": file_info,
+        "all_dates": all_dates,
+        "signatures": signatures,
+        "sampled_dates": sampled_dates,
+        "snapshots": snapshots,
+        "commit_index": commit_index,
+        "frames": frames,
+    }
+
+
+# (name, call) for every public function; `call` takes the benchmark context
+BENCHMARKS = [
+    ("HistoryIndex.update", lambda c: c["index"].update(rebuild=True)),
+    ("CommitStore.load", lambda c: CommitStore.load(c["index"])),
+    ("timeline.get_all_commits", lambda c: timeline.get_all_commits(c["index"])),
+    ("timeline.get_history_summary", lambda c: timeline.get_history_summary(c["index"])),
+    ("FileLineage.load", lambda c: FileLineage.load(c["index"])),
+    ("timeline.get_file_histories", lambda c: timeline.get_file_histories(c["index"], c["lineage"])),
+    ("timeline.get_directory_creation_dates", lambda c: timeline.get_directory_creation_dates(c["index"])),
+    ("timeline.get_activity_rollups", lambda c: timeline.get_activity_rollups(c["index"])),
+    ("timeline.detect_architecture_phases", lambda c: timeline.detect_architecture_phases(c["index"])),
+    ("timeline.get_top_churn_files", lambda c: timeline.get_top_churn_files(c["index"], 30)),
+    ("ChurnIndex.build", lambda c: ChurnIndex.build(load_commit_store(c["index"]))),
+    ("ChurnIndex.top", lambda c: load_churn_index(c["index"]).top(c["all_dates"][len(c["all_dates"]) // 2], kind="directory")),
+    ("timeline.get_file_tree_snapshot", lambda c: timeline.get_file_tree_snapshot(c["index"])),
+    ("timeline.get_all_files_timeline", lambda c: timeline.get_all_files_timeline(c["index"])),
+    ("timeline.run_stages", lambda c: run_stages(
+        timeline.INDEPENDENT_STAGES, lambda: HistoryIndex(c["index"].path, c["index"].repo_path))),
+    ("race.get_all_dates_with_commits", lambda c: race.get_all_dates_with_commits(c["index"])),
+    ("race.get_all_files_ever", lambda c: race.get_all_files_ever(c["index"], lineage=c["lineage"])),
+    ("race.get_file_infos", lambda c: race.get_file_infos(c["index"], c["lineage"], c["all_files"], c["former_paths"])),
+    ("race.get_date_signatures", lambda c: race.get_date_signatures(c["index"], c["file_info"], c["all_dates"], lineage=c["lineage"])),
+    ("race.select_frame_dates", lambda c: race.select_frame_dates(c["signatures"])),
+    ("race.replay_file_sizes", lambda c: race.replay_file_sizes(
+        c["index"], c["all_files"], c["sampled_dates"], lineage=c["lineage"])),
+    ("race.CommitTimeIndex.load", lambda c: race.CommitTimeIndex.load(c["index"])),
+    ("race.build_frames", lambda c: race.build_frames(c["snapshots"], {}, c["file_info"], c["commit_index"])),
+    ("race.generate_race_frames", lambda c: race.generate_race_frames(c["index"])),
+    ("race.detect_milestones", lambda c: race.detect_milestones(c["frames"], c["file_info"])),
+    ("timeline.main", lambda c: timeline.main([])),
+    ("race.main", lambda c: race.main(["--workers", "1"])),
+]
+
+
+def measure(call, context, repeat):
+    """Best wall time of `repeat` runs, then peak traced memory and git processes of one more."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call(context)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    processes = GIT_COUNTERS.processes
+    tracemalloc.start()
+    try:
+        call(context)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": round(best, 4),
+        "peakKb": peak // 1024,
+        "gitProcesses": GIT_COUNTERS.processes - processes,
+    }
+
+
+def benchmark_repo(repo, out_dir, repeat):
+    """Time every benchmark against one repository."""
+    point_miners_at(repo, out_dir)
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        index = HistoryIndex(out_dir / "history_index.db", repo)
+        index.update(rebuild=True)
+        context = {"index": index, **race_inputs(index)}
+        for name, call in BENCHMARKS:
+            results[name] = measure(call, context, repeat)
+        index.close()
+    return results
+
+
+def measure_memory(repo, out_dir):
+    """Peak RSS of each mining script run on its own against `repo`."""
+    results = {}
+    for script in MINER_SCRIPTS:
+        report_file = out_dir / f"{Path(script).stem}_profile.json"
+        cmd = [sys.executable, str(SCRIPT_DIR / script), "--repo", str(repo), "--output", str(out_dir),
+               "--profile", str(report_file)]
+        if script == "git_race_mining.py":
+            cmd += ["--workers", "1"]  # Keep frame workers out of the child peak
+        subprocess.run(cmd, cwd=SCRIPT_DIR, capture_output=True, check=True)
+        report = json.loads(report_file.read_text())
+        results[script] = {
+            "seconds": report["totalSeconds"],
+            "peakRssKb": report["peakRssKb"],
+            "childPeakRssKb": report["childPeakRssKb"],
+        }
+    return results
+
+
+def print_memory(size, commits, results):
+    print(f"\n   {'script (' + size + ', ' + format(commits, ',') + ' commits)':<40} "
+          f"{'seconds':>9} {'peak RSS':>10} {'git peak':>10}")
+    for script, result in results.items():
+        peak = f"{result['peakRssKb'] // 1024} MiB" if result["peakRssKb"] is not None else "-"
+        child = f"{result['childPeakRssKb'] // 1024} MiB" if result["childPeakRssKb"] is not None else "-"
+        print(f"   {script:<40} {result['seconds']:>9.3f} {peak:>10} {child:>10}")
+
+
+def normalize_output(name, data):
+    """Drop fields that legitimately differ between runs."""
+    if name == "timeline_data.json":
+        data = timeline.decode_interned_output(data)
+    data.pop("generatedAt", None)
+    if name == "race_data.json":
+        if data.get("config", {}).get("frameFormat") == "delta":
+            data["frames"] = race.decode_delta_frames(data.pop("fileTable"), data["frames"])
+            data["config"].pop("frameFormat")
+            data["config"].pop("keyframeInterval")
+        # Files with equal line counts may be listed in any order
+        for frame in data.get("frames", []):
+            frame["files"] = sorted(frame["files"], key=lambda f: (-f["lines"], f["file"]))
+    return data
+
+
+def reference_scripts(revision, target):
+    """Write the mining scripts as of `revision` into `target`."""
+    listing = subprocess.run(
+        ["git", "ls-tree", "--name-only", revision, "gitstoryline/"],
+        cwd=PACKAGE_ROOT, capture_output=True, text=True, check=True
+    ).stdout.split()
+    target.mkdir(parents=True)
+    for file_path in listing:
+        if file_path.endswith(".py"):
+            content = subprocess.run(
+                ["git", "show", f"{revision}:{file_path}"],
+                cwd=PACKAGE_ROOT, capture_output=True, check=True
+            ).stdout
+            (target / Path(file_path).name).write_bytes(content)
+
+
+def run_miners(scripts_dir, repo):
+    """Run both mining scripts from `scripts_dir` against `repo`; return their JSON output."""
+    target = repo / "gitstoryline"
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(scripts_dir, target, ignore=lambda _, names: [n for n in names if not n.endswith(".py")])
+    try:
+        for script in MINER_SCRIPTS:
+            subprocess.run([sys.executable, script], cwd=target, capture_output=True, check=True,
+                           env={**os.environ, "PYTHONHASHSEED": "0"})
+        return {name: json.loads((target / name).read_text()) for name in OUTPUT_FILES}
+    finally:
+        shutil.rmtree(target, ignore_errors=True)
+
+
+def differential_check(repo, revision, work_dir):
+    """Compare the working tree's output with `revision`'s. Returns differing keys per file."""
+    reference_dir = work_dir / f"reference-{revision}"
+    if not reference_dir.exists():
+        reference_scripts(revision, reference_dir)
+    expected = run_miners(reference_dir, repo)
+    actual = run_miners(SCRIPT_DIR, repo)
+
+    differences = {}
+    for name in OUTPUT_FILES:
+        old = normalize_output(name, expected[name])
+        new = normalize_output(name, actual[name])
+        differences[name] = sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+    return differences
+
+
+def current_revision():
+    revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PACKAGE_ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    dirty = subprocess.run(["git", "status", "--porcelain", "--", "gitstoryline"], cwd=PACKAGE_ROOT,
+                           capture_output=True, text=True).stdout.strip()
+    return revision, bool(dirty)
+
+
+def resolve_reference(revision, dirty):
+    """The revision the differential check compares against, and whether it is the tree's own commit.
+
+    By default that is HEAD while the scripts have uncommitted changes, and
+    HEAD's parent otherwise, so a clean checkout isn't compared with itself.
+    """
+    if revision is None:
+        revision = "HEAD" if dirty else "HEAD~1"
+
+    def commit_of(rev):
+        return subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"], cwd=PACKAGE_ROOT,
+                              capture_output=True, text=True).stdout.strip()
+
+    commit = commit_of(revision)
+    if not commit:
+        raise SystemExit(f"Unknown reference revision: {revision}")
+    return revision, commit == commit_of("HEAD") and not dirty
+
+
+def load_previous_results():
+    """The most recent saved benchmark run, or None."""
+    saved = sorted(RESULTS_DIR.glob("*.json")) if RESULTS_DIR.exists() else []
+    if not saved:
+        return None
+    with open(saved[-1]) as f:
+        return json.load(f)
+
+
+def print_results(size, results, previous):
+    previous = (previous or {}).get("results", {}).get(size, {})
+    print(f"\n   {'function':<40} {'seconds':>9} {'peak KiB':>10} {'git procs':>10} {'vs prev':>8}")
+    for name, result in results.items():
+        before = previous.get(name)
+        ratio = "-"
+        if before and before["seconds"] > 0:
+            change = result["seconds"] / before["seconds"]
+            ratio = f"{change:.2f}x" + (" ⚠️" if change > 1.25 and result["seconds"] > 0.01 else "")
+        print(f"   {name:<40} {result['seconds']:>9.4f} {result['peakKb']:>10,} "
+              f"{result['gitProcesses']:>10} {ratio:>8}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the GitStoryline miners on synthetic repositories.")
+    parser.add_argument(
+        "--sizes", nargs="+", choices=[*SIZES, "custom"], default=["small", "medium"],
+        help="Repository sizes to benchmark (custom uses the options below)"
+    )
+    for option, value in SIZES["small"].items():
+        parser.add_argument(f"--{option}", type=type(value), default=value,
+                            help=f"{option} for the custom size (default: {value})")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the repo generator")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per function; the best is kept")
+    parser.add_argument(
+        "--reference", metavar="REV",
+        help="Revision whose scripts the differential check compares against "
+             "(default: HEAD with uncommitted changes to the scripts, else HEAD~1)"
+    )
+    parser.add_argument("--no-diff", action="store_true", help="Skip the differential output check")
+    parser.add_argument(
+        "--memory", action="store_true",
+        help="Also run each script as its own process and record its peak resident memory"
+    )
+    parser.add_argument("--keep", metavar="DIR", help="Build repos in DIR and keep them")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = {
+        size: SIZES[size] if size != "custom" else {option: getattr(args, option) for option in SIZES["small"]}
+        for size in args.sizes
+    }
+
+    print("⏱️  GitStoryline Benchmarks")
+    print("=" * 50)
+
+    revision, dirty = current_revision()
+    if not args.no_diff:
+        args.reference, same_commit = resolve_reference(args.reference, dirty)
+        if same_commit:
+            print(f"   ⚠️  Reference {args.reference} is the working tree's own commit; "
+                  f"the differential check will compare it with itself")
+    previous = load_previous_results()
+    if previous:
+        print(f"   Comparing against {previous['revision']}{' (dirty)' if previous['dirty'] else ''} "
+              f"from {previous['generatedAt'][:19]}")
+
+    work_dir = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix="gitstoryline-bench-"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    report = {
+        "generatedAt": datetime.now().isoformat(),
+        "revision": revision,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "sizes": sizes,
+        "results": {},
+        "differential": {},
+        "memory": {},
+    }
+    failed = False
+    try:
+        for size, config in sizes.items():
+            print(f"\n🏗️  Generating {size} repo ({config['commits']} commits, {config['files']} files)...")
+            repo = generate_repo(work_dir / size, seed=args.seed, **config)
+            # Where the scripts would write inside the repo (relative paths are printed)
+            out_dir = repo / "gitstoryline"
+            out_dir.mkdir(exist_ok=True)
+
+            print(f"📊 Benchmarking {size}...")
+            report["results"][size] = benchmark_repo(repo, out_dir, args.repeat)
+            print_results(size, report["results"][size], previous)
+
+            if args.memory:
+                print(f"\n🧠 Measuring peak memory for {size}...")
+                report["memory"][size] = measure_memory(repo, work_dir / f"{size}-memory")
+                print_memory(size, config["commits"], report["memory"][size])
+
+            if not args.no_diff:
+                print(f"\n🔍 Comparing output with {args.reference}...")
+                differences = differential_check(repo, args.reference, work_dir)
+                report["differential"][size] = {"reference": args.reference, **differences}
+                for name, keys in differences.items():
+                    print(f"   {name}: {'same' if not keys else 'DIFFERS in ' + ', '.join(keys)}")
+                    failed = failed or bool(keys)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    result_file = RESULTS_DIR / f"{stamp}-{revision}{'-dirty' if dirty else ''}.json"
+    with open(result_file, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n✅ Results saved to {result_file.relative_to(PACKAGE_ROOT)}")
+    if failed:
+        print("❌ Output differs from the reference revision")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
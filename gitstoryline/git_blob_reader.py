@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Blob Reader
+========================
+Shared helper for the subprocess git backend (see git_backends.py). Keeps a
+single long-lived `git cat-file --batch` process open per repository so that
+blobs can be read without forking a `git show` for every file. Line counts
+are taken from these blobs and memoized by blob id in the history index (see
+git_history_index.py), not here.
+
+Usage:
+    from git_blob_reader import get_blob_reader
+
+    reader = get_blob_reader(REPO_PATH)
+    data = reader.read(blob_id)
+"""
+
+import atexit
+import subprocess
+import threading
+from pathlib import Path
+
+from git_profiling import record_git_bytes, record_git_process
+
+
+class BlobReader:
+    """Reads blobs through one persistent `git cat-file --batch` process."""
+
+    def __init__(self, repo_path):
+        self.repo_path = Path(repo_path)
+        self.process = None
+
+    def _spawn(self):
+        record_git_process()
+        return subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=self.repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, blob_id):
+        """Return the raw bytes of a blob, or None if it does not exist."""
+        if "\n" in blob_id:
+            return None
+        if self.process is None or self.process.poll() is not None:
+            self.process = self._spawn()
+
+        self.process.stdin.write(blob_id.encode("utf-8") + b"\n")
+        self.process.stdin.flush()
+
+        header = self.process.stdout.readline()
+        record_git_bytes(len(header))
+        header = header.decode("utf-8", "replace").rstrip("\n")
+        parts = header.split(" ")
+        if len(parts) != 3 or not parts[2].isdigit():
+            # "<name> missing" / "<name> ambiguous"
+            return None
+
+        size = int(parts[2])
+        data = self.process.stdout.read(size)
+        self.process.stdout.read(1)  # Trailing newline after the object body
+        record_git_bytes(size + 1)
+
+        if parts[1] != "blob":
+            return None
+        return data
+
+    def close(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+        self.process.stdout.close()
+        self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+_readers = {}
+
+
+def get_blob_reader(repo_path):
+    """Return the shared BlobReader for a repository, starting it on first use.
+
+    Readers are shared within a thread; a reader's pipe must not be used by
+    two threads at once, so each thread gets its own.
+    """
+    key = (Path(repo_path).resolve(), threading.get_ident())
+    if key not in _readers:
+        _readers[key] = BlobReader(key[0])
+    return _readers[key]
+
+
+def close_blob_readers():
+    """Shut down every shared reader process."""
+    for reader in _readers.values():
+        reader.close()
+    _readers.clear()
+
+
+atexit.register(close_blob_readers)
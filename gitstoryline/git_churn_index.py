@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Churn Index
+========================
+Answers "which files (or directories) churned most between two dates" for
+any window of the history, without another pass over it. The index is
+built once from the commit store (see git_commit_store.py):
+
+    days      every distinct author day of the history, sorted
+    keys      every file path and every directory above one
+    events    per key, the days it was committed to, sorted, with running
+              (prefix) sums of its commits and of their decayed weights
+
+The commits to a key in a window are then the difference of two prefix
+sums, found by bisecting its days, so a top-K query costs one bisect per
+key however long the window is.
+
+Churn counts the non-merge commits touching a file, or any file below a
+directory (once per commit). Paths at the root starting with "." (tool
+configuration such as .github/) are left out, as they are not code.
+
+The decayed score weighs every commit by 2^(-age / half-life), its age in
+days counted back from the end of the window, so recent churn outranks
+old churn of the same size.
+
+Usage:
+    churn = load_churn_index(index)
+    churn.top(limit=20)                                        # all time
+    churn.top("2024-03-01", "2024-06-01", kind="directory", by="score")
+
+    python git_churn_index.py [--since DATE] [--until DATE] [--limit N]
+                              [--directories] [--by commits|score] [--output DIR]
+"""
+
+import argparse
+import heapq
+import threading
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+
+from git_commit_store import load_commit_store
+from git_history_index import HistoryIndex
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+DEFAULT_HALF_LIFE_DAYS = 90  # Churn loses half its weight over this many days
+KINDS = ("file", "directory")
+FILE, DIRECTORY = range(len(KINDS))
+
+
+def day_number(day):
+    return date.fromisoformat(day[:10]).toordinal()
+
+
+def is_hidden(path):
+    """Root-level dotfiles and dot directories, which churn doesn't count."""
+    return path.startswith(".")
+
+
+class ChurnIndex:
+    """Per-key prefix sums of commits over the days of the history (see the module docstring)."""
+
+    def __init__(self, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+        self.half_life_days = half_life_days
+        self.days = []
+        self.names = []
+        self.kinds = []  # Index into KINDS, per key
+        self.recency = []  # (commit row, -position) of a key's latest change, for ranking ties
+        # Events of key k are starts[k]:starts[k + 1]; prefix sums restart at every key
+        self.starts = [0]
+        self.event_days = []
+        self.commits = []
+        self.weights = []
+
+    @classmethod
+    def build(cls, store, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+        churn = cls(half_life_days)
+        day_ids = sorted(set(store.days), key=lambda day_id: store.strings[day_id])
+        churn.days = [store.strings[day_id] for day_id in day_ids]
+        day_index = {day_id: i for i, day_id in enumerate(day_ids)}
+        # Weights are relative to the last day, so they never overflow
+        last = day_number(churn.days[-1]) if churn.days else 0
+        day_weights = [2 ** ((day_number(day) - last) / half_life_days) for day in churn.days]
+
+        keys = {}  # (kind, name) -> key
+        events = []  # key -> {day index: commits}
+        path_keys = {}  # path string id -> keys of the file and its directories
+
+        def key_of(kind, name):
+            key = keys.get((kind, name))
+            if key is None:
+                key = keys[(kind, name)] = len(churn.names)
+                churn.names.append(name)
+                churn.kinds.append(kind)
+                churn.recency.append(None)
+                events.append(defaultdict(int))
+            return key
+
+        for row in range(len(store)):
+            if store.merges[row]:
+                continue
+            touched = {}  # key -> -position of its first change in the commit
+            for position, change in enumerate(store.change_rows(row)):
+                path_id = store.paths[change]
+                change_keys = path_keys.get(path_id)
+                if change_keys is None:
+                    path = store.strings[path_id]
+                    parts = path.split("/")
+                    change_keys = path_keys[path_id] = () if is_hidden(path) else (
+                        key_of(FILE, path),
+                        *(key_of(DIRECTORY, "/".join(parts[:depth])) for depth in range(1, len(parts)))
+                    )
+                for key in change_keys:
+                    touched.setdefault(key, -position)
+            day = day_index[store.days[row]]
+            for key, position in touched.items():
+                events[key][day] += 1
+                churn.recency[key] = (row, position)
+
+        for key_events in events:
+            commits = weights = 0
+            for day in sorted(key_events):
+                commits += key_events[day]
+                weights += key_events[day] * day_weights[day]
+                churn.event_days.append(day)
+                churn.commits.append(commits)
+                churn.weights.append(weights)
+            churn.starts.append(len(churn.event_days))
+        return churn
+
+    def __len__(self):
+        return len(self.names)
+
+    def window(self, key, first, stop):
+        """(commits, decayed weight) of a key over day indexes [first, stop)."""
+        start, end = self.starts[key], self.starts[key + 1]
+        lo = bisect_left(self.event_days, first, start, end)
+        hi = bisect_left(self.event_days, stop, lo, end)
+        if lo == hi:
+            return 0, 0.0
+        if lo == start:
+            return self.commits[hi - 1], self.weights[hi - 1]
+        return self.commits[hi - 1] - self.commits[lo - 1], self.weights[hi - 1] - self.weights[lo - 1]
+
+    def top(self, since=None, until=None, limit=20, kind="file", by="commits", where=None):
+        """The most churned keys of a kind committed to in [since, until), most first.
+
+        Dates are YYYY-MM-DD (longer ISO dates are cut to the day); a missing
+        bound leaves that end of the history open. Keys are ranked by commits
+        or by decayed score, ties going to the most recently changed.
+        `where(name)`, if given, picks the keys taken into account.
+        """
+        first = bisect_left(self.days, since[:10]) if since else 0
+        stop = bisect_left(self.days, until[:10]) if until else len(self.days)
+        if not self.days:
+            return []
+        # Ages are counted back from the window's end (or the last day of the history)
+        as_of = day_number(until) if until else day_number(self.days[-1])
+        scale = 2 ** ((day_number(self.days[-1]) - as_of) / self.half_life_days)
+
+        kind_index = KINDS.index(kind)
+        ranked = []
+        for key, name in enumerate(self.names):
+            if self.kinds[key] != kind_index or (where is not None and not where(name)):
+                continue
+            commits, weight = self.window(key, first, stop)
+            if commits:
+                value = commits if by == "commits" else weight
+                ranked.append((value, self.recency[key], key, commits, weight * scale))
+        return [
+            {kind: self.names[key], "commits": commits, "score": round(score, 3)}
+            for _, _, key, commits, score in heapq.nlargest(limit, ranked)
+        ]
+
+
+_indexes = weakref.WeakKeyDictionary()  # CommitStore -> ChurnIndex
+_indexes_lock = threading.Lock()
+
+
+def load_churn_index(index):
+    """The ChurnIndex of a history index, built once per loaded commit store."""
+    store = load_commit_store(index)
+    with _indexes_lock:
+        churn = _indexes.get(store)
+        if churn is None:
+            churn = _indexes[store] = ChurnIndex.build(store)
+        return churn
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Show the most churned files of a window of history.")
+    parser.add_argument("--since", metavar="DATE", help="First day of the window (YYYY-MM-DD)")
+    parser.add_argument("--until", metavar="DATE", help="Day after the window (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=20, help="How many to show (default: 20)")
+    parser.add_argument("--directories", action="store_true", help="Rank directories instead of files")
+    parser.add_argument(
+        "--by", choices=["commits", "score"], default="commits",
+        help=f"Rank by commits or by score decayed with a {DEFAULT_HALF_LIFE_DAYS}-day half-life"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=SCRIPT_DIR, metavar="DIR",
+        help="Directory of a mining run's history_index.db (default: next to this script)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    index_file = args.output / "history_index.db"
+    if not index_file.exists():
+        raise SystemExit(f"No history index at {index_file}; run git_timeline_mining.py first")
+    index = HistoryIndex(index_file, SCRIPT_DIR.parent)
+    try:
+        kind = "directory" if args.directories else "file"
+        hotspots = load_churn_index(index).top(args.since, args.until, args.limit, kind=kind, by=args.by)
+    finally:
+        index.close()
+
+    print(f"🔥 Most churned {'directories' if args.directories else 'files'} from {args.since or 'the start'} "
+          f"to {args.until or 'now'}, by {args.by}")
+    for rank, hotspot in enumerate(hotspots, 1):
+        print(f"   {rank:>3}. {hotspot[kind]}  {hotspot['commits']} commits, score {hotspot['score']:g}")
+
+
+if __name__ == "__main__":
+    main()
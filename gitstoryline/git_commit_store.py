@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Commit Store
+=========================
+The commits and file changes of the history index, held in memory as
+columns for the aggregation passes of both miners. Loading the store reads
+the index once; the passes then walk compact arrays instead of each
+re-querying SQLite for a tuple of fresh strings per row.
+
+    strings   every path, author and day, stored once (StringTable); the
+              columns below hold their ids
+    commits   one row per commit, oldest first (the reverse of LOG_ORDER):
+              hash, author date and subject, then author and day ids,
+              commit time and merge flag in arrays, and where its changes
+              start
+    changes   one row per file change, grouped by commit in ordinal order:
+              status, path and old path ids, insertions and deletions (-1
+              for binary files) in arrays, and new blob ids as raw bytes
+
+CommitRecord and ChangeRecord are `__slots__` views onto a row, for passes
+that read better with attributes than with column lookups:
+
+    store = load_commit_store(index)
+    for commit in store.commits(newest_first=True, merges=False):
+        for change in commit.changes():
+            print(commit.hash, change.status, change.path, change.insertions)
+
+load_commit_store() keeps one store per index file, shared by every thread
+of the process, and reloads it once the index has new commits. The store
+holds every commit and change, so its memory grows with the history; it is
+freed once every HistoryIndex that loaded it has been closed (or released
+it with release_commit_store()).
+"""
+
+import json
+import threading
+import weakref
+from array import array
+
+NO_STRING = -1  # Old path of a change that isn't a rename
+BINARY = -1  # Insertions/deletions of a binary file
+
+
+class StringTable:
+    """Strings stored once each and referred to by their position."""
+
+    __slots__ = ("strings", "ids")
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def intern(self, value):
+        """The id of a string, adding it on first use."""
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+class CommitRecord:
+    """A view of one commit row of a CommitStore."""
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def hash(self):
+        return self.store.hashes[self.row]
+
+    @property
+    def date(self):
+        """Author date (ISO 8601)."""
+        return self.store.dates[self.row]
+
+    @property
+    def subject(self):
+        return self.store.subjects[self.row]
+
+    @property
+    def author(self):
+        return self.store.strings[self.store.authors[self.row]]
+
+    @property
+    def day(self):
+        """Author day (YYYY-MM-DD)."""
+        return self.store.strings[self.store.days[self.row]]
+
+    @property
+    def commit_time(self):
+        return self.store.commit_times[self.row]
+
+    @property
+    def is_merge(self):
+        return bool(self.store.merges[self.row])
+
+    def changes(self):
+        """The commit's file changes in ordinal order."""
+        return [ChangeRecord(self.store, change) for change in self.store.change_rows(self.row)]
+
+
+class ChangeRecord:
+    """A view of one file change row of a CommitStore."""
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def status(self):
+        return chr(self.store.statuses[self.row])
+
+    @property
+    def path(self):
+        return self.store.strings[self.store.paths[self.row]]
+
+    @property
+    def old_path(self):
+        string_id = self.store.old_paths[self.row]
+        return None if string_id == NO_STRING else self.store.strings[string_id]
+
+    @property
+    def insertions(self):
+        """Lines added, or None for a binary file."""
+        lines = self.store.insertions[self.row]
+        return None if lines == BINARY else lines
+
+    @property
+    def deletions(self):
+        lines = self.store.deletions[self.row]
+        return None if lines == BINARY else lines
+
+    @property
+    def new_blob(self):
+        return self.store.blob(self.row)
+
+
+class CommitStore:
+    """Commits and file changes of a history index, stored as columns (see the module docstring)."""
+
+    def __init__(self):
+        self.strings = StringTable()
+        # Commit columns
+        self.hashes = []
+        self.dates = []
+        self.subjects = []
+        self.authors = array("I")
+        self.days = array("I")
+        self.commit_times = array("q")
+        self.merges = bytearray()
+        self.change_starts = array("I", [0])
+        self.rows = {}  # hash -> commit row
+        # Change columns
+        self.statuses = bytearray()
+        self.paths = array("I")
+        self.old_paths = array("i")
+        self.insertions = array("q")
+        self.deletions = array("q")
+        self.blobs = bytearray()
+        self.blob_width = 20  # Bytes per blob id: 20 for SHA-1, 32 for SHA-256 repositories
+
+    @classmethod
+    def load(cls, index):
+        store = cls()
+        intern = store.strings.intern
+        for commit_hash, date, subject, author, day, commit_time, is_merge in index.iter_query(
+            "SELECT c.hash, c.author_date, c.subject, c.author, c.author_day, c.commit_time, c.is_merge "
+            "FROM commits c ORDER BY c.batch ASC, c.position DESC"
+        ):
+            store.rows[commit_hash] = len(store.hashes)
+            store.hashes.append(commit_hash)
+            store.dates.append(date)
+            store.subjects.append(subject)
+            store.authors.append(intern(author or ""))
+            store.days.append(intern(day or ""))
+            store.commit_times.append(commit_time or 0)
+            store.merges.append(1 if is_merge else 0)
+
+        sample = index.query("SELECT new_blob FROM changes WHERE new_blob IS NOT NULL LIMIT 1")
+        if sample:
+            store.blob_width = len(sample[0][0]) // 2
+        empty_blob = bytes(store.blob_width)
+        counts = array("I", [0]) * len(store.hashes)
+        for commit_hash, status, old_path, path, new_blob, ins, dels in index.iter_query(
+            "SELECT ch.commit_hash, ch.status, ch.old_path, ch.path, ch.new_blob, ch.insertions, ch.deletions "
+            "FROM changes ch JOIN commits c ON c.hash = ch.commit_hash "
+            "ORDER BY c.batch ASC, c.position DESC, ch.ordinal"
+        ):
+            counts[store.rows[commit_hash]] += 1
+            store.statuses.append(ord(status))
+            store.paths.append(intern(path))
+            store.old_paths.append(NO_STRING if old_path is None else intern(old_path))
+            store.insertions.append(BINARY if ins is None else ins)
+            store.deletions.append(BINARY if dels is None else dels)
+            store.blobs += bytes.fromhex(new_blob) if new_blob else empty_blob
+
+        for count in counts:
+            store.change_starts.append(store.change_starts[-1] + count)
+        return store
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def commit(self, row):
+        return CommitRecord(self, row)
+
+    def commits(self, newest_first=False, merges=True, rows=None):
+        """CommitRecords oldest first (or newest first), optionally without merges or only some rows."""
+        if rows is None:
+            rows = range(len(self.hashes))
+            rows = reversed(rows) if newest_first else rows
+        else:
+            rows = sorted(rows, reverse=newest_first)
+        return (CommitRecord(self, row) for row in rows if merges or not self.merges[row])
+
+    def rows_of(self, hashes):
+        """Commit rows of the given hashes, skipping any the store doesn't have."""
+        return [self.rows[commit_hash] for commit_hash in hashes if commit_hash in self.rows]
+
+    def change_rows(self, row):
+        """Rows of a commit's changes, in ordinal order."""
+        return range(self.change_starts[row], self.change_starts[row + 1])
+
+    def blob(self, change):
+        """New blob id (hex) of a change, or None."""
+        start = change * self.blob_width
+        raw = self.blobs[start:start + self.blob_width]
+        return raw.hex() if any(raw) else None
+
+
+_stores = {}  # index file -> [index version, CommitStore, HistoryIndexes holding it]
+_stores_lock = threading.Lock()
+
+
+def load_commit_store(index):
+    """The CommitStore of a history index, loaded once per index version while any index holds it.
+
+    The index holds the store until it is closed or passed to
+    release_commit_store(); the last index of a file to let go frees it.
+    """
+    key = index.path.resolve()
+    version = json.dumps(index.get_meta("tips"), sort_keys=True)
+    with _stores_lock:
+        # Indexes dropped without being closed don't keep stores of other files alive
+        for other in [other for other, cached in _stores.items() if other != key and not cached[2]]:
+            del _stores[other]
+        cached = _stores.get(key)
+        if cached is None or cached[0] != version:
+            cached = _stores[key] = [version, CommitStore.load(index), weakref.WeakSet()]
+        cached[2].add(index)
+        return cached[1]
+
+
+def release_commit_store(index):
+    """Let go of the store an index loaded, freeing it once no other index of its file holds it."""
+    key = index.path.resolve()
+    with _stores_lock:
+        cached = _stores.get(key)
+        if cached is not None:
+            cached[2].discard(index)
+            if not cached[2]:
+                del _stores[key]
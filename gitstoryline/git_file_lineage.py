@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+GitStoryline File Lineage
+=========================
+Rename-aware identity for every path in the history, built from one query
+over the history index. Its changes come from a single rename-detected
+(`--name-status -M`) log walk, so no per-file `git log --follow` is needed.
+
+A lineage is the chain of paths one file went through, named after the last
+of them. Renames are taken from HEAD's first-parent chain, where a merge
+carries the renames made on its branch, so lineages end at HEAD's paths. A
+path may start a new lineage after it was renamed away, so resolving a path
+takes the commit it was seen in:
+
+    lineage.resolve("js/app.js", commit_hash)   -> "js/main.js"
+    lineage.former_paths()                       -> {"js/main.js": ["js/app.js"]}
+
+Usage:
+    from git_file_lineage import FileLineage
+
+    lineage = FileLineage.load(index)
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+
+from git_history_index import LOG_ORDER
+
+
+class FileLineage:
+    """Where every path ends up after the renames that follow it."""
+
+    def __init__(self, positions, renames):
+        """`positions` maps commit hashes to their order in history (oldest
+        first); `renames` are (commit_hash, old_path, new_path) tuples."""
+        self.positions = positions
+        moves = defaultdict(list)
+        for commit_hash, old_path, new_path in renames:
+            if old_path != new_path:
+                moves[old_path].append((positions[commit_hash], new_path))
+        self.moves = {old_path: sorted(set(entries)) for old_path, entries in moves.items()}
+        self.move_positions = {
+            old_path: [position for position, _ in entries] for old_path, entries in self.moves.items()
+        }
+
+    @classmethod
+    def load(cls, index):
+        rows = index.query(f"SELECT c.hash FROM commits c {LOG_ORDER}")
+        positions = {commit_hash: len(rows) - i for i, (commit_hash,) in enumerate(rows)}
+        chain = {commit_hash for commit_hash, _ in index.first_parent_chain()}
+        renames = [
+            row for row in index.query("SELECT commit_hash, old_path, path FROM changes WHERE status = 'R'")
+            if row[0] in chain
+        ]
+        return cls(positions, renames)
+
+    def resolve(self, path, commit_hash=None):
+        """The lineage a path belongs to as of a commit (by default, the start of history).
+
+        Renames made by that commit itself are already applied to the paths
+        it writes, so only later ones are followed.
+        """
+        return self.resolve_at(path, self.positions.get(commit_hash, 0))
+
+    def former_paths(self):
+        """{lineage: [earlier paths, oldest first]} for every file that was renamed."""
+        renames = sorted(
+            (position, old_path, new_path)
+            for old_path, entries in self.moves.items()
+            for position, new_path in entries
+        )
+        former = defaultdict(list)
+        for position, old_path, new_path in renames:
+            name = self.resolve_at(new_path, position)
+            if old_path != name and old_path not in former[name]:
+                former[name].append(old_path)
+        return dict(former)
+
+    def resolve_at(self, path, position):
+        """resolve() for a position in history rather than a commit."""
+        while path in self.moves:
+            i = bisect_right(self.move_positions[path], position)
+            if i == len(self.move_positions[path]):
+                break
+            position, path = self.moves[path][i]
+        return path
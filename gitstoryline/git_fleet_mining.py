@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Fleet Mining
+=========================
+Mines many local repositories in one run. Both mining scripts are run for
+each repository as child processes (with --repo and --output) on a bounded
+pool of workers, and every repository gets its own output directory:
+
+    <output>/
+        fleet_index.json            every repository's status, timings and summary
+        <name>/timeline_data.json
+        <name>/race_data.json
+        <name>/history_index.db
+        <name>/mining.log           what both scripts printed
+
+Repositories are started largest first (by commit count), so a giant one
+starts early and only ever holds one worker while the small ones go
+through the others. A repository that fails or runs past --timeout is
+recorded in the index, and the rest of the fleet carries on. The index
+is rewritten as each repository finishes, so a long run can be followed.
+
+Usage:
+    python git_fleet_mining.py REPO [REPO ...] [--repos-file FILE] [--output DIR]
+                               [--workers N] [--timeout SECONDS] [--incremental]
+                               [--backend NAME] [--race-workers N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from git_backends import BACKENDS
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+OUTPUT_DIR = SCRIPT_DIR / "fleet"
+INDEX_FILE_NAME = "fleet_index.json"
+LOG_FILE_NAME = "mining.log"
+MINERS = [("timeline", "git_timeline_mining.py"), ("race", "git_race_mining.py")]
+ERROR_TAIL_LINES = 20  # Lines of a failed run's log kept in the index
+
+
+def read_repo_list(repos, repos_file=None):
+    """Repository paths from the command line and a file of one path per line (# comments)."""
+    paths = list(repos)
+    if repos_file:
+        for line in Path(repos_file).read_text().splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                paths.append(line)
+    unique = {}
+    for path in paths:
+        path = Path(path).expanduser().resolve()
+        unique.setdefault(path, None)
+    return list(unique)
+
+
+def output_names(repos):
+    """A distinct output directory name for every repository, from its directory name."""
+    names = {}
+    taken = set()
+    for repo in repos:
+        name = repo.name or "repo"
+        suffix = 2
+        while name in taken:
+            name = f"{repo.name}-{suffix}"
+            suffix += 1
+        taken.add(name)
+        names[repo] = name
+    return names
+
+
+def count_commits(repo):
+    """Commits reachable from any ref, used to start the largest repositories first (0 if unknown)."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-list", "--count", "--all"], cwd=repo, capture_output=True, text=True
+        )
+    except OSError:
+        return 0
+    if result.returncode != 0:
+        return 0
+    return int(result.stdout.strip() or 0)
+
+
+def read_summary(out_dir):
+    """The summary sections of a repository's timeline and race output."""
+    summary = {}
+    timeline_file = out_dir / "timeline_data.json"
+    race_file = out_dir / "race_data.json"
+    if timeline_file.exists():
+        with open(timeline_file) as f:
+            summary["timeline"] = json.load(f).get("summary")
+    if race_file.exists():
+        with open(race_file) as f:
+            race = json.load(f)
+        summary["race"] = {**race.get("summary", {}), "totalFrames": race.get("config", {}).get("totalFrames")}
+    return summary
+
+
+def log_tail(log_file, lines=ERROR_TAIL_LINES):
+    if not log_file.exists():
+        return ""
+    return "\n".join(log_file.read_text(errors="replace").splitlines()[-lines:])
+
+
+def mine_repo(repo, out_dir, args):
+    """Run both mining scripts for one repository. Returns its fleet index entry."""
+    entry = {
+        "name": out_dir.name,
+        "path": str(repo),
+        "output": out_dir.name,
+        "status": "ok",
+        "seconds": 0.0,
+        "stages": {},
+        "error": None,
+        "summary": {}
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+    log_file = out_dir / LOG_FILE_NAME
+    started = time.perf_counter()
+    with open(log_file, "w") as log:
+        for stage, script in MINERS:
+            if entry["status"] != "ok":
+                break
+            cmd = [sys.executable, str(SCRIPT_DIR / script), "--repo", str(repo), "--output", str(out_dir),
+                   "--backend", args.backend]
+            if args.incremental:
+                cmd.append("--incremental")
+            if stage == "race":
+                cmd += ["--workers", str(args.race_workers)]
+            remaining = None
+            if args.timeout:
+                remaining = args.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    entry["status"] = "timeout"
+                    entry["error"] = f"Passed the {args.timeout:g}s timeout before {stage} mining"
+                    break
+            log.write(f"$ {' '.join(cmd)}\n")
+            log.flush()
+            stage_started = time.perf_counter()
+            try:
+                result = subprocess.run(cmd, cwd=SCRIPT_DIR, stdout=log, stderr=subprocess.STDOUT,
+                                        timeout=remaining)
+            except subprocess.TimeoutExpired:
+                entry["status"] = "timeout"
+                entry["error"] = f"{stage} mining passed the {args.timeout:g}s timeout"
+            else:
+                if result.returncode != 0:
+                    entry["status"] = "failed"
+            entry["stages"][stage] = round(time.perf_counter() - stage_started, 3)
+    entry["seconds"] = round(time.perf_counter() - started, 3)
+    if entry["status"] == "failed" and entry["error"] is None:
+        entry["error"] = log_tail(log_file)
+    if entry["status"] == "ok":
+        try:
+            entry["summary"] = read_summary(out_dir)
+        except (OSError, ValueError) as e:
+            entry["error"] = f"Could not read the output summary: {e}"
+    return entry
+
+
+def write_index(output_dir, entries, workers, started):
+    """Write the fleet index (through a temporary file, so readers never see half of it)."""
+    statuses = [entry["status"] for entry in entries.values()]
+    index = {
+        "generatedAt": datetime.now().isoformat(),
+        "workers": workers,
+        "totalSeconds": round(time.perf_counter() - started, 3),
+        "summary": {
+            "repositories": len(entries),
+            "finished": sum(status != "pending" for status in statuses),
+            "ok": statuses.count("ok"),
+            "failed": statuses.count("failed"),
+            "timeout": statuses.count("timeout")
+        },
+        "repositories": sorted(entries.values(), key=lambda entry: entry["name"])
+    }
+    index_file = output_dir / INDEX_FILE_NAME
+    temp_file = index_file.with_suffix(".tmp")
+    with open(temp_file, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_file, index_file)
+    return index
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mine many git repositories for GitStoryline.")
+    parser.add_argument("repos", nargs="*", metavar="REPO", help="Local repository paths")
+    parser.add_argument(
+        "--repos-file", metavar="FILE",
+        help="File listing repository paths, one per line (# starts a comment)"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=OUTPUT_DIR, metavar="DIR",
+        help=f"Directory for the fleet index and one output directory per repository "
+             f"(default: {OUTPUT_DIR.name}/ next to this script)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Repositories mined at the same time (default: all cores)"
+    )
+    parser.add_argument(
+        "--timeout", type=float, metavar="SECONDS",
+        help="Give up on a repository after this long and record it as timed out"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Pass --incremental to both scripts, so repositories mined before only index new commits"
+    )
+    parser.add_argument(
+        "--backend", choices=["auto", *BACKENDS], default="subprocess",
+        help="How git is read (see git_timeline_mining.py --help)"
+    )
+    parser.add_argument(
+        "--race-workers", type=int, default=1,
+        help="Frame-building processes per race run (default: 1, since repositories already run in parallel)"
+    )
+    args = parser.parse_args(argv)
+    if not args.repos and not args.repos_file:
+        parser.error("give at least one REPO or --repos-file")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    print("🚢 GitStoryline Fleet Mining")
+    print("=" * 50)
+
+    repos = read_repo_list(args.repos, args.repos_file)
+    names = output_names(repos)
+    output_dir = args.output.resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"\n📏 Sizing {len(repos)} repositories...")
+    commit_counts = {repo: count_commits(repo) for repo in repos}
+    order = sorted(repos, key=lambda repo: -commit_counts[repo])
+    print(f"   {sum(commit_counts.values()):,} commits in total, largest first")
+
+    entries = {
+        repo: {"name": names[repo], "path": str(repo), "output": names[repo], "status": "pending"}
+        for repo in repos
+    }
+    workers = max(1, min(args.workers, len(repos)))
+    print(f"\n⛏️  Mining with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for repo in order:
+            if commit_counts[repo]:
+                futures[pool.submit(mine_repo, repo, output_dir / names[repo], args)] = repo
+            else:
+                entries[repo].update(status="failed", error="Not a git repository with commits", commits=0)
+                print(f"   ❌ {names[repo]}: not a git repository with commits")
+        for done, future in enumerate(as_completed(futures), 1):
+            repo = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {**entries[repo], "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            entry["commits"] = commit_counts[repo]
+            entries[repo] = entry
+            icon = {"ok": "✅", "timeout": "⏱️ "}.get(entry["status"], "❌")
+            print(f"   {icon} [{done}/{len(futures)}] {entry['name']}: {entry['status']} "
+                  f"in {entry.get('seconds', 0):.1f}s ({commit_counts[repo]:,} commits)")
+            write_index(output_dir, entries, workers, started)
+
+    index = write_index(output_dir, entries, workers, started)
+    summary = index["summary"]
+    print("\n✅ Done! Fleet mining complete.")
+    print(f"   Index: {output_dir / INDEX_FILE_NAME}")
+    print(f"   {summary['ok']} ok, {summary['failed']} failed, {summary['timeout']} timed out "
+          f"in {index['totalSeconds']:.1f}s")
+    for entry in index["repositories"]:
+        if entry["status"] != "ok":
+            reason = (entry["error"] or entry["status"]).splitlines()[-1]
+            print(f"   ❌ {entry['name']}: {reason}")
+
+    return 1 if summary["ok"] < summary["repositories"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+GitStoryline History Index
+==========================
+Shared on-disk index of the repository history, stored as a local SQLite
+file. Both mining scripts read their facts (commits, file changes, blob ids,
+line counts, the HEAD tree) from it instead of re-querying git, so history is
+mined once per repository state. Analysts can run ad-hoc SQL against the
+same file.
+
+The index is filled from one walk over the history, read through a git
+backend (see git_backends.py). Later updates only mine commits added since
+the recorded ref tips; if history was rewritten the index is rebuilt.
+
+Tables:
+    commits     one row per commit. `batch`/`position` keep `git log` order:
+                newer batches first, then stream position within a batch.
+    changes     one row per file change, rename-detected (-M), diffed against
+                the first parent (merges included, flagged in commits).
+                `display_path` is the path as printed by --numstat.
+    head_tree   every blob in the HEAD tree
+    blob_lines  line counts by blob id, filled on demand
+    meta        index version, ref tips and HEAD
+
+Usage:
+    from git_history_index import HistoryIndex
+
+    index = HistoryIndex(OUTPUT_FILE.parent / "history_index.db", REPO_PATH)
+    index.update()
+    rows = index.query("SELECT hash, author_date FROM commits")
+    for path, blob_id in index.iter_query("SELECT path, blob FROM head_tree"):
+        ...
+    lines = index.count_blob_lines(blob_id)
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+from git_backends import SubprocessBackend
+from git_commit_store import release_commit_store
+
+INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS commits (
+    hash TEXT PRIMARY KEY,
+    batch INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    parents TEXT NOT NULL,
+    first_parent TEXT,
+    is_merge INTEGER NOT NULL,
+    author TEXT,
+    author_date TEXT NOT NULL,
+    author_day TEXT NOT NULL,
+    author_month TEXT NOT NULL,
+    commit_time INTEGER NOT NULL,
+    commit_day TEXT NOT NULL,
+    subject TEXT,
+    message TEXT
+);
+CREATE TABLE IF NOT EXISTS changes (
+    commit_hash TEXT NOT NULL REFERENCES commits(hash),
+    ordinal INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    old_path TEXT,
+    path TEXT NOT NULL,
+    old_blob TEXT,
+    new_blob TEXT,
+    insertions INTEGER,
+    deletions INTEGER,
+    display_path TEXT NOT NULL,
+    PRIMARY KEY (commit_hash, ordinal)
+);
+CREATE TABLE IF NOT EXISTS head_tree (
+    path TEXT PRIMARY KEY,
+    blob TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blob_lines (
+    blob TEXT PRIMARY KEY,
+    lines INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commits_author_date ON commits(author_date);
+CREATE INDEX IF NOT EXISTS commits_commit_time ON commits(commit_time);
+CREATE INDEX IF NOT EXISTS commits_order ON commits(batch, position);
+CREATE INDEX IF NOT EXISTS changes_path ON changes(path);
+CREATE INDEX IF NOT EXISTS changes_old_path ON changes(old_path);
+"""
+
+# Commit order used by `git log`: newest batch first, stream order within it
+LOG_ORDER = "ORDER BY c.batch DESC, c.position ASC"
+
+class IndexedLineCounts:
+    """Line-count cache backed by the index's blob_lines table.
+
+    get() and put() take blob ids; hits and misses are counted for the
+    timeline's summary.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.hits = 0
+        self.misses = 0
+        self.pending = {}
+
+    def get(self, blob_id):
+        lines = self.pending.get(blob_id)
+        if lines is None:
+            row = self.connection.execute(
+                "SELECT lines FROM blob_lines WHERE blob = ?", (blob_id,)
+            ).fetchone()
+            lines = row[0] if row else None
+        if lines is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return lines
+
+    def put(self, blob_id, lines):
+        self.pending[blob_id] = lines
+
+    def save(self):
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO blob_lines (blob, lines) VALUES (?, ?)",
+                self.pending.items()
+            )
+        self.pending = {}
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.connection.execute("SELECT COUNT(*) FROM blob_lines").fetchone()[0],
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class HistoryIndex:
+    """The mined history of one repository, stored in a SQLite file."""
+
+    def __init__(self, path, repo_path, backend=None):
+        self.path = Path(path)
+        self.repo_path = Path(repo_path)
+        self.backend = backend or SubprocessBackend(self.repo_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        # Readers don't block the writer (or each other) when stages run concurrently
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        if self.get_meta("version") != INDEX_VERSION:
+            self.clear(keep_line_counts=False)
+        self.line_counts = IndexedLineCounts(self.connection)
+
+    def get_meta(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value))
+        )
+
+    def clear(self, keep_line_counts=True):
+        """Drop all mined history. Line counts stay valid, being keyed by blob id."""
+        with self.connection:
+            for table in ("commits", "changes", "head_tree", "meta"):
+                self.connection.execute(f"DELETE FROM {table}")
+            if not keep_line_counts:
+                self.connection.execute("DELETE FROM blob_lines")
+            self.set_meta("version", INDEX_VERSION)
+
+    def update(self, rebuild=False):
+        """Bring the index up to date with the repository's refs.
+
+        Only commits added since the last update are mined, unless `rebuild`
+        is set or history was rewritten. Returns the number of new commits.
+        """
+        tips = self.backend.ref_tips()
+        known_tips = self.get_meta("tips")
+        if rebuild or known_tips is None or self.backend.is_rewritten(known_tips):
+            self.clear()
+            added = self._mine() if tips else 0
+        elif known_tips == tips:
+            added = 0
+        else:
+            added = self._mine(exclude=known_tips)
+
+        head = self.backend.head()
+        with self.connection:
+            if head != self.get_meta("head") or added:
+                self.connection.execute("DELETE FROM head_tree")
+                if head:
+                    self.connection.executemany(
+                        "INSERT OR REPLACE INTO head_tree (path, blob) VALUES (?, ?)",
+                        self.backend.ls_tree(head)
+                    )
+            self.set_meta("tips", tips)
+            self.set_meta("head", head)
+        return added
+
+    def _mine(self, exclude=None):
+        batch = self.connection.execute("SELECT COALESCE(MAX(batch), 0) + 1 FROM commits").fetchone()[0]
+        added = 0
+        with self.connection:
+            for position, (commit, changes) in enumerate(self.backend.log(exclude)):
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO commits (hash, batch, position, parents, first_parent, "
+                    "is_merge, author, author_date, author_day, author_month, commit_time, "
+                    "commit_day, subject, message) "
+                    "VALUES (:hash, :batch, :position, :parents, :first_parent, :is_merge, "
+                    ":author, :author_date, :author_day, :author_month, :commit_time, "
+                    ":commit_day, :subject, :message)",
+                    {**commit, "batch": batch, "position": position}
+                )
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO changes (commit_hash, ordinal, status, old_path, path, "
+                    "old_blob, new_blob, insertions, deletions, display_path) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(commit["hash"], *change) for change in changes]
+                )
+                added += 1
+        return added
+
+    def count_blob_lines(self, blob_id):
+        """Count newlines in a blob, matching `wc -l`, memoized in blob_lines."""
+        lines = self.line_counts.get(blob_id)
+        if lines is None:
+            data = self.backend.read_blob(blob_id)
+            lines = data.count(b"\n") if data is not None else 0
+            if data is not None:
+                self.line_counts.put(blob_id, lines)
+        return lines
+
+    def query(self, sql, params=()):
+        """Run a read query and return all rows."""
+        return self.connection.execute(sql, params).fetchall()
+
+    def iter_query(self, sql, params=()):
+        """Run a read query and return a cursor that reads rows as they are iterated."""
+        return self.connection.execute(sql, params)
+
+    def head(self):
+        return self.get_meta("head")
+
+    def tips(self):
+        return self.get_meta("tips", [])
+
+    def commits_since(self, tips):
+        """Hashes of indexed commits not reachable from `tips`."""
+        parents = dict(self.query("SELECT hash, parents FROM commits"))
+        seen = set()
+        stack = [tip for tip in tips if tip in parents]
+        while stack:
+            commit_hash = stack.pop()
+            if commit_hash in seen:
+                continue
+            seen.add(commit_hash)
+            stack.extend(p for p in parents.get(commit_hash, "").split() if p in parents)
+        return set(parents) - seen
+
+    def first_parent_chain(self, head=None, stop=None):
+        """(hash, commit_day) along HEAD's first-parent chain, oldest first.
+
+        The walk ends before `stop` when given.
+        """
+        commits = {
+            commit_hash: (first_parent, commit_day)
+            for commit_hash, first_parent, commit_day
+            in self.query("SELECT hash, first_parent, commit_day FROM commits")
+        }
+        chain = []
+        commit_hash = head or self.head()
+        while commit_hash in commits and commit_hash != stop:
+            first_parent, commit_day = commits[commit_hash]
+            chain.append((commit_hash, commit_day))
+            commit_hash = first_parent
+        chain.reverse()
+        return chain
+
+    def close(self):
+        release_commit_store(self)
+        self.line_counts.save()
+        self.connection.close()
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
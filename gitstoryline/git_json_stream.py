@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+GitStoryline JSON Streaming
+===========================
+Writes JSON whose largest parts are produced while it is being written, so
+a miner never holds its whole output in memory. The text is the same as
+`json.dump(value, f, indent=indent)` would write for the materialized value.
+
+    generators / iterators   written as arrays, one item at a time
+    StreamedObject(pairs)    written as an object from (key, value) pairs
+    dicts holding either     written key by key
+    anything else            encoded whole by the json module
+
+Usage:
+    from git_json_stream import StreamedObject, write_json
+
+    data = {"commits": iter_commits(index), "files": StreamedObject(iter_file_histories(index))}
+    with open(OUTPUT_FILE, "w") as f:
+        write_json(f, data, indent=2)
+"""
+
+import json
+from collections.abc import Iterator
+
+WRITE_BUFFER_CHARS = 1 << 16  # Chunks are gathered into writes of about this size
+
+
+class StreamedObject:
+    """A JSON object whose (key, value) pairs come from an iterable, read as it is written."""
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+
+def is_streamed(value):
+    return isinstance(value, (StreamedObject, Iterator))
+
+
+def iter_json(value, indent=2, level=0):
+    """Encode `value` as JSON text in chunks, streaming the parts described above."""
+    if isinstance(value, StreamedObject):
+        yield from iter_container(value.pairs, True, indent, level)
+    elif isinstance(value, Iterator):
+        yield from iter_container(value, False, indent, level)
+    elif isinstance(value, dict) and any(is_streamed(item) for item in value.values()):
+        yield from iter_container(value.items(), True, indent, level)
+    else:
+        text = json.dumps(value, indent=indent)
+        # json never writes a raw newline inside a string, so this only re-indents
+        yield text.replace("\n", "\n" + " " * (indent * level)) if indent and level else text
+
+
+def iter_container(items, is_object, indent, level):
+    opening, closing = "{}" if is_object else "[]"
+    if indent is None:
+        separator, start, end = ", ", opening, closing
+    else:
+        separator = ",\n" + " " * (indent * (level + 1))
+        start = opening + separator[1:]
+        end = "\n" + " " * (indent * level) + closing
+    empty = True
+    for item in items:
+        yield start if empty else separator
+        empty = False
+        if is_object:
+            key, item = item
+            yield json.dumps(key) + ": "
+        yield from iter_json(item, indent, level + 1)
+    yield opening + closing if empty else end
+
+
+def write_json(f, value, indent=2):
+    """Write `value` to a text file as JSON, streaming generators and StreamedObjects."""
+    buffer = []
+    size = 0
+    for chunk in iter_json(value, indent):
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_BUFFER_CHARS:
+            f.write("".join(buffer))
+            buffer = []
+            size = 0
+    f.write("".join(buffer))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Mining State
+=========================
+Shared helper for incremental mining. The history index and the race miner
+record the commit set they last mined (the tips of every ref). On the next
+incremental run only commits reachable from the current refs but not from
+those tips are mined and merged into the previous results.
+
+If any recorded tip is no longer reachable from the current refs (force push,
+rebase, deleted branch), history was rewritten and the caller must fall back
+to a full rebuild.
+"""
+
+import json
+import os
+import subprocess
+from pathlib import Path
+
+from git_profiling import record_git_process
+
+STATE_VERSION = 1
+
+
+def _git(repo_path, args):
+    result = subprocess.run(
+        ["git", *args], cwd=repo_path, capture_output=True, text=True
+    )
+    record_git_process(len(result.stdout))
+    return result.returncode, result.stdout.strip()
+
+
+def get_ref_tips(repo_path):
+    """Get the commit each ref currently points at (what `--all` walks from)."""
+    _, output = _git(repo_path, ["rev-list", "--no-walk", "--all"])
+    return sorted(set(line for line in output.split("\n") if line))
+
+
+def history_was_rewritten(repo_path, tips):
+    """Check whether any previously mined commit is unreachable from the current refs."""
+    if not tips:
+        return True
+    code, output = _git(repo_path, ["rev-list", "--count", *tips, "--not", "--all"])
+    if code != 0:
+        return True  # A recorded tip no longer exists
+    try:
+        return int(output) > 0
+    except ValueError:
+        return True
+
+
+def new_commit_revs(tips):
+    """Revision arguments selecting the commits added since `tips` were mined."""
+    return "--all --not " + " ".join(tips)
+
+
+def load_mining_state(path, kind):
+    """Load a state file, or None if it is missing, unreadable or of another kind."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != STATE_VERSION or state.get("kind") != kind:
+        return None
+    return state
+
+
+def save_mining_state(path, kind, state):
+    """Write a state file atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"version": STATE_VERSION, "kind": kind, **state}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def load_previous_output(path):
+    """Load the JSON written by the previous run, or None."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
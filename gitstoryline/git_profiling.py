@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Profiling
+======================
+Support for the mining scripts' `--profile` mode. Every stage of a run is
+wrapped in `profile_stage(name)`; with profiling on, each stage records
+
+    seconds          wall time
+    gitProcesses     git subprocesses started
+    gitBytesRead     bytes of git output read
+    peakRssKb        peak resident memory of the script so far
+    childPeakRssKb   peak resident memory of any finished child process
+
+and the report is written as JSON. Nested stages are named "outer/inner".
+A cProfile dump of the Python side can be written next to it and opened with
+`python -m pstats <file>` or snakeviz.
+
+Git call sites report to the module-level counters through
+record_git_process() / record_git_bytes(); counting is always on and costs
+next to nothing, the stage bookkeeping only runs while profiling.
+
+Usage:
+    from git_profiling import finish_profiling, profile_stage, start_profiling
+
+    start_profiling("git_timeline_mining.py", "timeline_profile.json")
+    with profile_stage("get_all_commits"):
+        commits = get_all_commits(index)
+    finish_profiling()
+"""
+
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class GitCounters:
+    """Running totals of git work done by this process."""
+
+    def __init__(self):
+        self.processes = 0
+        self.bytes_read = 0
+
+
+GIT_COUNTERS = GitCounters()
+
+
+def record_git_process(bytes_read=0):
+    """Count one git subprocess and the output read from it."""
+    GIT_COUNTERS.processes += 1
+    GIT_COUNTERS.bytes_read += bytes_read
+
+
+def record_git_bytes(bytes_read):
+    """Count output read from a long-lived git process or in-process backend."""
+    GIT_COUNTERS.bytes_read += bytes_read
+
+
+def peak_rss_kb(children=False):
+    """Peak resident set size in KiB, or None where unsupported."""
+    if not children:
+        # Linux carries ru_maxrss over fork and exec, so a script started from a
+        # big process would report that process's peak; VmHWM starts afresh
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class Profiler:
+    """Collects per-stage measurements for one script run."""
+
+    def __init__(self, script, report_path, cprofile_path=None):
+        self.script = script
+        self.report_path = Path(report_path)
+        self.cprofile_path = Path(cprofile_path) if cprofile_path else None
+        self.stages = []  # (start order, measurements)
+        self.stack = []
+        self.started_stages = 0
+        self.started = time.perf_counter()
+        self.start_processes = GIT_COUNTERS.processes
+        self.start_bytes = GIT_COUNTERS.bytes_read
+        self.cprofile = cProfile.Profile() if self.cprofile_path else None
+        if self.cprofile:
+            self.cprofile.enable()
+
+    @contextmanager
+    def stage(self, name):
+        self.stack.append(name)
+        full_name = "/".join(self.stack)
+        order = self.started_stages
+        self.started_stages += 1
+        started = time.perf_counter()
+        processes = GIT_COUNTERS.processes
+        bytes_read = GIT_COUNTERS.bytes_read
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            self.stages.append((order, {
+                "name": full_name,
+                "depth": len(self.stack),
+                "seconds": round(time.perf_counter() - started, 4),
+                "gitProcesses": GIT_COUNTERS.processes - processes,
+                "gitBytesRead": GIT_COUNTERS.bytes_read - bytes_read,
+                "peakRssKb": peak_rss_kb(),
+                "childPeakRssKb": peak_rss_kb(children=True),
+            }))
+
+    def record(self, name, seconds):
+        """Record a stage timed by the caller, nested under the current one.
+
+        For stages that ran concurrently with others, whose git work and
+        memory can't be told apart, so only their wall time is kept.
+        """
+        order = self.started_stages
+        self.started_stages += 1
+        self.stages.append((order, {
+            "name": "/".join([*self.stack, name]),
+            "depth": len(self.stack),
+            "seconds": round(seconds, 4),
+            "gitProcesses": None,
+            "gitBytesRead": None,
+            "peakRssKb": None,
+            "childPeakRssKb": None,
+        }))
+
+    def finish(self):
+        """Write the report (and cProfile dump) and return the report."""
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile_path.parent.mkdir(parents=True, exist_ok=True)
+            self.cprofile.dump_stats(self.cprofile_path)
+
+        report = {
+            "script": self.script,
+            "generatedAt": datetime.now().isoformat(),
+            "totalSeconds": round(time.perf_counter() - self.started, 4),
+            "gitProcesses": GIT_COUNTERS.processes - self.start_processes,
+            "gitBytesRead": GIT_COUNTERS.bytes_read - self.start_bytes,
+            "peakRssKb": peak_rss_kb(),
+            "childPeakRssKb": peak_rss_kb(children=True),
+            "cprofile": str(self.cprofile_path) if self.cprofile_path else None,
+            # Stages are recorded as they end; report them in start order
+            "stages": [entry for _, entry in sorted(self.stages, key=lambda s: s[0])],
+        }
+        self.report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+_profiler = None
+
+
+def start_profiling(script, report_path, cprofile_path=None):
+    """Turn on stage profiling for the rest of the run."""
+    global _profiler
+    _profiler = Profiler(script, report_path, cprofile_path)
+    return _profiler
+
+
+@contextmanager
+def profile_stage(name):
+    """Measure a stage of the run; does nothing unless profiling is on."""
+    if _profiler is None:
+        yield
+        return
+    with _profiler.stage(name):
+        yield
+
+
+def record_stage(name, seconds):
+    """Record a stage that was timed elsewhere; does nothing unless profiling is on."""
+    if _profiler is not None:
+        _profiler.record(name, seconds)
+
+
+def finish_profiling():
+    """Write the report, print a summary and turn profiling off. No-op if it is off."""
+    global _profiler
+    if _profiler is None:
+        return None
+    profiler, _profiler = _profiler, None
+    report = profiler.finish()
+
+    print(f"\n⏱️  Profile: {profiler.report_path}")
+    print(f"   {'stage':<40} {'seconds':>9} {'git procs':>10} {'git bytes':>12} {'peak RSS':>10}")
+    for entry in report["stages"]:
+        label = "  " * entry["depth"] + entry["name"].split("/")[-1]
+        rss = f"{entry['peakRssKb'] // 1024} MiB" if entry["peakRssKb"] is not None else "-"
+        processes = entry["gitProcesses"] if entry["gitProcesses"] is not None else "-"
+        bytes_read = f"{entry['gitBytesRead']:,}" if entry["gitBytesRead"] is not None else "-"
+        print(f"   {label:<40} {entry['seconds']:>9.3f} {processes:>10} {bytes_read:>12} {rss:>10}")
+    print(f"   {'total':<40} {report['totalSeconds']:>9.3f} {report['gitProcesses']:>10} "
+          f"{report['gitBytesRead']:>12,}")
+    if report["cprofile"]:
+        print(f"   cProfile dump: {report['cprofile']}")
+    return report
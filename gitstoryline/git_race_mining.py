@@ -4,24 +4,68 @@ GitStoryline v2 - Bar Chart Race Data Mining
 =============================================
 Generates frame-by-frame data for racing bar chart animation.
 Tracks file sizes over time including deleted files.
+History is read from the shared history index (see git_history_index.py),
+and the passes over every change walk it as columns (see git_commit_store.py).
+Renamed files race as one file under their latest path (see git_file_lineage.py).
 
 Usage:
-    python git_race_mining.py
+    python git_race_mining.py [--incremental] [--workers N] [--backend NAME]
+                              [--sampling adaptive|interval] [--max-frames N]
+                              [--frame-format full|delta] [--repo PATH] [--output DIR]
 
 Output:
     gitstoryline/race_data.json
+
+Any local repository can be mined with --repo, and its output written to
+another directory with --output (see git_fleet_mining.py for many at once).
 """
 
-import subprocess
+import argparse
+import re
 import json
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from collections import defaultdict
 from pathlib import Path
 
+from git_backends import BACKENDS, get_backend
+from git_commit_store import load_commit_store, release_commit_store
+from git_file_lineage import FileLineage
+from git_history_index import HistoryIndex
+from git_profiling import finish_profiling, profile_stage, start_profiling
+from git_mining_state import (
+    load_mining_state,
+    load_previous_output,
+    save_mining_state,
+)
+
 # Configuration
 REPO_PATH = Path(__file__).parent.parent.resolve()
 OUTPUT_FILE = REPO_PATH / "gitstoryline" / "race_data.json"
+HISTORY_INDEX_FILE = OUTPUT_FILE.parent / "history_index.db"
+PROFILE_FILE = OUTPUT_FILE.parent / "race_profile.json"
+STATE_FILE = OUTPUT_FILE.parent / ".race_mining_state.json"
 TOP_N_FILES = 56  # Files to show in the race at any time
+KEYFRAME_INTERVAL = 10  # Frames between keyframes in the delta frame format
+EVENT_CODES = {'enter': 0, 'exit': 1, 'rank': 2}  # Rank event types in the delta frame format
+
+# Adaptive frame sampling: a date becomes a frame when, since the last frame,
+# a file entered or left the top N, at least this share of the top-N
+# positions changed hands, or total lines moved by this fraction.
+# Thresholds are scaled up to fit the frame budget.
+FRAME_BUDGET = 100
+RANK_CHANGE_THRESHOLD = 0.1
+LINES_CHANGE_THRESHOLD = 0.02
+SCALE_TOLERANCE = 0.01  # The threshold scale is searched for to within this fraction
+
+# Trailing windows (in days) for the commit velocity series in each frame
+VELOCITY_WINDOWS = {
+    'weeklyCommits': 7,
+    'monthlyCommits': 30,
+    'quarterlyCommits': 90,
+}
+TECH_DEBT_PATTERN = re.compile(r'tech debt|compliance', re.IGNORECASE)
 
 # File categories for coloring
 FILE_CATEGORIES = {
@@ -38,12 +82,28 @@ FILE_CATEGORIES = {
 }
 
 
-def run_git_command(cmd):
-    """Run a git command and return output as string."""
-    result = subprocess.run(
-        cmd, cwd=REPO_PATH, capture_output=True, text=True, shell=True
-    )
-    return result.stdout.strip()
+def configure_paths(repo_path, output_dir=None):
+    """Mine another repository (--repo), writing to `output_dir` (--output).
+
+    The output goes to the repository's gitstoryline/ directory unless
+    another is given.
+    """
+    global REPO_PATH, OUTPUT_FILE, HISTORY_INDEX_FILE, PROFILE_FILE, STATE_FILE
+    REPO_PATH = Path(repo_path).resolve()
+    output_dir = Path(output_dir).resolve() if output_dir else REPO_PATH / "gitstoryline"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    OUTPUT_FILE = output_dir / "race_data.json"
+    HISTORY_INDEX_FILE = output_dir / "history_index.db"
+    PROFILE_FILE = output_dir / "race_profile.json"
+    STATE_FILE = output_dir / ".race_mining_state.json"
+
+
+def display_path(path):
+    """A path relative to the repository when it lies inside it."""
+    try:
+        return path.relative_to(REPO_PATH)
+    except ValueError:
+        return path
 
 
 def get_file_category(file_path):
@@ -55,231 +115,853 @@ def get_file_category(file_path):
     return 'other', '#94a3b8'
 
 
-def get_all_dates_with_commits():
-    """Get all unique dates that have commits."""
-    cmd = 'git log --all --pretty=format:"%ad" --date=short | sort -u'
-    output = run_git_command(cmd)
-    return sorted(output.split('\n'))
+def get_all_dates_with_commits(index, commits=None):
+    """Get all unique dates that have commits, optionally only for a set of commits."""
+    store = load_commit_store(index)
+    rows = range(len(store)) if commits is None else store.rows_of(commits)
+    return sorted({store.strings[store.days[row]] for row in rows})
+
 
+def get_all_files_ever(index, commits=None, diff_filter="A", renames=True, lineage=None):
+    """Get all files that ever existed in the repo.
 
-def get_file_size_at_date(file_path, date):
-    """Get the line count of a file at a specific date."""
-    # Get the last commit on or before this date for this file
-    cmd = f'git log -1 --until="{date} 23:59:59" --format="%H" -- "{file_path}"'
-    commit = run_git_command(cmd)
+    Mirrors `git log --diff-filter=<diff_filter> --name-only`, optionally only
+    over a set of commits; with renames=False a rename counts as a delete of
+    the old path and an add of the new one. With a FileLineage, paths are
+    resolved to the lineage they belong to.
+    """
+    store = load_commit_store(index)
+    rows = None if commits is None else store.rows_of(commits)
     
-    if not commit:
-        return 0
+    files = set()
+    for commit in store.commits(merges=False, rows=rows):
+        for change in commit.changes():
+            status = change.status
+            if status == 'R' and not renames:
+                candidates = [p for s, p in (('D', change.old_path), ('A', change.path)) if s in diff_filter]
+            else:
+                candidates = [change.path] if status in diff_filter else []
+            if lineage:
+                candidates = [lineage.resolve(p, commit.hash) for p in candidates]
+            for line in candidates:
+                if line.endswith('.js') or line.endswith('.css') or line.endswith('.html') or line.endswith('.md'):
+                    files.add(line)
+    
+    return files
+
+
+def get_file_lifecycles(index, lineage, files=None):
+    """Get the lifetimes of every file in one pass over the history.
+
+    Files are lineages (see git_file_lineage.py), so renames within a file's
+    history neither end nor start a lifetime. Walking the changes oldest
+    first (and in git's order within a commit), an add (or any change to a
+    file not alive) starts a lifetime and a delete ends it, so a file can be
+    created, deleted and re-created.
+    Whether a file still exists is read from the HEAD tree rather than the
+    working directory. Only `files` are returned when given.
+
+    Returns {file: (lifetimes, exists)} with lifetimes a list of
+    [created, deleted] author days, deleted being None while alive. A file
+    gone from HEAD without a recorded delete keeps an open lifetime.
+    """
+    store = load_commit_store(index)
+    head_paths = {path for (path,) in index.query('SELECT path FROM head_tree')}
     
-    # Get file content at that commit
-    cmd = f'git show {commit}:"{file_path}" 2>/dev/null | wc -l'
-    output = run_git_command(cmd)
+    lifetimes = defaultdict(list)
+    for commit in store.commits(merges=False):
+        day = commit.day
+        for change in commit.changes():
+            name = lineage.resolve(change.path, commit.hash)
+            if files is not None and name not in files:
+                continue
+            spans = lifetimes[name]
+            alive = spans and spans[-1][1] is None
+            if change.status == 'D':
+                if alive:
+                    spans[-1][1] = day
+            elif not alive:
+                spans.append([day, None])
     
-    try:
-        return int(output.strip())
-    except ValueError:
-        return 0
+    lifecycles = {}
+    for name, spans in lifetimes.items():
+        exists = name in head_paths
+        if exists and spans[-1][1] is not None:
+            spans[-1][1] = None  # Deleted on a branch HEAD doesn't have
+        lifecycles[name] = (spans, exists)
+    return lifecycles
 
 
-def get_all_files_ever():
-    """Get all files that ever existed in the repo."""
-    # Get all files that were ever added
-    cmd = 'git log --all --diff-filter=A --name-only --pretty=format:"" | sort -u'
-    output = run_git_command(cmd)
+def get_file_infos(index, lineage, files, former_paths=None):
+    """Get lifecycle and display category for a set of files, see get_file_lifecycles.
+
+    `created` is the start of a file's first lifetime; `deleted` the end of
+    its last one if it is gone from HEAD, '' if no delete was recorded and
+    None if it exists.
+    """
+    former_paths = former_paths or {}
+    lifecycles = get_file_lifecycles(index, lineage, files)
     
-    files = set()
-    for line in output.split('\n'):
-        line = line.strip()
-        if line and (line.endswith('.js') or line.endswith('.css') or line.endswith('.html') or line.endswith('.md')):
-            files.add(line)
+    file_info = {}
+    for file_path in files:
+        lifetimes, exists = lifecycles.get(file_path, ([], False))
+        deleted = None
+        if not exists:
+            deleted = (lifetimes[-1][1] if lifetimes else None) or ''
+        category, color = get_file_category(file_path)
+        info = {
+            'created': lifetimes[0][0] if lifetimes else '',
+            'deleted': deleted,
+            'exists': exists,
+            'lifetimes': lifetimes,
+            'category': category,
+            'color': color
+        }
+        if file_path in former_paths:
+            info['formerPaths'] = former_paths[file_path]
+        file_info[file_path] = info
+    return file_info
+
+
+def get_lifetimes(info):
+    """[created, deleted] spans of a file_info entry; entries from older runs only have one."""
+    if 'lifetimes' in info:
+        return info['lifetimes']
+    return [[info['created'], info['deleted'] or None]]
+
+
+def get_renamed_earlier_files(index, commits):
+    """Paths that some of `commits` rename and that older commits already touched."""
+    renamed = {
+        old_path for commit_hash, old_path
+        in index.query("SELECT commit_hash, old_path FROM changes WHERE status = 'R'")
+        if commit_hash in commits
+    }
+    if not renamed:
+        return set()
+    marks = ','.join('?' * len(renamed))
+    return {
+        path for commit_hash, path
+        in index.query(f'SELECT commit_hash, path FROM changes WHERE path IN ({marks})', tuple(renamed))
+        if commit_hash not in commits
+    }
+
+
+def get_deleted_files(file_info):
+    """List deleted files for the graveyard."""
+    return [
+        {
+            'file': file_path,
+            'created': info['created'],
+            'deleted': info['deleted'],
+            'category': info['category'],
+            **({'formerPaths': info['formerPaths']} if 'formerPaths' in info else {})
+        }
+        for file_path, info in file_info.items()
+        if info['deleted']
+    ]
+
+
+def is_first_parent_ancestor(index, commit_hash):
+    """Check that a commit lies on the first-parent chain of HEAD."""
+    return any(chain_hash == commit_hash for chain_hash, _ in index.first_parent_chain())
+
+
+def replay_file_sizes(index, files_set, sample_dates, base=None, lineage=None):
+    """Get sizes of all tracked files at each sampled date in one history pass.
+
+    History is read once along the first-parent chain of HEAD and a running
+    line count per file is kept by applying numstat insert/delete deltas; a
+    renamed file counts under its latest path (its lineage, see
+    replay_history), which is also how `files_set` names it.
+    For each date the snapshot is taken at the latest first-parent commit
+    committed on or before the end of that day. Commits of merged side
+    branches are only seen through their merge, even when committed later.
+
+    `base` is an optional (commit_hash, sizes) pair recorded by an earlier
+    run; the replay then starts from those sizes and only reads the commits
+    after it. Dates with no newer commit see the base sizes.
+
+    Returns (snapshots, head_hash, head_sizes) where snapshots is a list of
+    (date, changes) in date order, `changes` holding the sizes of the files
+    in `files_set` that changed since the previous snapshot (all of them
+    with lines for the first one of a run without `base`); dates before the
+    first commit are skipped.
+    """
+    snapshots = []
     
-    return files
+    def take_snapshot(dates, running, changed):
+        changes = {file_path: max(0, running[file_path]) for file_path in changed if file_path in files_set}
+        snapshots.append((dates[0], changes))
+        snapshots.extend((date, {}) for date in dates[1:])
+    
+    head_hash, running = replay_history(index, sample_dates, take_snapshot, base, lineage)
+    head_sizes = {file_path: lines for file_path, lines in running.items() if lines > 0}
+    return snapshots, head_hash, head_sizes
 
 
-def get_file_lifecycle(file_path):
-    """Get the creation and deletion dates for a file."""
-    # First commit that added this file
-    cmd = f'git log --all --reverse --diff-filter=A --format="%ad" --date=short -- "{file_path}" | head -1'
-    created = run_git_command(cmd)
+def replay_history(index, sample_dates, on_snapshot, base=None, lineage=None):
+    """Replay line counts along HEAD's first-parent chain (see replay_file_sizes).
+
+    Counts are kept by lineage (see git_file_lineage.py), so a renamed file
+    keeps its count under its latest path throughout. Calls
+    on_snapshot(dates, running, changed) with the running line counts at
+    each commit that is the snapshot of some sample dates, in date order,
+    along with the lineages touched since the previous snapshot.
+    Returns (head_hash, running) once the replay reaches HEAD.
+    """
+    lineage = lineage or FileLineage.load(index)
+    store = load_commit_store(index)
+    chain = index.first_parent_chain(stop=base[0] if base else None)
+    commits = [(commit_hash, commit_date, store.rows[commit_hash]) for commit_hash, commit_date in chain]
+    
+    # Resolve the snapshot commit for every date with one sweep in date order.
+    # Index -1 stands for the base state.
+    snapshot_dates = defaultdict(list)
+    by_date = sorted(range(len(commits)), key=lambda idx: commits[idx][1])
+    best = -1 if base else None
+    pos = 0
+    for date in sorted(set(sample_dates)):
+        while pos < len(by_date) and commits[by_date[pos]][1] <= date:
+            if best is None or by_date[pos] > best:
+                best = by_date[pos]
+            pos += 1
+        if best is not None:
+            snapshot_dates[best].append(date)
+    
+    # Snapshot commits only move forward as dates increase, so dates come
+    # out in order
+    running = defaultdict(int, base[1] if base else {})
+    changed = set()
+    if -1 in snapshot_dates:
+        on_snapshot(snapshot_dates[-1], running, changed)
+    # Columns are read directly here, this being the hottest loop of the run
+    paths, strings = store.paths, store.strings
+    insertions, deletions = store.insertions, store.deletions
+    for idx, (commit_hash, _, row) in enumerate(commits):
+        for change in store.change_rows(row):
+            # A rename's new path is in the lineage of the old one
+            name = lineage.resolve(strings[paths[change]], commit_hash)
+            # Binary files (BINARY, -1) have no line counts
+            running[name] += max(insertions[change], 0) - max(deletions[change], 0)
+            changed.add(name)
+        if idx in snapshot_dates:
+            on_snapshot(snapshot_dates[idx], running, changed)
+            changed = set()
     
-    # Check if file currently exists
-    full_path = REPO_PATH / file_path
-    exists = full_path.exists()
+    head_hash = commits[-1][0] if commits else (base[0] if base else None)
+    return head_hash, running
+
+
+class FileRanking:
+    """Files ordered by line count, updated one file at a time.
+
+    A sorted list of (-lines, path) keys is kept, so moving a changed file
+    costs two bisections instead of re-sorting every file. Ties are broken
+    by path.
+    """
+
+    def __init__(self):
+        self.order = []
+        self.lines = {}
+        self.total = 0
+
+    def __len__(self):
+        return len(self.order)
+
+    def set(self, file_path, lines):
+        """Set a file's line count; files with no lines leave the ranking."""
+        old = self.lines.pop(file_path, 0)
+        if old == lines and old > 0:
+            self.lines[file_path] = old
+            return
+        if old > 0:
+            del self.order[bisect_left(self.order, (-old, file_path))]
+            self.total -= old
+        if lines > 0:
+            insort(self.order, (-lines, file_path))
+            self.lines[file_path] = lines
+            self.total += lines
+
+    def top(self, n):
+        """The n largest files as (path, lines), largest first."""
+        return [(file_path, -neg_lines) for neg_lines, file_path in self.order[:n]]
+
+
+class RaceRanking:
+    """The race standings, advanced from frame to frame by what changed.
+
+    Holds every file's line count and applies the lifetimes from the file
+    lifecycles as frames pass their dates, so only changed files are
+    re-ranked. A file is in the race while it has lines and is within one of
+    its lifetimes; a file whose lifetime ended goes to the graveyard until
+    it is re-created.
+    """
+
+    def __init__(self, file_info, sizes=None, date=''):
+        self.file_info = file_info
+        self.sizes = {}
+        self.ranking = FileRanking()
+        self.graveyard = {}  # Deleted files in order of deletion (used as an ordered set)
+        self.top = []
+        self.date = ''
+        self.lifecycle_events = sorted(
+            (day, file_path)
+            for file_path, info in file_info.items()
+            for lifetime in get_lifetimes(info)
+            for day in lifetime if day
+        )
+        self.next_event = 0
+        if sizes:
+            self.advance(date, sizes)
+
+    def is_alive(self, file_path):
+        """Whether the current date lies within one of the file's lifetimes."""
+        return any(
+            (not created or self.date >= created) and (not deleted or self.date < deleted)
+            for created, deleted in get_lifetimes(self.file_info[file_path])
+        )
+
+    def is_dead(self, file_path):
+        """Whether one of the file's lifetimes has ended and it is not alive."""
+        lifetimes = get_lifetimes(self.file_info[file_path])
+        return (any(deleted and self.date >= deleted for _, deleted in lifetimes)
+                and not self.is_alive(file_path))
+
+    def advance(self, date, changes):
+        """Move to `date` given the sizes of files changed since the last call.
+
+        Returns (top, just_deleted, events): the top TOP_N_FILES files as
+        (path, lines), files emptied since the last call that are not in the
+        graveyard, and the enter/exit/rank events of the new top N (see
+        rank_events).
+        """
+        self.date = date
+        touched = set(changes)
+        just_deleted = []
+        for file_path, lines in changes.items():
+            if lines == 0 and self.sizes.get(file_path, 0) > 0:
+                just_deleted.append(file_path)
+            self.sizes[file_path] = lines
+        
+        lifecycle = self.lifecycle_events
+        while self.next_event < len(lifecycle) and lifecycle[self.next_event][0] <= date:
+            _, file_path = lifecycle[self.next_event]
+            if self.is_dead(file_path):
+                self.graveyard[file_path] = True
+            else:
+                self.graveyard.pop(file_path, None)
+            touched.add(file_path)
+            self.next_event += 1
+        
+        for file_path in touched:
+            self.ranking.set(file_path, self.sizes.get(file_path, 0) if self.is_alive(file_path) else 0)
+        
+        just_deleted = sorted(file_path for file_path in just_deleted if self.is_alive(file_path))
+        top = self.ranking.top(TOP_N_FILES)
+        events = rank_events(self.top, top)
+        self.top = top
+        return top, just_deleted, events
+
+
+def rank_events(previous_top, top):
+    """Changes between two top-N lists, as a list of event dicts.
+
+    Files entering the top N come first ({type: 'enter', file, rank}), then
+    files moving within it ({type: 'rank', file, from, rank}), then files
+    leaving it ({type: 'exit', file, rank} with the rank they left from).
+    Ranks count from 0.
+    """
+    previous_ranks = {file_path: rank for rank, (file_path, _) in enumerate(previous_top)}
+    entered = []
+    moved = []
+    for rank, (file_path, _) in enumerate(top):
+        old_rank = previous_ranks.pop(file_path, None)
+        if old_rank is None:
+            entered.append({'type': 'enter', 'file': file_path, 'rank': rank})
+        elif old_rank != rank:
+            moved.append({'type': 'rank', 'file': file_path, 'from': old_rank, 'rank': rank})
+    exited = [{'type': 'exit', 'file': file_path, 'rank': rank} for file_path, rank in previous_ranks.items()]
+    return entered + moved + exited
+
+
+def rank_files(sizes, file_info, date):
+    """(top-N files, total lines) as build_frame() would show them at a date."""
+    ranking = RaceRanking(file_info, sizes, date)
+    return tuple(file_path for file_path, _ in ranking.top), ranking.ranking.total
+
+
+def get_date_signatures(index, file_info, dates, base=None, lineage=None):
+    """(date, top files, total lines) for every date, from one replay pass.
+
+    This is the cheap full-resolution pass behind adaptive sampling: no
+    per-date size tables are kept, only each date's ranking.
+    """
+    signatures = []
+    sizes = {file_path: base[1].get(file_path, 0) for file_path in file_info} if base else None
+    ranking = RaceRanking(file_info, sizes)
+    
+    def take_signature(snapshot_dates, running, changed):
+        changes = {file_path: max(0, running[file_path]) for file_path in changed if file_path in file_info}
+        for date in snapshot_dates:
+            top, _, _ = ranking.advance(date, changes)
+            signatures.append((date, tuple(file_path for file_path, _ in top), ranking.ranking.total))
+            changes = {}
+    
+    replay_history(index, dates, take_signature, base, lineage)
+    return signatures
+
+
+def frame_change(last, top, total):
+    """How far a date has moved from the last frame, in units of the change thresholds.
+
+    Every file entering or leaving the top N counts as one threshold.
+    """
+    last_top, last_total = last
+    positions = max(len(last_top), len(top), 1)
+    moved = sum(1 for i in range(positions) if last_top[i:i + 1] != top[i:i + 1])
+    entered_or_left = len(set(top).symmetric_difference(last_top))
+    lines_change = abs(total - last_total) / max(last_total, 1)
+    return max(entered_or_left, moved / positions / RANK_CHANGE_THRESHOLD,
+               lines_change / LINES_CHANGE_THRESHOLD)
+
+
+def select_frame_dates(signatures, budget=FRAME_BUDGET, scale=None, start=None):
+    """Pick frame dates where the race visibly changes.
+
+    Walking the dates in order, a frame is emitted when frame_change() since
+    the last frame reaches `scale`; the last date is always kept. Without a
+    fixed `scale`, the smallest scale (at least 1) that fits `budget` frames
+    is searched for, to within SCALE_TOLERANCE. `start` is the (top files, total lines) of a frame the
+    selection continues from; without it the first date is a frame.
+
+    Returns (dates, scale).
+    """
+    def select(threshold, limit=None):
+        # Stops early, with too many dates, once there are more than `limit`
+        dates = []
+        last = start
+        for date, top, total in signatures:
+            if last is None or frame_change(last, top, total) >= threshold:
+                dates.append(date)
+                last = (top, total)
+                if limit is not None and len(dates) > limit:
+                    return dates
+        if signatures and (not dates or dates[-1] != signatures[-1][0]):
+            dates.append(signatures[-1][0])
+        return dates
+    
+    if scale is not None:
+        return select(scale), scale
+    
+    low, high = 1.0, 1.0
+    dates = select(high, budget)
+    while len(dates) > budget and high < 1e9:
+        low, high = high, high * 2
+        dates = select(high, budget)
+    if len(dates) > budget:
+        return select(high), high
+    # Bisect down towards the smallest scale that fits, until the budget is
+    # met exactly or the scale is known to within SCALE_TOLERANCE
+    while len(dates) < budget and high - low > high * SCALE_TOLERANCE:
+        middle = (low + high) / 2
+        candidate = select(middle, budget)
+        if len(candidate) > budget:
+            low = middle
+        else:
+            high, dates = middle, candidate
+    return dates, high
+
+
+class CommitTimeIndex:
+    """Sorted commit timestamps with pre-classified message flags.
+
+    Loaded once from the history index, it answers windowed commit counts
+    with bisect instead of running `git rev-list --count` for every frame.
+    """
+
+    def __init__(self, timestamps, tech_debt_timestamps):
+        self.timestamps = sorted(timestamps)
+        self.tech_debt_timestamps = sorted(tech_debt_timestamps)
+
+    @classmethod
+    def load(cls, index):
+        timestamps = []
+        tech_debt_timestamps = []
+        for timestamp, message in index.query('SELECT commit_time, message FROM commits'):
+            timestamps.append(timestamp)
+            if TECH_DEBT_PATTERN.search(message or ''):
+                tech_debt_timestamps.append(timestamp)
+        return cls(timestamps, tech_debt_timestamps)
+
+    def count(self, since, until, tech_debt=False):
+        """Count commits with since <= commit time <= until (unix timestamps)."""
+        timestamps = self.tech_debt_timestamps if tech_debt else self.timestamps
+        return bisect_right(timestamps, until) - bisect_left(timestamps, since)
+
+    def count_window(self, date, days, tech_debt=False):
+        """Count commits in the `days` whole days ending with `date` (local time)."""
+        end = datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)
+        start = end - timedelta(days=days)
+        return self.count(start.timestamp(), end.timestamp() - 1, tech_debt)
+
+
+def get_commit_velocity(date, commit_index):
+    """Count commits and tech debt commits in trailing windows up to a date."""
+    # Count commits in the last 30 days window up to this date to show
+    # "current velocity" rather than strict calendar month totals which
+    # fluctuate weirdly mid-month
+    velocity = {
+        name: commit_index.count_window(date, days)
+        for name, days in VELOCITY_WINDOWS.items()
+    }
+    velocity['dailyCommits'] = round(velocity['monthlyCommits'] / 30, 1)
     
-    deleted = None
-    if not exists:
-        # Find when it was deleted
-        cmd = f'git log --all --diff-filter=D --format="%ad" --date=short -- "{file_path}" | tail -1'
-        deleted = run_git_command(cmd)
+    # Count Tech Debt / Compliance commits
+    velocity['techDebtCommits'] = commit_index.count_window(date, 30, tech_debt=True)
     
-    return created, deleted, exists
+    return velocity
+
 
+def build_frame(date, standings, file_info, commit_index):
+    """Build one race frame from the standings at a date.
 
-def get_file_sizes_at_commit(commit_hash, files_set):
-    """Get sizes of all tracked files at a specific commit."""
-    sizes = {}
+    `standings` is (top, deleted, total_files, total_lines, events) as taken
+    from a RaceRanking. Frames are independent of each other once their
+    standings are known, so they can be built in any order.
+    """
+    top, deleted, total_files, total_lines, events = standings
+    velocity = get_commit_velocity(date, commit_index)
+    
+    def file_entry(file_path, lines, status):
+        info = file_info[file_path]
+        return {
+            'file': file_path,
+            'name': file_path.split('/')[-1],
+            'lines': lines,
+            'category': info['category'],
+            'color': info['color'],
+            'status': status
+        }
     
-    # List all files at this commit
-    cmd = f'git ls-tree -r --name-only {commit_hash}'
-    output = run_git_command(cmd)
-    existing_files = set(output.split('\n'))
+    # Top N by lines, then deleted files shown at 0 before they fade out
+    files = [file_entry(file_path, lines, 'active') for file_path, lines in top]
+    files += [file_entry(file_path, 0, 'deleted') for file_path in deleted]
     
-    for file_path in files_set:
-        if file_path in existing_files:
-            cmd = f'git show {commit_hash}:"{file_path}" 2>/dev/null | wc -l'
-            result = run_git_command(cmd)
-            try:
-                sizes[file_path] = int(result.strip())
-            except ValueError:
-                sizes[file_path] = 0
+    return {
+        'date': date,
+        'files': files,
+        'events': events,
+        'totalFiles': total_files,
+        'totalLines': total_lines,
+        'monthlyCommits': velocity['monthlyCommits'],
+        'dailyCommits': velocity['dailyCommits'],
+        'techDebtCommits': velocity['techDebtCommits'],
+        'weeklyCommits': velocity['weeklyCommits'],
+        'quarterlyCommits': velocity['quarterlyCommits']
+    }
+
+
+def encode_delta_frames(frames, keyframe_interval=KEYFRAME_INTERVAL):
+    """Delta-encode frames against a shared file table.
+
+    Returns (file_table, encoded_frames). Files are referenced by their index
+    in the table ({file, category}; name and color are derived). Each frame
+    keeps its scalar fields, plus:
+
+        lines    flat [id, lines, id, lines, ...] list of active files
+        gone     ids of active files that left the chart since the last frame
+        deleted  ids of files shown at 0 lines as just deleted
+        key      true on keyframes
+        events   flat [type, id, rank, ...] list of the frame's rank events,
+                 type 0 enter, 1 exit, 2 rank change (followed by the old
+                 rank)
+
+    Keyframes, every `keyframe_interval` frames, list every active file;
+    other frames only list files whose line count changed.
+    """
+    file_ids = {}
+    file_table = []
+    encoded = []
+    previous = {}
+    for i, frame in enumerate(frames):
+        active = {}
+        deleted = []
+        for f in frame['files']:
+            file_id = file_ids.get(f['file'])
+            if file_id is None:
+                file_id = file_ids[f['file']] = len(file_table)
+                file_table.append({'file': f['file'], 'category': f['category']})
+            if f['status'] == 'deleted':
+                deleted.append(file_id)  # Always shown at 0 lines
+            else:
+                active[file_id] = f['lines']
+        
+        entry = {key: value for key, value in frame.items() if key not in ('files', 'events')}
+        if 'events' in frame:
+            entry['events'] = []
+            for event in frame['events']:
+                entry['events'] += [EVENT_CODES[event['type']], file_ids[event['file']], event['rank']]
+                if event['type'] == 'rank':
+                    entry['events'].append(event['from'])
+        if i % keyframe_interval == 0:
+            entry['key'] = True
+            changed = active
         else:
-            sizes[file_path] = 0  # File doesn't exist at this commit
+            changed = {file_id: lines for file_id, lines in active.items() if previous.get(file_id) != lines}
+            gone = [file_id for file_id in previous if file_id not in active]
+            if gone:
+                entry['gone'] = gone
+        entry['lines'] = [value for pair in changed.items() for value in pair]
+        if deleted:
+            entry['deleted'] = deleted
+        encoded.append(entry)
+        previous = active
+    return file_table, encoded
+
+
+def decode_delta_frames(file_table, encoded_frames):
+    """Rebuild full frames from encode_delta_frames() output.
+
+    Files come back ordered by lines then path, just deleted files last.
+    """
+    event_types = {code: event_type for event_type, code in EVENT_CODES.items()}
+    
+    def file_entry(file_id, lines, status):
+        info = file_table[file_id]
+        return {
+            'file': info['file'],
+            'name': info['file'].split('/')[-1],
+            'lines': lines,
+            'category': info['category'],
+            'color': FILE_CATEGORIES.get(info['category'], FILE_CATEGORIES['other'])[0],
+            'status': status
+        }
+    
+    frames = []
+    active = {}
+    for entry in encoded_frames:
+        if entry.get('key'):
+            active = {}
+        for file_id in entry.get('gone', []):
+            active.pop(file_id, None)
+        lines = entry['lines']
+        active.update(zip(lines[::2], lines[1::2]))
+        
+        frame = {key: value for key, value in entry.items() if key not in ('key', 'lines', 'gone', 'deleted')}
+        ranked = sorted(active.items(), key=lambda item: (-item[1], file_table[item[0]]['file']))
+        frame['files'] = (
+            [file_entry(file_id, lines, 'active') for file_id, lines in ranked] +
+            [file_entry(file_id, 0, 'deleted') for file_id in entry.get('deleted', [])]
+        )
+        if 'events' in entry:
+            frame['events'] = []
+            codes = entry['events']
+            i = 0
+            while i < len(codes):
+                event = {'type': event_types[codes[i]], 'file': file_table[codes[i + 1]]['file']}
+                if event['type'] == 'rank':
+                    event['from'] = codes[i + 3]
+                event['rank'] = codes[i + 2]
+                frame['events'].append(event)
+                i += 4 if event['type'] == 'rank' else 3
+        frames.append(frame)
+    return frames
+
+
+def lifecycle_changes_history(old, new, last_frame_date):
+    """Check whether a refreshed lifecycle invalidates already generated frames.
+
+    Lifetimes may only change after the last frame.
+    """
+    if old is None:
+        return False
+    
+    def marks(info):
+        return [
+            (i, day) for lifetime in get_lifetimes(info)
+            for i, day in enumerate(lifetime) if day and day <= last_frame_date
+        ]
+    
+    return marks(old) != marks(new) or new['created'] != old['created']
+
+
+_worker_file_info = None
+_worker_commit_index = None
+
+
+def _init_frame_worker(file_info, commit_index):
+    global _worker_file_info, _worker_commit_index
+    _worker_file_info = file_info
+    _worker_commit_index = commit_index
+
+
+def _build_frame_task(task):
+    date, standings = task
+    return build_frame(date, standings, _worker_file_info, _worker_commit_index)
+
+
+def build_frames(snapshots, prev_sizes, file_info, commit_index, workers=1, start_date=''):
+    """Build frames for (date, changes) snapshots, in parallel when workers > 1.
+
+    The standings of every frame are worked out first in one ordered pass
+    over a RaceRanking, touching only the files that changed; `prev_sizes`
+    are the sizes at `start_date`, the last frame of an earlier run. The
+    frames themselves are then built independently and returned in date
+    order.
+    """
+    ranking = RaceRanking(file_info, prev_sizes, start_date)
+    tasks = []
+    for date, changes in snapshots:
+        top, just_deleted, events = ranking.advance(date, changes)
+        deleted = list(ranking.graveyard) + just_deleted
+        tasks.append((date, (top, deleted, len(ranking.ranking), ranking.ranking.total, events)))
+    
+    if workers > 1 and len(tasks) > 1:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_frame_worker,
+                                 initargs=(file_info, commit_index)) as executor:
+            results = executor.map(_build_frame_task, tasks, chunksize=chunksize)
+            frames = []
+            for i, frame in enumerate(results):
+                if i % 10 == 0:
+                    print(f"   Built {frame['date']} ({i+1}/{len(tasks)})...")
+                frames.append(frame)
+        return frames
     
-    return sizes
+    frames = []
+    for i, (date, standings) in enumerate(tasks):
+        if i % 10 == 0:
+            print(f"   Processing {date} ({i+1}/{len(tasks)})...")
+        frames.append(build_frame(date, standings, file_info, commit_index))
+    return frames
+
+
+def generate_race_frames(index, previous=None, workers=1, sampling='adaptive', frame_budget=FRAME_BUDGET):
+    """Generate frame data for the bar chart race.
 
+    `previous` holds the state and frames recorded by an earlier run. When
+    given, only commits added since then are mined and their frames are
+    appended. Returns None if the new commits change existing frames, in
+    which case the caller should do a full rebuild. Frames are built in
+    this process, or by a pool of `workers` processes when more than one;
+    building a frame is two bisects and a dict, so the pool rarely pays
+    for its start-up.
 
-def generate_race_frames():
-    """Generate frame data for the bar chart race."""
+    With `sampling` 'adaptive', frame dates are chosen by select_frame_dates()
+    within `frame_budget` frames, and an incremental run whose new frames
+    would pass the budget returns None for a full rebuild; with 'interval',
+    every Nth commit date is a frame (about `frame_budget` in all).
+    """
     print("🔍 GitStoryline v2 - Bar Chart Race Mining")
     print("=" * 50)
     
+    state = previous['state'] if previous else None
+    commits = index.commits_since(state['tips']) if state else None
+    
     print("\n📅 Getting all commit dates...")
-    all_dates = get_all_dates_with_commits()
-    print(f"   Found {len(all_dates)} unique dates")
+    with profile_stage("get_all_dates_with_commits"):
+        all_dates = [d for d in get_all_dates_with_commits(index, commits) if d]
+    if previous:
+        last_frame_date = previous['frames'][-1]['date'] if previous['frames'] else ''
+        all_dates = [d for d in all_dates if d > last_frame_date]
+    print(f"   Found {len(all_dates)} unique {'new ' if previous else ''}dates")
     
     print("\n📁 Finding all files that ever existed...")
-    all_files = get_all_files_ever()
-    print(f"   Found {len(all_files)} JS/CSS/HTML files")
+    with profile_stage("FileLineage.load"):
+        lineage = FileLineage.load(index)
+        former_paths = lineage.former_paths()
+    if previous:
+        renamed = get_renamed_earlier_files(index, commits)
+        if renamed:
+            # Their earlier frames move to the new path
+            print(f"   {sorted(renamed)[0]} was renamed")
+            return None
+        # Only files created or deleted by the new commits need a fresh lifecycle
+        file_info = dict(state['files'])
+        changed_files = get_all_files_ever(index, commits, lineage=lineage) | (
+            set(file_info) & get_all_files_ever(index, commits, 'D', lineage=lineage)
+        )
+        all_files = set(file_info) | changed_files
+    else:
+        file_info = {}
+        changed_files = get_all_files_ever(index, lineage=lineage)
+        all_files = changed_files
+    print(f"   Found {len(all_files)} JS/CSS/HTML files, {len(former_paths.keys() & all_files)} of them renamed")
     
     print("\n📊 Getting file lifecycles...")
-    file_info = {}
-    deleted_files = []
-    
-    for file_path in all_files:
-        created, deleted, exists = get_file_lifecycle(file_path)
-        category, color = get_file_category(file_path)
-        
-        file_info[file_path] = {
-            'created': created,
-            'deleted': deleted,
-            'exists': exists,
-            'category': category,
-            'color': color
-        }
-        
-        if deleted:
-            deleted_files.append({
-                'file': file_path,
-                'created': created,
-                'deleted': deleted,
-                'category': category
-            })
+    with profile_stage("get_file_infos"):
+        for file_path, info in get_file_infos(index, lineage, changed_files, former_paths).items():
+            if previous and lifecycle_changes_history(file_info.get(file_path), info, last_frame_date):
+                print(f"   {file_path} changes earlier frames")
+                return None
+            file_info[file_path] = info
+    deleted_files = get_deleted_files(file_info)
     
     print(f"   Found {len(deleted_files)} deleted files")
     
     print("\n🎬 Generating frames (this may take a while)...")
     
-    frames = []
-    prev_sizes = {}
-    
-    # Sample dates (every Nth date to reduce processing time)
-    sample_interval = max(1, len(all_dates) // 100)  # ~100 frames max
-    sampled_dates = all_dates[::sample_interval]
+    if previous:
+        frames = list(previous['frames'])
+        prev_sizes = state['lastFrameSizes']
+        base = (state['head'], state['headSizes'])
+    else:
+        frames = []
+        prev_sizes = {}
+        base = None
     
-    # Always include the last date
-    if all_dates[-1] not in sampled_dates:
-        sampled_dates.append(all_dates[-1])
-    
-    for i, date in enumerate(sampled_dates):
-        if i % 10 == 0:
-            print(f"   Processing {date} ({i+1}/{len(sampled_dates)})...")
-        
-        # Get the latest commit on this date
-        cmd = f'git log -1 --until="{date} 23:59:59" --format="%H"'
-        commit = run_git_command(cmd)
-        
-        if not commit:
-            continue
-        
-        # Get file sizes at this commit
-        sizes = get_file_sizes_at_commit(commit, all_files)
-
-        # Get monthly commit count
-        # Calculate start and end of the month for this date
-        dt = datetime.strptime(date, '%Y-%m-%d')
-        start_of_month = dt.replace(day=1).strftime('%Y-%m-%d')
-        # Simple way to get end of month: first day of next month - 1 day, 
-        # but for simplicity let's just count commits in the last 30 days window up to this date
-        # to show "current velocity" rather than strict calendar month totals which fluctuate weirdly mid-month
-        start_window = (dt - timedelta(days=30)).strftime('%Y-%m-%d')
-        
-        cmd = f'git rev-list --count --since="{start_window}" --until="{date}" --all'
-        try:
-            monthly_commits = int(run_git_command(cmd))
-            daily_commits = round(monthly_commits / 30, 1)
-        except ValueError:
-            monthly_commits = 0
-            daily_commits = 0
-        
-        # Count Tech Debt / Compliance commits
-        cmd_tech = f'git rev-list --since="{start_window}" --until="{date}" --grep="Tech debt" --grep="compliance" --count --all -i'
-        try:
-            tech_debt_commits = int(run_git_command(cmd_tech))
-        except ValueError:
-            tech_debt_commits = 0
-            daily_commits = 0
-        
-        # Build frame data
-        frame_files = []
-        for file_path, lines in sizes.items():
-            info = file_info[file_path]
-            
-            # Determine status
-            status = 'active'
-            if info['deleted'] and date >= info['deleted']:
-                status = 'deleted'
-            elif info['created'] and date < info['created']:
-                status = 'not_created'
-            elif lines == 0 and prev_sizes.get(file_path, 0) > 0:
-                status = 'deleted'  # Just deleted
-            
-            if status != 'not_created' and (lines > 0 or status == 'deleted'):
-                frame_files.append({
-                    'file': file_path,
-                    'name': file_path.split('/')[-1],
-                    'lines': lines,
-                    'category': info['category'],
-                    'color': info['color'],
-                    'status': status
-                })
-        
-        # Sort by lines and keep top N + recently deleted
-        active_files = [f for f in frame_files if f['status'] == 'active' and f['lines'] > 0]
-        deleted_this_frame = [f for f in frame_files if f['status'] == 'deleted']
-        
-        active_files.sort(key=lambda x: -x['lines'])
-        top_files = active_files[:TOP_N_FILES]
-        
-        # Add recently deleted files (keep visible for a few frames)
-        for df in deleted_this_frame:
-            if df not in top_files:
-                df['lines'] = 0  # Show at 0 before fadeout
-                top_files.append(df)
-        
-        frames.append({
-            'date': date,
-            'files': top_files,
-            'totalFiles': len([f for f in frame_files if f['lines'] > 0]),
-            'totalFiles': len([f for f in frame_files if f['lines'] > 0]),
-            'totalLines': sum(f['lines'] for f in frame_files),
-            'monthlyCommits': monthly_commits,
-            'dailyCommits': daily_commits,
-            'techDebtCommits': tech_debt_commits
-        })
+    sampling_state = {}
+    if sampling == 'adaptive':
+        # Keep the thresholds of the previous run
+        with profile_stage("select_frame_dates"):
+            signatures = get_date_signatures(index, file_info, all_dates, base, lineage)
+            sampled_dates, scale = select_frame_dates(
+                signatures, frame_budget,
+                scale=state['samplingScale'] if previous else None,
+                start=rank_files(prev_sizes, file_info, last_frame_date) if previous else None
+            )
+        sampling_state['samplingScale'] = scale
+        print(f"   Sampled {len(sampled_dates)} of {len(all_dates)} dates where the race changes")
+        if previous and len(frames) + len(sampled_dates) > frame_budget:
+            # Frames build on each other, so only selecting them all again keeps within the budget
+            print(f"   {len(frames) + len(sampled_dates)} frames would pass the budget of {frame_budget}")
+            return None
+    else:
+        if previous:
+            # Keep the spacing of the previous run
+            sample_interval = state['sampleInterval']
+            sampled_dates = all_dates[sample_interval - 1::sample_interval]
+        else:
+            # Sample dates (every Nth date to reduce processing time)
+            sample_interval = max(1, len(all_dates) // frame_budget)  # ~frame_budget frames max
+            sampled_dates = all_dates[::sample_interval]
+        sampling_state['sampleInterval'] = sample_interval
         
-        prev_sizes = sizes
+        # Always include the last date
+        if all_dates and all_dates[-1] not in sampled_dates:
+            sampled_dates.append(all_dates[-1])
+    
+    # File sizes for every sampled date come from one pass over history
+    with profile_stage("replay_file_sizes"):
+        snapshots, head_hash, head_sizes = replay_file_sizes(index, all_files, sampled_dates, base, lineage)
+    with profile_stage("CommitTimeIndex.load"):
+        commit_index = CommitTimeIndex.load(index)
+    with profile_stage("build_frames"):
+        frames += build_frames(snapshots, prev_sizes, file_info, commit_index, workers,
+                               last_frame_date if previous else '')
+    prev_sizes = dict(prev_sizes)
+    for _, changes in snapshots:
+        prev_sizes.update(changes)
     
-    return frames, deleted_files, file_info
+    new_state = {
+        'head': head_hash,
+        **sampling_state,
+        'files': file_info,
+        'headSizes': head_sizes,
+        'lastFrameSizes': {file_path: lines for file_path, lines in prev_sizes.items() if lines > 0}
+    }
+    return frames, deleted_files, file_info, new_state
 
 
 def detect_milestones(frames, file_info):
@@ -326,6 +1008,21 @@ def detect_milestones(frames, file_info):
     # Find max size of index.html encountered
     max_index_lines = 0
     
+    def first_created(matches):
+        """Earliest creation of the files with a path, current or former, that matches."""
+        days = [
+            info['created'] for file_path, info in file_info.items()
+            if info['created'] and any(matches(path) for path in [file_path, *info.get('formerPaths', [])])
+        ]
+        return min(days) if days else None
+    
+    # Files are keyed by their latest path, so a renamed file still counts under its earlier names
+    workspace_created = first_created(lambda f: f in ('js/components/WorkspaceComponent.js', 'css/layout/sidebar.css'))
+    contracts_created = first_created(lambda f: 'docs/' in f and 'contract.md' in f)
+    theme_created = first_created(lambda f: 'css/settings/variables.css' in f)
+    quality_created = first_created(lambda f: f in ('eslint.config.mjs', 'vitest.config.mjs'))
+    tests_created = first_created(lambda f: f.startswith('tests/'))
+    
     for frame in frames:
         # Check for index.html size
         index_file = next((f for f in frame['files'] if f['name'] == 'index.html'), None)
@@ -348,8 +1045,7 @@ def detect_milestones(frames, file_info):
 
         # 2. Workspace UI
         # Trigger: WorkspaceComponent.js or sidebar.css exists
-        has_workspace = any(f in file_info and file_info[f]['created'] and frame['date'] >= file_info[f]['created'] 
-                            for f in ['js/components/WorkspaceComponent.js', 'css/layout/sidebar.css'])
+        has_workspace = workspace_created is not None and frame['date'] >= workspace_created
         if has_workspace and not any(m['type'] == 'workspace_ui' for m in milestones):
             milestones.append({
                 'date': frame['date'],
@@ -360,8 +1056,7 @@ def detect_milestones(frames, file_info):
 
         # 3. Agent Contracts
         # Trigger: docs/*contract.md exists
-        has_contracts = any('docs/' in f and 'contract.md' in f and file_info[f]['created'] and frame['date'] >= file_info[f]['created'] 
-                           for f in file_info.keys())
+        has_contracts = contracts_created is not None and frame['date'] >= contracts_created
         if has_contracts and not any(m['type'] == 'agent_contracts' for m in milestones):
              milestones.append({
                 'date': frame['date'],
@@ -372,8 +1067,7 @@ def detect_milestones(frames, file_info):
             
         # 3.5. UI Theme Styling
         # Trigger: variables.css exists
-        has_theme = any('css/settings/variables.css' in f and file_info[f]['created'] and frame['date'] >= file_info[f]['created'] 
-                           for f in file_info.keys())
+        has_theme = theme_created is not None and frame['date'] >= theme_created
         if has_theme and not any(m['type'] == 'ui_theme' for m in milestones):
              milestones.append({
                 'date': frame['date'],
@@ -394,9 +1088,8 @@ def detect_milestones(frames, file_info):
 
         # 5. Code Quality & Testing
         # Trigger: eslint/vitest config or tests/ folder
-        has_quality = any(k in file_info and file_info[k]['created'] and frame['date'] >= file_info[k]['created']
-                         for k in ['eslint.config.mjs', 'vitest.config.mjs'])
-        has_tests = any(f.startswith('tests/') and file_info[f]['created'] and frame['date'] >= file_info[f]['created'] for f in file_info.keys())
+        has_quality = quality_created is not None and frame['date'] >= quality_created
+        has_tests = tests_created is not None and frame['date'] >= tests_created
         
         if (has_quality or has_tests) and not any(m['type'] == 'code_quality' for m in milestones):
              milestones.append({
@@ -440,11 +1133,104 @@ def detect_milestones(frames, file_info):
     return milestones
 
 
-def main():
-    frames, deleted_files, file_info = generate_race_frames()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mine git history for the GitStoryline bar chart race.")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only mine commits added since the last run into the history index and append their frames to the existing output"
+    )
+    parser.add_argument(
+        "--repo", metavar="PATH",
+        help="Mine the git repository at PATH instead of the one this script lives in"
+    )
+    parser.add_argument(
+        "--output", metavar="DIR",
+        help="Directory for the output, history index, run state and profile "
+             "(default: the repository's gitstoryline/ directory)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes used to build frames (default: 1; a frame is cheap to build, "
+             "so a pool only pays for its start-up on very long races)"
+    )
+    parser.add_argument(
+        "--backend", choices=["auto", *BACKENDS], default="subprocess",
+        help="How git is read: the git CLI (subprocess), pygit2 in-process, or pygit2 when installed (auto)"
+    )
+    parser.add_argument(
+        "--sampling", choices=["adaptive", "interval"], default="adaptive",
+        help="adaptive: emit a frame where the top-N ranking or total lines change enough; "
+             "interval: every Nth commit date"
+    )
+    parser.add_argument(
+        "--max-frames", type=int, default=FRAME_BUDGET,
+        help=f"Most frames adaptive sampling keeps; an incremental run that would pass it "
+             f"rebuilds all frames (default: {FRAME_BUDGET})"
+    )
+    parser.add_argument(
+        "--frame-format", choices=["full", "delta"], default="full",
+        help="full: every frame lists its files in full; delta: compact JSON with a shared file "
+             "table, frames storing only changes and periodic keyframes"
+    )
+    parser.add_argument(
+        "--keyframe-interval", type=int, default=KEYFRAME_INTERVAL,
+        help=f"Frames between keyframes in the delta format (default: {KEYFRAME_INTERVAL})"
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const="", metavar="REPORT",
+        help=f"Record per-stage wall time, git subprocesses, git bytes read and peak RSS "
+             f"to a JSON report (default: {PROFILE_FILE.name} next to the output)"
+    )
+    parser.add_argument(
+        "--cprofile", metavar="PATH",
+        help="With --profile, also write a cProfile dump of the run to PATH"
+    )
+    return parser.parse_args(argv)
+
+
+def load_previous_run(index, sampling):
+    """Load the previous run's state and frames if they can be extended."""
+    state = load_mining_state(STATE_FILE, 'race')
+    previous_output = load_previous_output(OUTPUT_FILE) if state else None
+    if previous_output is None:
+        print("♻️  No previous run recorded, doing a full rebuild\n")
+        return None
+    if ('samplingScale' in state) != (sampling == 'adaptive'):
+        print("♻️  Frame sampling changed since the last run, doing a full rebuild\n")
+        return None
+    if index.backend.is_rewritten(state['tips']) or not is_first_parent_ancestor(index, state['head']):
+        print("♻️  History was rewritten since the last run, doing a full rebuild\n")
+        return None
+    frames = previous_output['frames']
+    if previous_output.get('config', {}).get('frameFormat') == 'delta':
+        frames = decode_delta_frames(previous_output['fileTable'], frames)
+    return {'state': state, 'frames': frames}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.repo or args.output:
+        configure_paths(args.repo or REPO_PATH, args.output)
+    if args.profile is not None:
+        start_profiling("git_race_mining.py", args.profile or PROFILE_FILE, args.cprofile)
+    
+    index = HistoryIndex(HISTORY_INDEX_FILE, REPO_PATH, get_backend(args.backend, REPO_PATH))
+    with profile_stage("update_index"):
+        added = index.update(rebuild=not args.incremental)
+    print(f"🗂️  History index: {added} new commits indexed with the {index.backend.name} backend\n")
+    previous = load_previous_run(index, args.sampling) if args.incremental else None
+    with profile_stage("generate_race_frames"):
+        result = generate_race_frames(index, previous, args.workers, args.sampling, args.max_frames)
+    if result is None:
+        print("\n♻️  Earlier frames can't be kept, doing a full rebuild\n")
+        with profile_stage("generate_race_frames"):
+            result = generate_race_frames(index, None, args.workers, args.sampling, args.max_frames)
+    frames, deleted_files, file_info, state = result
+    release_commit_store(index)  # Frames are built; free the commit store before the output is written
     
     print("\n🏆 Detecting milestones...")
-    milestones = detect_milestones(frames, file_info)
+    with profile_stage("detect_milestones"):
+        milestones = detect_milestones(frames, file_info)
     print(f"   Found {len(milestones)} milestones")
     
     # Build final output
@@ -467,15 +1253,26 @@ def main():
         'milestones': milestones,
         'graveyard': sorted(deleted_files, key=lambda x: x.get('deleted', '9999'))
     }
+    if args.frame_format == 'delta':
+        output['config']['frameFormat'] = 'delta'
+        output['config']['keyframeInterval'] = args.keyframe_interval
+        output['fileTable'], output['frames'] = encode_delta_frames(frames, args.keyframe_interval)
     
     print(f"\n💾 Saving to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(output, f, indent=2)
+    with profile_stage("write_json"), open(OUTPUT_FILE, "w") as f:
+        if args.frame_format == 'delta':
+            json.dump(output, f, separators=(',', ':'))
+        else:
+            json.dump(output, f, indent=2)
+    save_mining_state(STATE_FILE, 'race', {'tips': index.tips(), **state})
+    index.close()
     
     print("\n✅ Done! Bar chart race data ready.")
     print(f"   Frames: {len(frames)}")
     print(f"   Deleted files in graveyard: {len(deleted_files)}")
-    print(f"   Output: {OUTPUT_FILE.relative_to(REPO_PATH)}")
+    print(f"   Output: {display_path(OUTPUT_FILE)}")
+    
+    finish_profiling()
 
 
 if __name__ == "__main__":
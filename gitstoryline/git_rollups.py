@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Activity Rollups
+=============================
+Commit activity totals at every granularity, aggregated together in one
+pass over the commit store (see git_commit_store.py). Adding a granularity
+costs no git calls and no further reads of the index.
+
+    day       YYYY-MM-DD
+    week      ISO week, YYYY-Www (the ISO year, which can differ from the
+              calendar year around New Year)
+    month     YYYY-MM
+    quarter   YYYY-Qn
+    heatmap   commits by weekday (Monday first) and hour of the day
+
+Each period entry holds its commit count (merges included) and the lines
+inserted, lines deleted and distinct files changed by its non-merge
+commits. Days and hours are the author's local time, as in the author date.
+
+The sums are vectorized with NumPy when it is installed, and computed in
+plain Python otherwise; both give the same output:
+
+    rollups = compute_rollups(load_commit_store(index))
+    rollups["month"]   # [{"month": "2024-05", "commits": 12, "insertions": ..., ...}, ...]
+    rollups["heatmap"]["commits"][0][9]   # commits on Mondays between 09:00 and 10:00
+"""
+
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency
+    np = None
+
+GRANULARITIES = ("day", "week", "month", "quarter")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+HOURS = 24
+
+
+def period_keys(day):
+    """Keys of the periods (in GRANULARITIES order) a YYYY-MM-DD day falls in, and its weekday (0 = Monday)."""
+    parsed = date.fromisoformat(day)
+    iso_year, iso_week, iso_weekday = parsed.isocalendar()
+    quarter = (parsed.month - 1) // 3 + 1
+    return (day, f"{iso_year}-W{iso_week:02d}", day[:7], f"{day[:4]}-Q{quarter}"), iso_weekday - 1
+
+
+def commit_hour(author_date):
+    """Hour of an ISO 8601 author date, in the author's time zone."""
+    return int(author_date[11:13])
+
+
+def period_entry(granularity, key, commits, insertions, deletions, files):
+    return {
+        granularity: key,
+        "commits": int(commits),
+        "insertions": int(insertions),
+        "deletions": int(deletions),
+        "filesChanged": int(files)
+    }
+
+
+def compute_rollups(store, use_numpy=None):
+    """Rollups for every granularity plus the weekday x hour heatmap (see the module docstring).
+
+    `use_numpy` defaults to whether NumPy is installed.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        if np is None:
+            raise RuntimeError("NumPy is not installed (pip install numpy)")
+        return compute_rollups_numpy(store)
+    return compute_rollups_python(store)
+
+
+def compute_rollups_python(store):
+    totals = {granularity: {} for granularity in GRANULARITIES}  # period -> [commits, ins, dels, files]
+    heatmap = [[0] * HOURS for _ in WEEKDAYS]
+    day_periods = {}  # day string id -> period_keys()
+    for row in range(len(store)):
+        day_id = store.days[row]
+        if day_id not in day_periods:
+            day_periods[day_id] = period_keys(store.strings[day_id])
+        keys, weekday = day_periods[day_id]
+        heatmap[weekday][commit_hour(store.dates[row])] += 1
+        buckets = [
+            totals[granularity].setdefault(key, [0, 0, 0, set()])
+            for granularity, key in zip(GRANULARITIES, keys)
+        ]
+        for bucket in buckets:
+            bucket[0] += 1
+        if store.merges[row]:
+            continue
+        for change in store.change_rows(row):
+            insertions = max(store.insertions[change], 0)
+            deletions = max(store.deletions[change], 0)
+            # A rename counts apart from other changes of its new path, as in `git log --numstat`
+            file_id = (store.old_paths[change], store.paths[change])
+            for bucket in buckets:
+                bucket[1] += insertions
+                bucket[2] += deletions
+                bucket[3].add(file_id)
+
+    rollups = {
+        granularity: [
+            period_entry(granularity, key, commits, insertions, deletions, len(files))
+            for key, (commits, insertions, deletions, files) in sorted(totals[granularity].items())
+        ]
+        for granularity in GRANULARITIES
+    }
+    rollups["heatmap"] = {"weekdays": list(WEEKDAYS), "commits": heatmap}
+    return rollups
+
+
+def distinct(values):
+    """Sorted distinct values of an integer array."""
+    values = np.sort(values)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def compute_rollups_numpy(store):
+    commit_count = len(store)
+    # Every commit's day, as an index into the distinct days
+    distinct_days, commit_day = np.unique(
+        np.frombuffer(store.days, dtype=store.days.typecode), return_inverse=True
+    )
+    day_periods = [period_keys(store.strings[day_id]) for day_id in distinct_days.tolist()]
+
+    weekdays = np.array([weekday for _, weekday in day_periods], dtype=np.int64)[commit_day]
+    hours = np.fromiter((commit_hour(author_date) for author_date in store.dates), np.int64, commit_count)
+    heatmap = np.bincount(weekdays * HOURS + hours, minlength=len(WEEKDAYS) * HOURS)
+
+    # The changes of non-merge commits, with the commit row each belongs to
+    starts = np.frombuffer(store.change_starts, dtype=store.change_starts.typecode)
+    change_commit = np.repeat(np.arange(commit_count), np.diff(starts))
+    kept = np.frombuffer(store.merges, dtype=np.uint8)[change_commit] == 0
+    change_commit = change_commit[kept]
+    insertions = np.maximum(np.frombuffer(store.insertions, dtype=store.insertions.typecode)[kept], 0)
+    deletions = np.maximum(np.frombuffer(store.deletions, dtype=store.deletions.typecode)[kept], 0)
+    # A rename counts apart from other changes of its new path, as in `git log --numstat`
+    old_paths = np.frombuffer(store.old_paths, dtype=store.old_paths.typecode)[kept].astype(np.int64) + 1
+    paths = np.frombuffer(store.paths, dtype=store.paths.typecode)[kept].astype(np.int64)
+    _, change_file = np.unique(old_paths * (len(store.strings) + 1) + paths, return_inverse=True)
+    width = int(change_file.max(initial=0)) + 1
+    # Distinct (day, file) pairs; every coarser period's distinct files follow from these
+    day_files = distinct(commit_day[change_commit].astype(np.int64) * width + change_file)
+    pair_day, pair_file = np.divmod(day_files, width)
+
+    rollups = {}
+    for level, granularity in enumerate(GRANULARITIES):
+        keys, day_period = np.unique([periods[level] for periods, _ in day_periods], return_inverse=True)
+        commit_period = day_period[commit_day]
+        change_period = commit_period[change_commit]
+        size = len(keys)
+        commits = np.bincount(commit_period, minlength=size)
+        period_insertions = np.bincount(change_period, weights=insertions, minlength=size)
+        period_deletions = np.bincount(change_period, weights=deletions, minlength=size)
+        period_files = distinct(day_period[pair_day].astype(np.int64) * width + pair_file)
+        files = np.bincount(period_files // width, minlength=size)
+        rollups[granularity] = [
+            period_entry(granularity, *values)
+            for values in zip(keys.tolist(), commits.tolist(), period_insertions.tolist(),
+                              period_deletions.tolist(), files.tolist())
+        ]
+    rollups["heatmap"] = {"weekdays": list(WEEKDAYS), "commits": heatmap.reshape(len(WEEKDAYS), HOURS).tolist()}
+    return rollups
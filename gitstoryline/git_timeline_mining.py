@@ -3,39 +3,90 @@
 GitStoryline Data Mining Script
 ===============================
 Extracts rich git history data for the timeline visualization.
+History is mined into the shared history index (see git_history_index.py)
+and the output is built from queries against it, or from the in-memory
+columns of its changes (see git_commit_store.py). File evolution follows
+renames (see git_file_lineage.py), and activity is rolled up by day, week,
+month and quarter in one pass (see git_rollups.py). Churn hotspots, all time
+and per phase, come from a windowed churn index (see git_churn_index.py).
+Stages that only read the index can run at the same time with
+--concurrency (see git_stage_executor.py). The single-file output streams
+commits and file histories from the index as it is written (see
+git_json_stream.py), after the commit store has been freed. Peak memory is
+set by that store while the stages run: it holds every commit and change,
+so it grows with the length of the history.
 
 Usage:
-    python git_timeline_mining.py
+    python git_timeline_mining.py [--incremental] [--backend NAME] [--sharded | --interned]
+                                  [--repo PATH] [--output DIR] [--concurrency N]
 
 Output:
     gitstoryline/timeline_data.json
+    gitstoryline/timeline/manifest.json + timeline/YYYY-MM.json.gz (--sharded)
+
+Any local repository can be mined with --repo, and its output written to
+another directory with --output (see git_fleet_mining.py for many at once).
 """
 
-import subprocess
+import argparse
+import fnmatch
+import gzip
 import json
 import re
 from datetime import datetime
 from collections import defaultdict
+from itertools import groupby
 from pathlib import Path
 
+from git_backends import BACKENDS, get_backend
+from git_churn_index import load_churn_index
+from git_commit_store import StringTable, load_commit_store, release_commit_store
+from git_file_lineage import FileLineage
+from git_history_index import LOG_ORDER, HistoryIndex
+from git_json_stream import StreamedObject, write_json
+from git_profiling import finish_profiling, profile_stage, record_stage, start_profiling
+from git_rollups import compute_rollups
+from git_stage_executor import DEFAULT_CONCURRENCY, run_stages
+
 # Configuration
 REPO_PATH = Path(__file__).parent.parent.resolve()
 OUTPUT_FILE = REPO_PATH / "gitstoryline" / "timeline_data.json"
-
-# Key files to track with special attention
-KEY_FILES = [
-    "index.html",
-    "js/main.js",
-    "js/app.js",  # May have existed in early versions
-]
-
-
-def run_git_command(cmd):
-    """Run a git command and return output as string."""
-    result = subprocess.run(
-        cmd, cwd=REPO_PATH, capture_output=True, text=True, shell=True
-    )
-    return result.stdout.strip()
+HISTORY_INDEX_FILE = OUTPUT_FILE.parent / "history_index.db"
+PROFILE_FILE = OUTPUT_FILE.parent / "timeline_profile.json"
+SHARD_DIR = OUTPUT_FILE.parent / "timeline"  # Manifest and per-month shards (--sharded)
+MANIFEST_FILE = SHARD_DIR / "manifest.json"
+HISTORY_SPILL_ROWS = 10000  # File history entries buffered per write to the temporary table
+PHASE_HOTSPOTS = 5  # Most churned files and directories listed per architecture phase
+REPOSITORY = {
+    "name": "altsoftwareplanning",
+    "description": "SMT Platform - Software Management Tool"
+}
+
+
+def configure_paths(repo_path, output_dir=None):
+    """Mine another repository (--repo), writing to `output_dir` (--output).
+
+    The output goes to the repository's gitstoryline/ directory unless
+    another is given.
+    """
+    global REPO_PATH, OUTPUT_FILE, HISTORY_INDEX_FILE, PROFILE_FILE, SHARD_DIR, MANIFEST_FILE, REPOSITORY
+    REPO_PATH = Path(repo_path).resolve()
+    output_dir = Path(output_dir).resolve() if output_dir else REPO_PATH / "gitstoryline"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    OUTPUT_FILE = output_dir / "timeline_data.json"
+    HISTORY_INDEX_FILE = output_dir / "history_index.db"
+    PROFILE_FILE = output_dir / "timeline_profile.json"
+    SHARD_DIR = output_dir / "timeline"
+    MANIFEST_FILE = SHARD_DIR / "manifest.json"
+    REPOSITORY = {"name": REPO_PATH.name, "description": ""}
+
+
+def display_path(path):
+    """A path relative to the repository when it lies inside it."""
+    try:
+        return path.relative_to(REPO_PATH)
+    except ValueError:
+        return path
 
 
 def parse_commit_type(message):
@@ -59,95 +110,186 @@ def parse_commit_type(message):
         return "other"
 
 
-def get_all_commits():
-    """Get all commits with full details."""
-    # Format: hash|date|author|message
-    cmd = 'git log --all --pretty=format:"%H|%ad|%an|%s" --date=iso-strict'
-    output = run_git_command(cmd)
-    
-    commits = []
-    for line in output.split("\n"):
-        if not line.strip():
-            continue
-        parts = line.split("|", 3)
-        if len(parts) >= 4:
-            commits.append({
-                "hash": parts[0],
-                "date": parts[1],
-                "author": parts[2],
-                "message": parts[3],
-                "type": parse_commit_type(parts[3])
-            })
-    
-    return commits
+def matches_pathspec(file_path, patterns):
+    """Match a path against git pathspecs (globs, or literal files/directories)."""
+    for pattern in patterns:
+        if any(ch in pattern for ch in "*?["):
+            if fnmatch.fnmatchcase(file_path, pattern):
+                return True
+        elif file_path == pattern or file_path.startswith(pattern.rstrip("/") + "/"):
+            return True
+    return False
 
 
-def get_commit_stats(commit_hash):
-    """Get file changes for a specific commit."""
-    cmd = f'git show --numstat --pretty=format:"" {commit_hash}'
-    output = run_git_command(cmd)
-    
-    files = []
-    insertions = 0
-    deletions = 0
+def iter_commits(index):
+    """Every commit with its file changes (merges against their first parent), newest first.
+
+    Commits are read from the index one at a time, so they can be written out
+    without holding the whole history in memory.
+    """
+    rows = index.iter_query(
+        "SELECT c.hash, c.author_date, c.author, c.subject, ch.display_path, ch.insertions, ch.deletions "
+        f"FROM commits c LEFT JOIN changes ch ON ch.commit_hash = c.hash {LOG_ORDER}, ch.ordinal"
+    )
     
-    for line in output.split("\n"):
-        if not line.strip():
-            continue
-        parts = line.split("\t")
-        if len(parts) >= 3:
-            ins = int(parts[0]) if parts[0].isdigit() else 0
-            dels = int(parts[1]) if parts[1].isdigit() else 0
+    for (commit_hash, date, author, message), changes in groupby(rows, key=lambda row: row[:4]):
+        files = []
+        insertions = 0
+        deletions = 0
+        for *_, file_path, ins, dels in changes:
+            if file_path is None:
+                continue  # No changes
+            ins = ins or 0  # Binary files have no line counts
+            dels = dels or 0
             files.append({
-                "file": parts[2],
+                "file": file_path,
                 "insertions": ins,
                 "deletions": dels
             })
             insertions += ins
             deletions += dels
-    
+        yield {
+            "hash": commit_hash,
+            "date": date,
+            "author": author,
+            "message": message,
+            "type": parse_commit_type(message),
+            "files": files,
+            "filesChanged": len(files),
+            "insertions": insertions,
+            "deletions": deletions
+        }
+
+
+def get_all_commits(index):
+    """Get all commits with full details."""
+    return list(iter_commits(index))
+
+
+def get_history_summary(index):
+    """Commit count, date range and line totals, computed in the index rather than from the commits."""
+    (total,) = index.query("SELECT COUNT(*) FROM commits")[0]
+    newest = index.query(f"SELECT c.author_date FROM commits c {LOG_ORDER} LIMIT 1")
+    oldest = index.query("SELECT c.author_date FROM commits c ORDER BY c.batch ASC, c.position DESC LIMIT 1")
+    added, deleted = index.query(
+        "SELECT COALESCE(SUM(insertions), 0), COALESCE(SUM(deletions), 0) FROM changes"
+    )[0]
     return {
-        "files": files,
-        "filesChanged": len(files),
-        "insertions": insertions,
-        "deletions": deletions
+        "totalCommits": total,
+        "dateRange": {
+            "start": oldest[0][0] if oldest else None,
+            "end": newest[0][0] if newest else None
+        },
+        "totalLinesAdded": added,
+        "totalLinesDeleted": deleted
     }
 
 
-def get_file_line_count_at_commit(commit_hash, file_path):
-    """Get the line count of a file at a specific commit."""
-    cmd = f'git show {commit_hash}:{file_path} 2>/dev/null | wc -l'
-    output = run_git_command(cmd)
-    try:
-        return int(output.strip())
-    except ValueError:
-        return 0
+def get_file_histories(index, lineage):
+    """Get the history of every file, following renames, in one pass.
 
+    Files are keyed by lineage (their latest path, see git_file_lineage.py).
+    Each history lists the commits touching the file newest first, like
+    `git log --follow`, with its line count after the commit under the path
+    it had then. Binary files are left out.
+    """
+    return dict(iter_file_histories(index, lineage))
 
-def get_file_history(file_path):
-    """Get detailed history for a specific file."""
-    cmd = f'git log --all --follow --pretty=format:"%H|%ad|%s" --date=iso-strict -- "{file_path}"'
-    output = run_git_command(cmd)
-    
-    history = []
-    for line in output.split("\n"):
-        if not line.strip():
+
+def iter_file_histories(index, lineage):
+    """get_file_histories() as (file, history) pairs in file order, one history in memory at a time.
+
+    The history entries are spilled to a temporary table in the index, in the
+    order they are read, and read back grouped by file.
+    """
+    binary = spill_file_histories(index, lineage)
+    yield from read_file_histories(index, binary)
+
+
+def spill_file_histories(index, lineage):
+    """Write every file's history entries to the index's temporary file_history table.
+
+    This is the only part of iter_file_histories() that reads the commit
+    store. Returns the names of binary files, which read_file_histories()
+    leaves out.
+    """
+    store = load_commit_store(index)
+    rows = (
+        (commit.hash, commit.date, commit.subject, change.status, change.path, change.new_blob, change.insertions)
+        for commit in store.commits(newest_first=True, merges=False)
+        for change in commit.changes()
+    )
+    connection = index.connection
+    connection.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS file_history "
+        "(name TEXT, seq INTEGER, hash TEXT, date TEXT, message TEXT, lines INTEGER)"
+    )
+    connection.execute("DELETE FROM temp.file_history")
+    
+    binary = set()
+    last_commit = {}
+    batch = []
+    for seq, (commit_hash, date, message, status, path, new_blob, insertions) in enumerate(rows):
+        name = lineage.resolve(path, commit_hash)
+        if insertions is None:
+            binary.add(name)
             continue
-        parts = line.split("|", 2)
-        if len(parts) >= 3:
-            commit_hash = parts[0]
-            lines = get_file_line_count_at_commit(commit_hash, file_path)
-            history.append({
-                "hash": commit_hash,
-                "date": parts[1],
-                "message": parts[2],
-                "lines": lines
-            })
-    
-    return history
+        if last_commit.get(name) == commit_hash:
+            continue
+        last_commit[name] = commit_hash
+        lines = index.count_blob_lines(new_blob) if status != "D" and new_blob else 0
+        batch.append((name, seq, commit_hash, date, message, lines))
+        if len(batch) >= HISTORY_SPILL_ROWS:
+            connection.executemany("INSERT INTO temp.file_history VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    connection.executemany("INSERT INTO temp.file_history VALUES (?, ?, ?, ?, ?, ?)", batch)
+    connection.commit()  # Don't keep a transaction open on the shared index file
+    return binary
+
+
+def read_file_histories(index, binary):
+    """The spilled histories as (file, history) pairs in file order, emptying the table at the end."""
+    connection = index.connection
+    entries = index.iter_query(
+        "SELECT name, hash, date, message, lines FROM temp.file_history ORDER BY name, seq"
+    )
+    for name, history in groupby(entries, key=lambda entry: entry[0]):
+        if name in binary:
+            continue
+        yield name, [
+            {"hash": commit_hash, "date": date, "message": message, "lines": lines}
+            for _, commit_hash, date, message, lines in history
+        ]
+    connection.execute("DELETE FROM temp.file_history")
+    connection.commit()
+
+
+def adds_to_pathspec(status, old_path, path, patterns):
+    """Whether a change adds a file to the pathspecs, as `git log --diff-filter=A -- <pathspec>` sees it.
+
+    A file renamed in from outside the pathspecs counts as added; a rename
+    within them doesn't.
+    """
+    if status not in ("A", "R") or not matches_pathspec(path, patterns):
+        return False
+    return status == "A" or not matches_pathspec(old_path, patterns)
 
 
-def get_directory_creation_dates():
+def get_first_additions(index, patterns):
+    """Oldest commit adding a file matching the pathspecs, as (hash, date, subject).
+
+    Like `git log --diff-filter=A -- <pathspec>`, a file renamed in from outside
+    the pathspec counts as added.
+    """
+    store = load_commit_store(index)
+    for commit in store.commits(merges=False):
+        for change in commit.changes():
+            if adds_to_pathspec(change.status, change.old_path, change.path, patterns):
+                return (commit.hash, commit.date, commit.subject)
+    return None
+
+
+def get_directory_creation_dates(index):
     """Find when key directories were first created."""
     directories = {
         "js/services": "Service Layer Architecture",
@@ -162,341 +304,282 @@ def get_directory_creation_dates():
     milestones = []
     for dir_path, description in directories.items():
         # Find first commit that added files to this directory
-        cmd = f'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "{dir_path}/*" | head -1'
-        output = run_git_command(cmd)
-        if output:
-            parts = output.split("|", 2)
-            if len(parts) >= 3:
-                milestones.append({
-                    "type": "directory_created",
-                    "directory": dir_path,
-                    "description": description,
-                    "date": parts[1],
-                    "hash": parts[0],
-                    "message": parts[2]
-                })
+        first = get_first_additions(index, [f"{dir_path}/*"])
+        if first:
+            milestones.append({
+                "type": "directory_created",
+                "directory": dir_path,
+                "description": description,
+                "date": first[1],
+                "hash": first[0],
+                "message": first[2]
+            })
     
     return sorted(milestones, key=lambda x: x["date"])
 
 
-def get_all_files_timeline():
-    """Get timeline of all file creations and deletions."""
-    # Get file additions
-    cmd = 'git log --all --diff-filter=A --summary --pretty=format:"COMMIT:%H|%ad|%s" --date=iso-strict'
-    output = run_git_command(cmd)
-    
-    events = []
-    current_commit = None
-    
-    for line in output.split("\n"):
-        if line.startswith("COMMIT:"):
-            parts = line[7:].split("|", 2)
-            if len(parts) >= 3:
-                current_commit = {
-                    "hash": parts[0],
-                    "date": parts[1],
-                    "message": parts[2]
-                }
-        elif "create mode" in line and current_commit:
-            # Parse: " create mode 100644 path/to/file.js"
-            match = re.search(r"create mode \d+ (.+)$", line.strip())
-            if match:
-                file_path = match.group(1)
-                events.append({
-                    "type": "file_created",
-                    "file": file_path,
-                    "date": current_commit["date"],
-                    "hash": current_commit["hash"]
-                })
-    
-    return events
-
+def get_all_files_timeline(index):
+    """Get timeline of all file creations."""
+    store = load_commit_store(index)
+    return [
+        {
+            "type": "file_created",
+            "file": change.path,
+            "date": commit.date,
+            "hash": commit.hash
+        }
+        for commit in store.commits(newest_first=True, merges=False)
+        for change in commit.changes()
+        if change.status == "A"
+    ]
+
+
+def get_activity_rollups(index):
+    """Activity by day, ISO week, month and quarter, plus the weekday x hour heatmap (see git_rollups.py)."""
+    return compute_rollups(load_commit_store(index))
+
+
+# Architecture phases, declared as rules over the commit history.
+# Every rule is evaluated together in one pass by detect_architecture_phases():
+#   first_commit   - the first commit in history
+#   message        - first commit whose message matches `pattern` (case-insensitive)
+#   file_added     - first commit adding a file matching any of `paths`
+#                    (git pathspec globs: `*` also matches across `/`), where a
+#                    rename within the paths is not an addition (adds_to_pathspec)
+#   size_drop      - first revision of `path` that is `drop` lines below its
+#                    running maximum, once that maximum exceeds `peak`
+#   monthly_count  - a month with at least `threshold` commits matching `pattern`
+# Rules are listed in tie-break order for phases that start at the same time.
+PHASE_RULES = [
+    {
+        "rule": "first_commit",
+        "phase": 1,
+        "title": "Genesis",
+        "subtitle": "The First Lines of Code",
+        "description": "It started with a single commit. A README and an index.html - the digital equivalent of breaking ground on a new building."
+    },
+    {
+        "rule": "message",
+        "pattern": r"planning|plan",
+        "phase": 2,
+        "title": "The Planning Era",
+        "subtitle": "From Chaos to Structure",
+        "description": "Annual planning features begin to emerge. The codebase starts to find its purpose."
+    },
+    {
+        "rule": "file_added",
+        "paths": ["js/components/*"],
+        "phase": 4,
+        "title": "The Component Revolution",
+        "subtitle": "Modular Thinking Takes Hold",
+        "description": "The js/components directory is born. Views are encapsulated, reusable, testable."
+    },
+    {
+        "rule": "file_added",
+        "paths": ["js/services/*"],
+        "phase": 5,
+        "title": "Service Layer Architecture",
+        "subtitle": "Separation of Concerns",
+        "description": "The codebase had grown wild. Views were talking to each other, business logic was scattered. It was time for the Service Revolution."
+    },
+    {
+        "rule": "file_added",
+        "paths": ["js/ai/*", "ai/*"],
+        "phase": 6,
+        "title": "AI Awakens",
+        "subtitle": "Intelligence Enters the Codebase",
+        "description": "AI features emerge - context-aware chat, smart suggestions, automated workflows."
+    },
+    {
+        "rule": "file_added",
+        "paths": ["tests/*", "*.test.js"],
+        "phase": 8,
+        "title": "Modern Era",
+        "subtitle": "Testing and CI/CD Maturity",
+        "description": "Unit tests arrive. Linting enforced. The codebase becomes a professional-grade project."
+    },
+    {
+        # Monolith Busting (index.html reduction)
+        "rule": "size_drop",
+        "path": "index.html",
+        "peak": 2000,
+        "drop": 1000,
+        "phase": 3,
+        "title": "Monolith Busting",
+        "subtitle": "Breaking the Big File",
+        "description": "The massive index.html is finally broken apart into separate modules, marking a major refactor point."
+    },
+    {
+        "rule": "file_added",
+        "paths": ["js/components/WorkspaceComponent.js"],
+        "phase": 4.5,
+        "title": "Workspace Layout",
+        "subtitle": "The Sidebar Era",
+        "description": "Navigation moves to a persistent sidebar. The concept of a 'Workspace' with swappable views is introduced."
+    },
+    {
+        "rule": "file_added",
+        "paths": ["docs/*contract.md"],
+        "phase": 6.5,
+        "title": "Agent Contracts",
+        "subtitle": "Rules for Robots",
+        "description": "Formal contracts (docs/*.md) are established to guide AI agents in maintaining code quality and consistency."
+    },
+    {
+        "rule": "file_added",
+        "paths": ["css/settings/variables.css"],
+        "phase": 5.5,
+        "title": "UI Theme Styling",
+        "subtitle": "Dark Mode & Theming",
+        "description": "Introduction of semantic CSS variables and comprehensive dark mode support."
+    },
+    {
+        # Find a month with >= 5 tech debt commits
+        "rule": "monthly_count",
+        "pattern": r"tech debt|compliance",
+        "threshold": 5,
+        "phase": 7,
+        "title": "Tech Debt Paydown",
+        "subtitle": "Focus on Compliance",
+        "description": "A dedicated phase for cleaning up technical debt, improving compliance, and standardizing patterns."
+    },
+    {
+        "rule": "file_added",
+        "paths": ["eslint.config.mjs", "vitest.config.mjs"],
+        "phase": 9,
+        "title": "Code Quality Gates",
+        "subtitle": "Automated Standards",
+        "description": "Linting (ESLint) and Testing (Vitest) configurations are added, enforcing strict quality gates for all changes."
+    },
+]
 
-def get_monthly_stats():
-    """Aggregate statistics by month."""
-    cmd = 'git log --all --pretty=format:"%ad" --date=format:"%Y-%m" --numstat'
-    output = run_git_command(cmd)
-    
-    monthly = defaultdict(lambda: {"commits": 0, "insertions": 0, "deletions": 0, "files": set()})
-    current_month = None
-    
-    for line in output.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Check if it's a date line (YYYY-MM format)
-        if re.match(r"^\d{4}-\d{2}$", line):
-            current_month = line
-            monthly[current_month]["commits"] += 1
-        elif current_month and "\t" in line:
-            parts = line.split("\t")
-            if len(parts) >= 3:
-                ins = int(parts[0]) if parts[0].isdigit() else 0
-                dels = int(parts[1]) if parts[1].isdigit() else 0
-                monthly[current_month]["insertions"] += ins
-                monthly[current_month]["deletions"] += dels
-                monthly[current_month]["files"].add(parts[2])
-    
-    # Convert to serializable format
-    result = []
-    for month in sorted(monthly.keys()):
-        data = monthly[month]
-        result.append({
-            "month": month,
-            "commits": data["commits"],
-            "insertions": data["insertions"],
-            "deletions": data["deletions"],
-            "filesChanged": len(data["files"])
-        })
-    
-    return result
 
+def iter_history_changes(index):
+    """Yield (hash, date, message, changes) for every non-merge commit, oldest first.
 
-def detect_architecture_phases():
-    """Detect major architectural phases based on patterns."""
-    phases = []
-    
-    # Phase 1: Genesis - first commits
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict | head -3'
-    output = run_git_command(cmd)
-    lines = output.split("\n")
-    if lines:
-        parts = lines[0].split("|", 2)
-        phases.append({
-            "phase": 1,
-            "title": "Genesis",
-            "subtitle": "The First Lines of Code",
-            "description": "It started with a single commit. A README and an index.html - the digital equivalent of breaking ground on a new building.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0] if parts else None
-        })
-    
-    # Phase 2: Planning Era - first planning-related commit
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --grep="planning\\|plan" -i | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 2,
-            "title": "The Planning Era",
-            "subtitle": "From Chaos to Structure",
-            "description": "Annual planning features begin to emerge. The codebase starts to find its purpose.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
-    
-    # Phase 3: Component Architecture
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "js/components/*" | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 4,
-            "title": "The Component Revolution",
-            "subtitle": "Modular Thinking Takes Hold",
-            "description": "The js/components directory is born. Views are encapsulated, reusable, testable.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
-    
-    # Phase 4: Service Layer
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "js/services/*" | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 5,
-            "title": "Service Layer Architecture",
-            "subtitle": "Separation of Concerns",
-            "description": "The codebase had grown wild. Views were talking to each other, business logic was scattered. It was time for the Service Revolution.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
-    
-    # Phase 5: AI Integration
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "js/ai/*" "ai/*" | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 6,
-            "title": "AI Awakens",
-            "subtitle": "Intelligence Enters the Codebase",
-            "description": "AI features emerge - context-aware chat, smart suggestions, automated workflows.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
+    `changes` is a list of (status, blob_id, path, old_path), old_path being
+    None except for renames.
+    """
+    rows = index.query(
+        "SELECT c.hash, c.author_date, c.message, ch.status, ch.old_path, ch.path, ch.new_blob "
+        "FROM commits c LEFT JOIN changes ch ON ch.commit_hash = c.hash "
+        "WHERE c.is_merge = 0 ORDER BY c.batch ASC, c.position DESC, ch.ordinal"
+    )
     
-    # Phase 6: Testing/CI
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "tests/*" "*.test.js" | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 8,
-            "title": "Modern Era",
-            "subtitle": "Testing and CI/CD Maturity",
-            "description": "Unit tests arrive. Linting enforced. The codebase becomes a professional-grade project.",
-            "phase": 8,
-            "title": "Modern Era",
-            "subtitle": "Testing and CI/CD Maturity",
-            "description": "Unit tests arrive. Linting enforced. The codebase becomes a professional-grade project.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
+    current = None
+    for commit_hash, date, message, status, old_path, path, new_blob in rows:
+        if current is None or current[0] != commit_hash:
+            if current:
+                yield current
+            current = (commit_hash, date, message, [])
+        if status:
+            current[3].append((status, new_blob, path, old_path))
+    if current:
+        yield current
 
-    # NEW PHASES
-    
-    # Monolith Busting (index.html reduction)
-    cmd = 'git log --all --pretty=format:"%H|%ad|%s" --date=iso-strict -- "index.html"'
-    output = run_git_command(cmd)
-    index_history = []
-    if output:
-        for line in output.split('\n'):
-            if line.strip():
-                parts = line.split("|", 2)
-                h = parts[0]
-                lines = get_file_line_count_at_commit(h, "index.html")
-                index_history.append({'hash': h, 'date': parts[1], 'lines': lines})
-    
-    # Sort history by date to find the drop
-    index_history.sort(key=lambda x: x['date'])
-    max_lines = 0
-    for i, entry in enumerate(index_history):
-        max_lines = max(max_lines, entry['lines'])
-        if max_lines > 2000 and entry['lines'] < (max_lines - 1000):
-            # Found the bust
-            phases.append({
-                "phase": 3, # Inserted
-                "title": "Monolith Busting",
-                "subtitle": "Breaking the Big File",
-                "description": "The massive index.html is finally broken apart into separate modules, marking a major refactor point.",
-                "startDate": entry['date'],
-                "hash": entry['hash']
-            })
-            break
-
-    # Workspace Layout
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "js/components/WorkspaceComponent.js" | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 4.5, # Intermediate
-            "title": "Workspace Layout",
-            "subtitle": "The Sidebar Era",
-            "description": "Navigation moves to a persistent sidebar. The concept of a 'Workspace' with swappable views is introduced.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
 
-    # Agent Contracts
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "docs/*contract.md" | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 6.5,
-            "title": "Agent Contracts",
-            "subtitle": "Rules for Robots",
-            "description": "Formal contracts (docs/*.md) are established to guide AI agents in maintaining code quality and consistency.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
+def build_phase(rule, commit_hash, date):
+    return {
+        "phase": rule["phase"],
+        "title": rule["title"],
+        "subtitle": rule["subtitle"],
+        "description": rule["description"],
+        "startDate": date,
+        "hash": commit_hash
+    }
 
-    # UI Theme Styling
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "css/settings/variables.css" | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 5.5,
-            "title": "UI Theme Styling",
-            "subtitle": "Dark Mode & Theming",
-            "description": "Introduction of semantic CSS variables and comprehensive dark mode support.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
 
-    # Tech Debt Paydown
-    # Find a month with > 5 tech debt commits
-    cmd = 'git log --all --pretty=format:"%ad" --date=format:"%Y-%m" --grep="Tech debt" --grep="compliance" -i'
-    output = run_git_command(cmd)
-    counts = defaultdict(int)
-    tech_debt_date = None
-    for line in output.split('\n'):
-        if line.strip():
-            counts[line.strip()] += 1
-            if counts[line.strip()] >= 5:
-                # Find the first commit of this month to use as start date
-                cmd_first = f'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --before="{line.strip()}-30" --after="{line.strip()}-01" --grep="Tech debt" --grep="compliance" -i | head -1'
-                res = run_git_command(cmd_first)
-                if res:
-                   tech_debt_date = res.split("|", 2)
+def detect_architecture_phases(index, rules=PHASE_RULES):
+    """Detect major architectural phases by evaluating rules over one history pass."""
+    found = {}  # rule index -> (hash, date)
+    samples = defaultdict(list)  # size_drop rule index -> [(date, hash, blob_id)]
+    matches = defaultdict(list)  # monthly_count rule index -> [(month, hash, date)]
+    patterns = {
+        i: re.compile(rule["pattern"], re.IGNORECASE)
+        for i, rule in enumerate(rules) if "pattern" in rule
+    }
+    
+    for commit_hash, date, message, changes in iter_history_changes(index):
+        for i, rule in enumerate(rules):
+            kind = rule["rule"]
+            if kind == "size_drop":
+                for status, blob_id, file_path, old_path in changes:
+                    # A rename away from the path ends its revisions like a delete
+                    if status == "R" and old_path == rule["path"]:
+                        samples[i].append((date, commit_hash, None))
+                    if file_path == rule["path"]:
+                        samples[i].append((date, commit_hash, None if status == "D" else blob_id))
+            elif kind == "monthly_count":
+                if patterns[i].search(message):
+                    matches[i].append((date[:7], commit_hash, date))
+            elif i in found:
+                continue
+            elif kind == "first_commit":
+                found[i] = (commit_hash, date)
+            elif kind == "message":
+                if patterns[i].search(message):
+                    found[i] = (commit_hash, date)
+            elif kind == "file_added":
+                if any(adds_to_pathspec(status, old_path, file_path, rule["paths"])
+                       for status, _, file_path, old_path in changes):
+                    found[i] = (commit_hash, date)
+    
+    # Size drops are judged in date order, newest first among equal dates
+    for i, history in samples.items():
+        rule = rules[i]
+        max_lines = 0
+        for date, commit_hash, blob_id in sorted(reversed(history), key=lambda x: x[0]):
+            lines = index.count_blob_lines(blob_id) if blob_id else 0
+            max_lines = max(max_lines, lines)
+            if max_lines > rule["peak"] and lines < (max_lines - rule["drop"]):
+                found[i] = (commit_hash, date)
                 break
     
-    if tech_debt_date:
-        phases.append({
-            "phase": 7,
-            "title": "Tech Debt Paydown",
-            "subtitle": "Focus on Compliance",
-            "description": "A dedicated phase for cleaning up technical debt, improving compliance, and standardizing patterns.",
-            "startDate": tech_debt_date[1] if len(tech_debt_date) > 1 else None,
-            "hash": tech_debt_date[0]
-        })
-
-    # Code Quality Gates
-    cmd = 'git log --all --reverse --pretty=format:"%H|%ad|%s" --date=iso-strict --diff-filter=A -- "eslint.config.mjs" "vitest.config.mjs" | head -1'
-    output = run_git_command(cmd)
-    if output:
-        parts = output.split("|", 2)
-        phases.append({
-            "phase": 9,
-            "title": "Code Quality Gates",
-            "subtitle": "Automated Standards",
-            "description": "Linting (ESLint) and Testing (Vitest) configurations are added, enforcing strict quality gates for all changes.",
-            "startDate": parts[1] if len(parts) > 1 else None,
-            "hash": parts[0]
-        })
+    # Monthly counts are tallied newest first; the phase starts with the
+    # month's earliest matching commit
+    for i, history in matches.items():
+        counts = defaultdict(int)
+        for month, _, _ in reversed(history):
+            counts[month] += 1
+            if counts[month] >= rules[i]["threshold"]:
+                first = min((m for m in history if m[0] == month),
+                            key=lambda m: datetime.fromisoformat(m[2]))
+                found[i] = (first[1], first[2])
+                break
     
+    phases = [build_phase(rules[i], *found[i]) for i in sorted(found)]
     return sorted(phases, key=lambda x: x.get("startDate", ""))
 
 
-def get_top_churn_files(limit=20):
-    """Find files with the most commits (highest churn)."""
-    cmd = 'git log --all --name-only --pretty=format:""'
-    output = run_git_command(cmd)
-    
-    file_counts = defaultdict(int)
-    for line in output.split("\n"):
-        if line.strip() and not line.startswith("."):
-            file_counts[line.strip()] += 1
-    
-    # Sort by count and filter out deleted files
-    sorted_files = sorted(file_counts.items(), key=lambda x: -x[1])[:limit * 2]
-    
-    # Filter to only existing files
-    existing = []
-    for file_path, count in sorted_files:
-        full_path = REPO_PATH / file_path
-        if full_path.exists():
-            existing.append({"file": file_path, "commits": count})
-        if len(existing) >= limit:
-            break
-    
-    return existing
+def get_top_churn_files(index, limit=20):
+    """Find the files still in HEAD with the most commits (highest churn), with decayed scores."""
+    head_paths = {path for (path,) in index.query("SELECT path FROM head_tree")}
+    return load_churn_index(index).top(limit=limit, where=head_paths.__contains__)
 
 
-def get_file_tree_snapshot():
+def add_phase_hotspots(index, phases, limit=PHASE_HOTSPOTS):
+    """Give every phase the files and directories that churned most while it lasted.
+
+    A phase lasts from its start until the next phase starts (phases are in
+    start order). Hotspots are ranked by commits, with scores decayed as of
+    the phase's end.
+    """
+    churn = load_churn_index(index)
+    for phase, next_phase in zip(phases, phases[1:] + [None]):
+        since, until = phase.get("startDate"), next_phase and next_phase.get("startDate")
+        phase["hotspots"] = {
+            "files": churn.top(since, until, limit),
+            "directories": churn.top(since, until, limit, kind="directory")
+        }
+    return phases
+
+
+def get_file_tree_snapshot(index):
     """Get current file tree structure for visualization."""
-    cmd = 'git ls-tree -r --name-only HEAD'
-    output = run_git_command(cmd)
+    rows = index.query("SELECT path FROM head_tree ORDER BY path")
     
     tree = {}
-    for line in output.split("\n"):
-        if not line.strip():
-            continue
+    for (line,) in rows:
         parts = line.split("/")
         current = tree
         for i, part in enumerate(parts):
@@ -514,91 +597,379 @@ def get_file_tree_snapshot():
     return tree
 
 
-def main():
-    print("🔍 GitStoryline Data Mining")
-    print("=" * 50)
+def intern_output(data):
+    """Return the output with repeated strings replaced by ids into string tables.
+
+    Layout of the interned format ("format": "interned"):
+        strings               {"paths": [...], "authors": [...], "types": [...]}
+                              (types holds commit and file event types)
+        commits[]             author and type are ids; files is
+                              {"path": [ids], "insertions": [...], "deletions": [...]};
+                              filesChanged and the totals are left to the decoder
+        fileCreationTimeline  {"type": [ids], "file": [ids], "commit": [indexes]}
+        fileEvolution         {path: {"commit": [indexes], "lines": [...]}}
+    Commit indexes point into `commits`, which supplies hash, date and message.
+    decode_interned_output() restores the plain format.
+    """
+    paths, authors, types = StringTable(), StringTable(), StringTable()
+    commit_indexes = {commit["hash"]: i for i, commit in enumerate(data["commits"])}
     
-    print("\n📊 Extracting commits...")
-    commits = get_all_commits()
-    print(f"   Found {len(commits)} commits")
+    commits = []
+    for commit in data["commits"]:
+        commits.append({
+            "hash": commit["hash"],
+            "date": commit["date"],
+            "author": authors.intern(commit["author"]),
+            "message": commit["message"],
+            "type": types.intern(commit["type"]),
+            "files": {
+                "path": [paths.intern(f["file"]) for f in commit["files"]],
+                "insertions": [f["insertions"] for f in commit["files"]],
+                "deletions": [f["deletions"] for f in commit["files"]]
+            }
+        })
     
-    print("\n📈 Getting commit statistics...")
-    # Add stats to first 100 commits (for demo) and every 10th after
-    for i, commit in enumerate(commits):
-        if i < 100 or i % 10 == 0:
-            stats = get_commit_stats(commit["hash"])
-            commit.update(stats)
-        else:
-            commit["files"] = []
-            commit["filesChanged"] = 0
-            commit["insertions"] = 0
-            commit["deletions"] = 0
+    events = data["fileCreationTimeline"]
+    file_events = {
+        "type": [types.intern(event["type"]) for event in events],
+        "file": [paths.intern(event["file"]) for event in events],
+        "commit": [commit_indexes[event["hash"]] for event in events]
+    }
+    evolution = {
+        file_path: {
+            "commit": [commit_indexes[entry["hash"]] for entry in history],
+            "lines": [entry["lines"] for entry in history]
+        }
+        for file_path, history in data["fileEvolution"].items()
+    }
     
-    print("\n📁 Tracking key file evolution...")
-    file_evolution = {}
-    for file_path in KEY_FILES:
-        print(f"   Tracking: {file_path}")
-        history = get_file_history(file_path)
-        if history:
-            file_evolution[file_path] = history
+    interned = {"format": "interned"}
+    for key, value in data.items():
+        interned[key] = {
+            "commits": commits,
+            "fileCreationTimeline": file_events,
+            "fileEvolution": evolution
+        }.get(key, value)
+    interned["strings"] = {"paths": paths.strings, "authors": authors.strings, "types": types.strings}
+    return interned
+
+
+def decode_interned_output(data):
+    """Expand intern_output() output back to the plain format. Plain output is returned as is."""
+    if data.get("format") != "interned":
+        return data
+    paths, authors, types = (data["strings"][table] for table in ("paths", "authors", "types"))
     
-    print("\n🏗️  Detecting architecture milestones...")
-    dir_milestones = get_directory_creation_dates()
-    print(f"   Found {len(dir_milestones)} directory milestones")
+    commits = []
+    for commit in data["commits"]:
+        files = commit["files"]
+        commits.append({
+            "hash": commit["hash"],
+            "date": commit["date"],
+            "author": authors[commit["author"]],
+            "message": commit["message"],
+            "type": types[commit["type"]],
+            "files": [
+                {"file": paths[path], "insertions": ins, "deletions": dels}
+                for path, ins, dels in zip(files["path"], files["insertions"], files["deletions"])
+            ],
+            "filesChanged": len(files["path"]),
+            "insertions": sum(files["insertions"]),
+            "deletions": sum(files["deletions"])
+        })
     
-    print("\n📅 Calculating monthly statistics...")
-    monthly_stats = get_monthly_stats()
-    print(f"   Aggregated {len(monthly_stats)} months")
+    events = data["fileCreationTimeline"]
+    file_events = [
+        {
+            "type": types[event_type],
+            "file": paths[path],
+            "date": commits[commit]["date"],
+            "hash": commits[commit]["hash"]
+        }
+        for event_type, path, commit in zip(events["type"], events["file"], events["commit"])
+    ]
+    evolution = {
+        file_path: [
+            {
+                "hash": commits[commit]["hash"],
+                "date": commits[commit]["date"],
+                "message": commits[commit]["message"],
+                "lines": lines
+            }
+            for commit, lines in zip(history["commit"], history["lines"])
+        ]
+        for file_path, history in data["fileEvolution"].items()
+    }
     
-    print("\n🎭 Detecting architecture phases...")
-    phases = detect_architecture_phases()
-    print(f"   Detected {len(phases)} phases")
+    decoded = {}
+    for key, value in data.items():
+        if key in ("format", "strings"):
+            continue
+        decoded[key] = {
+            "commits": commits,
+            "fileCreationTimeline": file_events,
+            "fileEvolution": evolution
+        }.get(key, value)
+    return decoded
+
+
+def shard_month(entry):
+    """Month (YYYY-MM) an output entry is filed under."""
+    return entry["date"][:7]
+
+
+def write_sharded_output(data, shard_dir=SHARD_DIR):
+    """Write the output as a small manifest plus one gzip-compressed shard per month.
+
+    Shards (`YYYY-MM.json.gz`) hold the month's commits, file creation events,
+    fileEvolution entries and monthlyStats entry, each in output order. The
+    manifest keeps everything else, plus the shard list with commit counts,
+    so the viewer can lay out the whole history before fetching any shard.
+    Returns the manifest.
+    """
+    shards = defaultdict(lambda: {"commits": [], "fileCreationTimeline": [], "fileEvolution": {}})
+    for commit in data["commits"]:
+        shards[shard_month(commit)]["commits"].append(commit)
+    for event in data["fileCreationTimeline"]:
+        shards[shard_month(event)]["fileCreationTimeline"].append(event)
+    for file_path, history in data["fileEvolution"].items():
+        for entry in history:
+            shards[shard_month(entry)]["fileEvolution"].setdefault(file_path, []).append(entry)
+    for stats in data["monthlyStats"]:
+        shards[stats["month"]]["stats"] = stats
+    
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    shard_list = []
+    for month in sorted(shards):
+        name = f"{month}.json.gz"
+        payload = json.dumps({"month": month, **shards[month]}, separators=(",", ":")).encode("utf-8")
+        # mtime=0 keeps unchanged shards byte-identical between runs
+        compressed = gzip.compress(payload, mtime=0)
+        (shard_dir / name).write_bytes(compressed)
+        shard_list.append({
+            "month": month,
+            "file": name,
+            "commits": len(shards[month]["commits"]),
+            "bytes": len(compressed)
+        })
+    remove_sharded_output(shard_dir, keep={shard["file"] for shard in shard_list})
     
-    print("\n🔥 Finding high-churn files...")
-    top_churn = get_top_churn_files(30)
-    print(f"   Top {len(top_churn)} files by commit count")
+    manifest = {
+        key: value for key, value in data.items()
+        if key not in ("commits", "fileCreationTimeline", "fileEvolution")
+    }
+    manifest["fileEvolutionFiles"] = list(data["fileEvolution"])
+    manifest["shards"] = shard_list
+    with open(shard_dir / MANIFEST_FILE.name, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def remove_sharded_output(shard_dir=SHARD_DIR, keep=()):
+    """Delete shards (and, unless some are kept, the manifest) from an earlier sharded run."""
+    if not shard_dir.exists():
+        return
+    for shard in shard_dir.glob("*.json.gz"):
+        if shard.name not in keep:
+            shard.unlink()
+    if not keep and (shard_dir / MANIFEST_FILE.name).exists():
+        (shard_dir / MANIFEST_FILE.name).unlink()
+
+
+def get_file_evolution(index):
+    """(former paths of renamed files, rename-aware histories of every file)."""
+    lineage = FileLineage.load(index)
+    return lineage.former_paths(), get_file_histories(index, lineage)
+
+
+# Stages that only read the history index, so they can run at the same time
+# (see git_stage_executor.py). Each is called with its own HistoryIndex.
+# File histories join them unless they are streamed into the output.
+INDEPENDENT_STAGES = [
+    ("detect_architecture_phases", detect_architecture_phases),
+    ("get_directory_creation_dates", get_directory_creation_dates),
+    ("get_activity_rollups", get_activity_rollups),
+    ("get_top_churn_files", lambda index: get_top_churn_files(index, 30)),
+    ("get_file_tree_snapshot", get_file_tree_snapshot),
+    ("get_all_files_timeline", get_all_files_timeline),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mine git history for the GitStoryline timeline.")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only mine commits added since the last run into the history index instead of rebuilding it"
+    )
+    parser.add_argument(
+        "--repo", metavar="PATH",
+        help="Mine the git repository at PATH instead of the one this script lives in"
+    )
+    parser.add_argument(
+        "--output", metavar="DIR",
+        help="Directory for the output, history index and profile "
+             "(default: the repository's gitstoryline/ directory)"
+    )
+    parser.add_argument(
+        "--backend", choices=["auto", *BACKENDS], default="subprocess",
+        help="How git is read: the git CLI (subprocess), pygit2 in-process, or pygit2 when installed (auto)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help=f"How many of the independent stages (file evolution, milestones, activity rollups, "
+             f"phases, churn, file tree) run at once (default: {DEFAULT_CONCURRENCY}; 1 runs them in turn)"
+    )
+    layout = parser.add_mutually_exclusive_group()
+    layout.add_argument(
+        "--sharded", action="store_true",
+        help=f"Write a manifest plus gzip-compressed per-month shards to {SHARD_DIR.name}/ "
+             f"instead of a single {OUTPUT_FILE.name}, so the viewer loads history on demand"
+    )
+    layout.add_argument(
+        "--interned", action="store_true",
+        help="Write compact JSON with paths, authors and commit types interned into string "
+             "tables and per-commit file changes as parallel arrays (see intern_output)"
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const="", metavar="REPORT",
+        help=f"Record per-stage wall time, git subprocesses, git bytes read and peak RSS "
+             f"to a JSON report (default: {PROFILE_FILE.name} next to the output)"
+    )
+    parser.add_argument(
+        "--cprofile", metavar="PATH",
+        help="With --profile, also write a cProfile dump of the run to PATH"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.repo or args.output:
+        configure_paths(args.repo or REPO_PATH, args.output)
+    if args.profile is not None:
+        start_profiling("git_timeline_mining.py", args.profile or PROFILE_FILE, args.cprofile)
     
-    print("\n🌳 Capturing file tree...")
-    file_tree = get_file_tree_snapshot()
+    print("🔍 GitStoryline Data Mining")
+    print("=" * 50)
     
-    print("\n📁 Getting file creation timeline...")
-    file_events = get_all_files_timeline()
-    print(f"   Found {len(file_events)} file creation events")
+    print("\n🗂️  Updating history index...")
+    index = HistoryIndex(HISTORY_INDEX_FILE, REPO_PATH, get_backend(args.backend, REPO_PATH))
+    with profile_stage("update_index"):
+        added = index.update(rebuild=not args.incremental)
+    print(f"   Indexed {added} new commits with the {index.backend.name} backend")
+    
+    print("\n📊 Summarizing history...")
+    with profile_stage("get_history_summary"):
+        summary = get_history_summary(index)
+    print(f"   Found {summary['totalCommits']} commits")
+    
+    # The single-file output streams commits and file histories from the index
+    # as it is written; the sharded and interned layouts need them in memory
+    streaming = not (args.sharded or args.interned)
+    stages = INDEPENDENT_STAGES if streaming else [("get_file_histories", get_file_evolution), *INDEPENDENT_STAGES]
+    print(f"\n⚡ Running {len(stages)} independent stages, {args.concurrency} at a time...")
+    # The main index holds the commit store, so the stages' own indexes share one load
+    with profile_stage("load_commit_store"):
+        load_commit_store(index)
+    worker_indexes = []
+    
+    def open_index():
+        worker_index = HistoryIndex(HISTORY_INDEX_FILE, REPO_PATH, get_backend(args.backend, REPO_PATH))
+        worker_indexes.append(worker_index)
+        return worker_index
+    
+    with profile_stage("independent_stages"):
+        results = run_stages(stages, open_index, args.concurrency)
+        for result in results.values():
+            record_stage(result.name, result.seconds)
+    slowest = max(results.values(), key=lambda result: result.seconds)
+    print(f"   Slowest: {slowest.name} ({slowest.seconds:.2f}s of "
+          f"{sum(result.seconds for result in results.values()):.2f}s in total)")
+    
+    print()
+    tracked_files = 0
+    if streaming:
+        with profile_stage("FileLineage.load"):
+            lineage = FileLineage.load(index)
+            file_lineage = lineage.former_paths()
+        with profile_stage("spill_file_histories"):
+            binary_files = spill_file_histories(index, lineage)
+        
+        def stream_file_histories():
+            nonlocal tracked_files
+            for name, history in read_file_histories(index, binary_files):
+                tracked_files += 1
+                yield name, history
+        
+        file_evolution = StreamedObject(stream_file_histories())
+        print(f"📁 File histories are streamed into the output, {len(file_lineage)} files renamed")
+    else:
+        file_lineage, file_evolution = results["get_file_histories"].unwrap()
+        tracked_files = len(file_evolution)
+        print(f"📁 Tracked {len(file_evolution)} files, {len(file_lineage)} of them renamed")
+    dir_milestones = results["get_directory_creation_dates"].unwrap()
+    print(f"🏗️  Found {len(dir_milestones)} directory milestones")
+    rollups = results["get_activity_rollups"].unwrap()
+    print(f"📅 Aggregated {len(rollups['day'])} days, {len(rollups['week'])} weeks, "
+          f"{len(rollups['month'])} months and {len(rollups['quarter'])} quarters")
+    phases = add_phase_hotspots(index, results["detect_architecture_phases"].unwrap())
+    print(f"🎭 Detected {len(phases)} architecture phases, with their churn hotspots")
+    top_churn = results["get_top_churn_files"].unwrap()
+    print(f"🔥 Top {len(top_churn)} files by commit count")
+    file_tree = results["get_file_tree_snapshot"].unwrap()
+    print("🌳 Captured the file tree")
+    file_events = results["get_all_files_timeline"].unwrap()
+    print(f"📁 Found {len(file_events)} file creation events")
+    # Nothing below reads the commit store; free it before the output is written
+    release_commit_store(index)
     
     # Build the output
     data = {
         "generatedAt": datetime.now().isoformat(),
-        "repository": {
-            "name": "altsoftwareplanning",
-            "description": "SMT Platform - Software Management Tool"
-        },
-        "summary": {
-            "totalCommits": len(commits),
-            "dateRange": {
-                "start": commits[-1]["date"] if commits else None,
-                "end": commits[0]["date"] if commits else None
-            },
-            "totalLinesAdded": sum(c.get("insertions", 0) for c in commits),
-            "totalLinesDeleted": sum(c.get("deletions", 0) for c in commits),
-            "totalFilesCreated": len(file_events)
-        },
-        "commits": commits,
+        "repository": REPOSITORY,
+        "summary": {**summary, "totalFilesCreated": len(file_events)},
+        "commits": iter_commits(index) if streaming else get_all_commits(index),
         "fileEvolution": file_evolution,
+        "fileLineage": file_lineage,
         "directoryMilestones": dir_milestones,
-        "monthlyStats": monthly_stats,
+        "monthlyStats": rollups["month"],
+        "activityRollups": {granularity: rollups[granularity] for granularity in ("day", "week", "quarter")},
+        "activityHeatmap": rollups["heatmap"],
         "architecturePhases": phases,
         "topChurnFiles": top_churn,
         "fileTree": file_tree,
         "fileCreationTimeline": file_events
     }
     
-    print(f"\n💾 Saving to {OUTPUT_FILE}...")
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    if args.sharded:
+        print(f"\n💾 Saving manifest and monthly shards to {SHARD_DIR}...")
+        with profile_stage("write_json"):
+            manifest = write_sharded_output(data, SHARD_DIR)
+        output_path = MANIFEST_FILE
+    else:
+        print(f"\n💾 Saving to {OUTPUT_FILE}...")
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with profile_stage("write_json"), open(OUTPUT_FILE, "w") as f:
+            if args.interned:
+                json.dump(intern_output(data), f, separators=(",", ":"))
+            else:
+                write_json(f, data, indent=2)
+        # The viewer prefers a manifest; don't leave a stale one behind
+        remove_sharded_output(SHARD_DIR)
+        output_path = OUTPUT_FILE
+    line_counts = index.line_counts
+    index.close()
+    cache_hits = line_counts.hits + sum(worker.line_counts.hits for worker in worker_indexes)
+    cache_misses = line_counts.misses + sum(worker.line_counts.misses for worker in worker_indexes)
     
     print("\n✅ Done! Data mining complete.")
-    print(f"   Output: {OUTPUT_FILE.relative_to(REPO_PATH)}")
+    print(f"   Output: {display_path(output_path)}")
+    if args.sharded:
+        print(f"   Shards: {len(manifest['shards'])} months, "
+              f"{sum(shard['bytes'] for shard in manifest['shards']):,} bytes compressed")
+    print(f"   History index: {display_path(HISTORY_INDEX_FILE)}")
+    print(f"   File histories: {tracked_files} files")
+    print(f"   Line-count cache: {cache_hits} hits, {cache_misses} misses")
     
     # Print summary
     print("\n📋 Summary:")
@@ -607,6 +978,8 @@ def main():
     print(f"   Lines added: {data['summary']['totalLinesAdded']:,}")
     print(f"   Lines deleted: {data['summary']['totalLinesDeleted']:,}")
     print(f"   Files created: {data['summary']['totalFilesCreated']}")
+    
+    finish_profiling()
 
 
 if __name__ == "__main__":
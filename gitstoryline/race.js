@@ -16,6 +16,8 @@ const state = {
   globalMaxLines: 0, // Fixed scale based on global max
   deletedFilesShown: new Set(),
   previousFiles: new Set(), // Track files from previous frame
+  renderedFrame: -1, // Index of the frame on screen, to know when rank events apply
+  frameCache: { index: -1, active: null, frame: null }, // Last decoded delta frame
   layout: { iconX: -210, rankX: -190 }, // Dynamic layout properties
 };
 
@@ -44,28 +46,38 @@ async function loadData() {
   try {
     const response = await fetch('race_data.json');
     state.data = await response.json();
+    state.frameCache = { index: -1, active: null, frame: null };
 
-    // Calculate GLOBAL max lines across ALL frames for fixed scale
+    // Calculate GLOBAL max lines across ALL frames for fixed scale,
+    // and the dynamic left margin based on longest filename
     state.globalMaxLines = 0;
-    state.data.frames.forEach((frame) => {
-      frame.files.forEach((f) => {
-        if (f.lines > state.globalMaxLines) {
-          state.globalMaxLines = f.lines;
-        }
-      });
-    });
-    console.log('Global max lines:', state.globalMaxLines);
-
-    // Calculate dynamic left margin based on longest filename
     let maxLabelLength = 0;
-    state.data.frames.forEach((frame) => {
-      frame.files.forEach((f) => {
-        const name = formatFileName(f.file);
-        if (name.length > maxLabelLength) {
-          maxLabelLength = name.length;
+    if (isDeltaFormat()) {
+      // Every line count ever shown is in some frame's delta
+      state.data.frames.forEach((entry) => {
+        for (let i = 1; i < entry.lines.length; i += 2) {
+          if (entry.lines[i] > state.globalMaxLines) {
+            state.globalMaxLines = entry.lines[i];
+          }
         }
       });
-    });
+      state.data.fileTable.forEach((info) => {
+        maxLabelLength = Math.max(maxLabelLength, formatFileName(info.file).length);
+      });
+    } else {
+      state.data.frames.forEach((frame) => {
+        frame.files.forEach((f) => {
+          if (f.lines > state.globalMaxLines) {
+            state.globalMaxLines = f.lines;
+          }
+          const name = formatFileName(f.file);
+          if (name.length > maxLabelLength) {
+            maxLabelLength = name.length;
+          }
+        });
+      });
+    }
+    console.log('Global max lines:', state.globalMaxLines);
     
     // Dynamic layout calculation
     const charWidth = 7; // Average width per char
@@ -103,6 +115,83 @@ async function loadData() {
   }
 }
 
+// Frame access. Full-format frames are used as is; delta-format frames
+// (see encode_delta_frames in git_race_mining.py) are rebuilt on demand from
+// the nearest keyframe, or from the last decoded frame when playing forward.
+function isDeltaFormat() {
+  return state.data.config && state.data.config.frameFormat === 'delta';
+}
+
+function getFrame(frameIndex) {
+  const frames = state.data.frames;
+  if (!isDeltaFormat()) return frames[frameIndex];
+  if (frameIndex < 0 || frameIndex >= frames.length) return undefined;
+
+  const cache = state.frameCache;
+  if (cache.index === frameIndex) return cache.frame;
+
+  let start = frameIndex;
+  while (start > 0 && !frames[start].key) start--;
+  let active = new Map();
+  if (cache.index >= start && cache.index < frameIndex) {
+    active = new Map(cache.active);
+    start = cache.index + 1;
+  }
+  for (let i = start; i <= frameIndex; i++) {
+    applyFrameDelta(active, frames[i]);
+  }
+
+  const frame = decodeFrame(frames[frameIndex], active);
+  state.frameCache = { index: frameIndex, active, frame };
+  return frame;
+}
+
+function applyFrameDelta(active, entry) {
+  if (entry.key) active.clear();
+  (entry.gone || []).forEach((fileId) => active.delete(fileId));
+  for (let i = 0; i < entry.lines.length; i += 2) {
+    active.set(entry.lines[i], entry.lines[i + 1]);
+  }
+}
+
+function decodeFrame(entry, active) {
+  const { key, lines, gone, deleted, events, ...frame } = entry;
+  const fileEntry = (fileId, fileLines, status) => {
+    const info = state.data.fileTable[fileId];
+    const category = state.data.categories[info.category] || state.data.categories.other;
+    return {
+      file: info.file,
+      name: info.file.split('/').pop(),
+      lines: fileLines,
+      category: info.category,
+      color: category.color,
+      status,
+    };
+  };
+
+  const table = state.data.fileTable;
+  frame.files = [...active.entries()]
+    .sort((a, b) => b[1] - a[1] || (table[a[0]].file < table[b[0]].file ? -1 : 1))
+    .map(([fileId, fileLines]) => fileEntry(fileId, fileLines, 'active'))
+    .concat((deleted || []).map((fileId) => fileEntry(fileId, 0, 'deleted')));
+  if (events) frame.events = decodeFrameEvents(events);
+  return frame;
+}
+
+// Rank events are flat [type, id, rank, ...] runs; rank changes also carry the old rank
+function decodeFrameEvents(codes) {
+  const types = ['enter', 'exit', 'rank'];
+  const events = [];
+  for (let i = 0; i < codes.length; ) {
+    const event = { type: types[codes[i]], file: state.data.fileTable[codes[i + 1]].file };
+    if (event.type === 'rank') event.from = codes[i + 3];
+    event.rank = codes[i + 2];
+    events.push(event);
+    i += event.type === 'rank' ? 4 : 3;
+  }
+  return events;
+}
+
 function initSVG() {
   const container = document.getElementById('raceChart');
   const width = container.clientWidth;
@@ -154,6 +243,7 @@ function setupControls() {
     state.deletedFilesShown.clear();
     state.deletedFilesShown.clear();
     state.previousFiles.clear();
+    state.renderedFrame = -1;
     hideOverlays();
     renderFrame(state.currentFrame);
     updateSlider();
@@ -195,6 +285,7 @@ function setupControls() {
     state.currentFrame = 0;
     state.deletedFilesShown.clear();
     state.previousFiles.clear();
+    state.renderedFrame = -1;
     hideOverlays();
     renderFrame(0);
     updateSlider();
@@ -253,7 +344,7 @@ function animate() {
 
 
 function renderFrame(frameIndex) {
-  const frame = state.data.frames[frameIndex];
+  const frame = getFrame(frameIndex);
   if (!frame || !state.svg) return;
 
   // Update date
@@ -286,16 +377,22 @@ function renderFrame(frameIndex) {
       metricsValue.innerHTML = '';
   }
 
-  // Prepare data - sort by lines and take top N
-  const sortedFiles = [...frame.files]
+  // Prepare data - frames with rank events list their files in rank order
+  // already; older output is sorted by lines here
+  const rankedFiles = frame.events ? [...frame.files] : [...frame.files].sort((a, b) => b.lines - a.lines);
+  const sortedFiles = rankedFiles
     .filter((f) => f.lines > 0 || f.status === 'deleted')
-    .sort((a, b) => b.lines - a.lines)
     .slice(0, CONFIG.maxBars);
 
-  // Detect new files (not in previous frame)
+  // Detect new files: from the enter events when stepping to the next frame,
+  // otherwise by comparing with the files on screen
   const currentFileSet = new Set(sortedFiles.map((f) => f.file));
+  const entered =
+    frame.events && state.renderedFrame === frameIndex - 1
+      ? new Set(frame.events.filter((e) => e.type === 'enter').map((e) => e.file))
+      : null;
   sortedFiles.forEach((f) => {
-    f.isNew = !state.previousFiles.has(f.file);
+    f.isNew = entered && f.status === 'active' ? entered.has(f.file) : !state.previousFiles.has(f.file);
   });
 
   // Assign ranks
@@ -306,6 +403,7 @@ function renderFrame(frameIndex) {
 
   // Update previous files for next frame
   state.previousFiles = currentFileSet;
+  state.renderedFrame = frameIndex;
 }
 
 function renderBars(files) {
@@ -475,7 +573,7 @@ function updateSlider() {
 function updateStats() {
   if (!state.data) return;
 
-  const frame = state.data.frames[state.currentFrame];
+  const frame = getFrame(state.currentFrame);
   if (!frame) return;
 
   document.getElementById('totalFiles').textContent = frame.totalFiles;
@@ -491,7 +589,7 @@ function formatNumber(num) {
 }
 
 function checkMilestone() {
-  const frame = state.data.frames[state.currentFrame];
+  const frame = getFrame(state.currentFrame);
   const milestone = state.data.milestones.find((m) => m.date === frame.date);
 
   if (milestone) {
@@ -500,7 +598,7 @@ function checkMilestone() {
 }
 
 function checkDeletedFiles() {
-  const frame = state.data.frames[state.currentFrame];
+  const frame = getFrame(state.currentFrame);
 
   // Check if any file was just deleted
   state.data.graveyard.forEach((file) => {
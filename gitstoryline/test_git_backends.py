@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+GitStoryline Git Backend Parity Tests
+=====================================
+Checks that the pygit2 backend reads a repository exactly like the
+subprocess backend: log(), ls_tree(), read_blob() and ref_tips() are
+compared on a small generated repo with renames, a merged branch, a
+deleted file, a binary file and paths with spaces and non-ASCII
+characters. Skipped when pygit2 isn't installed.
+
+Usage:
+    python -m pytest test_git_backends.py
+    python -m unittest test_git_backends
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from git_backends import Pygit2Backend, SubprocessBackend, check_parity, pygit2, quote_path
+
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "Ada Lovelace",
+    "GIT_AUTHOR_EMAIL": "ada@example.com",
+    "GIT_COMMITTER_NAME": "Ada Lovelace",
+    "GIT_COMMITTER_EMAIL": "ada@example.com",
+}
+
+
+def make_repo(path):
+    """A small history covering the cases the backends parse differently."""
+    day = 0
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=path, env=env, check=True, capture_output=True)
+
+    def write(name, text):
+        file = path / name
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_bytes(text if isinstance(text, bytes) else text.encode())
+
+    def commit(message):
+        nonlocal day
+        day += 1
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"2024-01-{day:02d}T10:00:00+02:00"
+        git("add", "-A")
+        git("commit", "-q", "-m", message)
+
+    env = {**os.environ, **GIT_IDENTITY}
+    git("init", "-q", "-b", "main")
+    write("index.html", "<html>\n" * 40)
+    write("js/app.js", "".join(f"line {i}\n" for i in range(60)))
+    write("docs/read me.md", "spaces\n")
+    commit("feat: initial layout")
+
+    write("js/naïve/café.js", "accents\n" * 3)
+    write("docs/日本語.md", "non-ascii\n")
+    write("assets/logo.png", bytes(range(256)))
+    commit("feat: add files with accents, CJK and binary content")
+
+    git("mv", "js/app.js", "js/main.js")
+    write("js/main.js", "".join(f"line {i}\n" for i in range(62)))
+    commit("refactor: rename app.js to main.js")
+
+    git("checkout", "-q", "-b", "feature")
+    git("mv", "docs/read me.md", "docs/read me too.md")
+    write("js/services/data service.js", "service\n" * 5)
+    commit("feat: add a service on a branch")
+    git("checkout", "-q", "main")
+    write("index.html", "<html>\n" * 30)
+    git("rm", "-q", "docs/日本語.md")
+    commit("fix: shrink index.html and drop a doc")
+    env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = "2024-01-10T10:00:00+02:00"
+    git("merge", "-q", "--no-ff", "-m", "Merge branch 'feature'", "feature")
+
+    write("js/naïve/café.js", "accents\n" * 5)
+    commit("chore: touch café.js")
+    git("tag", "v1")
+
+
+@unittest.skipIf(pygit2 is None, "pygit2 is not installed")
+class Pygit2ParityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.repo = Path(tempfile.mkdtemp(prefix="gitstoryline-backends-"))
+        make_repo(cls.repo)
+        cls.reference = SubprocessBackend(cls.repo)
+        cls.candidate = Pygit2Backend(cls.repo)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.reference.close()
+        cls.candidate.close()
+        shutil.rmtree(cls.repo, ignore_errors=True)
+
+    def test_ref_tips(self):
+        self.assertEqual(self.candidate.ref_tips(), self.reference.ref_tips())
+        self.assertEqual(self.candidate.head(), self.reference.head())
+
+    def test_log(self):
+        expected = list(self.reference.log())
+        self.assertEqual(len(expected), 7)
+        self.assertEqual(list(self.candidate.log()), expected)
+
+    def test_log_covers_renames_merges_and_unusual_paths(self):
+        changes = [change for _, commit_changes in self.reference.log() for change in commit_changes]
+        statuses = {change[1] for change in changes}
+        paths = {change[3] for change in changes}
+        self.assertTrue({"A", "M", "D", "R"} <= statuses)
+        # Like the git CLI, both backends keep non-ASCII paths in git's quoted form
+        unusual = {quote_path("js/naïve/café.js"), quote_path("docs/日本語.md"), "docs/read me too.md"}
+        self.assertTrue(unusual <= paths)
+        self.assertTrue(any(commit["is_merge"] for commit, _ in self.reference.log()))
+
+    def test_log_exclude(self):
+        # Everything after the rename on main: the branch, its merge and the last commit
+        rename = next(commit["hash"] for commit, _ in self.reference.log() if commit["subject"].startswith("refactor"))
+        expected = list(self.reference.log(exclude=[rename]))
+        self.assertEqual(len(expected), 4)
+        self.assertEqual(list(self.candidate.log(exclude=[rename])), expected)
+
+    def test_ls_tree(self):
+        self.assertEqual(list(self.candidate.ls_tree("HEAD")), list(self.reference.ls_tree("HEAD")))
+
+    def test_read_blob(self):
+        for _, blob_id in self.reference.ls_tree("HEAD"):
+            self.assertEqual(self.candidate.read_blob(blob_id), self.reference.read_blob(blob_id))
+
+    def test_check_parity(self):
+        self.assertEqual(check_parity(self.repo, ["pygit2"]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
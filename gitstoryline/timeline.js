@@ -15,8 +15,13 @@ const state = {
   currentTimelineIndex: 0,
   filteredTypes: new Set(['feature', 'fix', 'refactor', 'other', 'docs', 'test', 'merge']),
   theme: 'light',
+  shards: null, // Sharded output: { list, loaded, loading } (see loadShard)
+  evolutionData: null, // Promise for the race data used by the evolution view
 };
 
+// Timeline commits to keep loaded beyond the slider position (sharded output)
+const SHARD_PREFETCH_COMMITS = 50;
+
 // Initialization
 document.addEventListener('DOMContentLoaded', init);
 
@@ -31,39 +36,22 @@ async function init() {
 // Data Loading
 async function loadData() {
   try {
-    const [timelineRes, raceRes] = await Promise.all([
-        fetch('timeline_data.json'),
-        fetch('race_data.json')
-    ]);
-
-    const timelineData = await timelineRes.json();
-    const raceData = await raceRes.json();
-    
-    // Merge Race Data (Frames) into State
-    state.data = {
-        ...timelineData,
-        frames: raceData.frames
-    };
-
-    // Construct Deleted Files List from Frames
-    const deletedFilesMap = new Map();
-    if (state.data.frames) {
-        state.data.frames.forEach(frame => {
-            if (frame.files) {
-                frame.files.forEach(f => {
-                    if (f.status === 'deleted') {
-                        deletedFilesMap.set(f.file, {
-                            file: f.file,
-                            deleted: frame.date,
-                            created: 'Unknown', // Could derive if we scanned creation events
-                            category: f.category
-                        });
-                    }
-                });
-            }
-        });
+    // Prefer the sharded layout (manifest + monthly shards) when it was generated
+    const manifestRes = await fetch('timeline/manifest.json');
+    if (manifestRes.ok) {
+        const manifest = await manifestRes.json();
+        state.data = {
+            ...manifest,
+            commits: [],
+            fileCreationTimeline: [],
+            fileEvolution: {}
+        };
+        state.shards = { list: manifest.shards, loaded: [], loading: Promise.resolve() };
+        await loadShardsThrough(manifest.shards.length ? manifest.shards[0].month : '');
+    } else {
+        const timelineRes = await fetch('timeline_data.json');
+        state.data = decodeTimelineData(await timelineRes.json());
     }
-    state.data.deletedFiles = Array.from(deletedFilesMap.values());
 
     console.log('Data loaded:', state.data);
 
@@ -71,7 +59,6 @@ async function loadData() {
     renderStats();
     renderPhases();
     renderCurrentView();
-    populateFileSelect();
     
     setupTimelineControls();
     setupTreeControls();
@@ -88,7 +75,179 @@ async function loadData() {
 
 function processData() {
     state.data.commits.forEach(commit => {
-        commit.lane = assignLane(commit);
+        if (!commit.lane) commit.lane = assignLane(commit);
+    });
+}
+
+// Expand interned output (see intern_output in git_timeline_mining.py)
+function decodeTimelineData(data) {
+    if (data.format !== 'interned') return data;
+    const { format, strings, ...decoded } = data;
+    const { paths, authors, types } = strings;
+    const sum = (values) => values.reduce((total, value) => total + value, 0);
+
+    decoded.commits = data.commits.map(commit => ({
+        hash: commit.hash,
+        date: commit.date,
+        author: authors[commit.author],
+        message: commit.message,
+        type: types[commit.type],
+        files: commit.files.path.map((path, i) => ({
+            file: paths[path],
+            insertions: commit.files.insertions[i],
+            deletions: commit.files.deletions[i]
+        })),
+        filesChanged: commit.files.path.length,
+        insertions: sum(commit.files.insertions),
+        deletions: sum(commit.files.deletions)
+    }));
+
+    const events = data.fileCreationTimeline;
+    decoded.fileCreationTimeline = events.file.map((path, i) => ({
+        type: types[events.type[i]],
+        file: paths[path],
+        date: decoded.commits[events.commit[i]].date,
+        hash: decoded.commits[events.commit[i]].hash
+    }));
+
+    decoded.fileEvolution = {};
+    Object.entries(data.fileEvolution).forEach(([file, history]) => {
+        decoded.fileEvolution[file] = history.commit.map((index, i) => ({
+            hash: decoded.commits[index].hash,
+            date: decoded.commits[index].date,
+            message: decoded.commits[index].message,
+            lines: history.lines[i]
+        }));
+    });
+    return decoded;
+}
+
+// Sharded Output
+// Shards are always loaded oldest first, so the loaded commits are a
+// chronological prefix of the history that the timeline can draw as is.
+async function fetchShard(shard) {
+    const response = await fetch(`timeline/${shard.file}`);
+    const bytes = new Uint8Array(await response.arrayBuffer());
+    // Servers that add Content-Encoding: gzip hand over the JSON already inflated
+    if (bytes[0] !== 0x1f || bytes[1] !== 0x8b) {
+        return JSON.parse(new TextDecoder().decode(bytes));
+    }
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    return new Response(stream).json();
+}
+
+function loadShard() {
+    const shards = state.shards;
+    shards.loading = shards.loading.then(async () => {
+        const next = shards.list[shards.loaded.length];
+        if (!next) return;
+        shards.loaded.push(await fetchShard(next));
+
+        // Output order is newest first; shards are oldest first
+        const newestFirst = shards.loaded.slice().reverse();
+        state.data.commits = newestFirst.flatMap(shard => shard.commits);
+        state.data.fileCreationTimeline = newestFirst.flatMap(shard => shard.fileCreationTimeline);
+        const evolution = {};
+        newestFirst.forEach(shard => {
+            Object.entries(shard.fileEvolution).forEach(([file, entries]) => {
+                evolution[file] = (evolution[file] || []).concat(entries);
+            });
+        });
+        state.data.fileEvolution = evolution;
+        processData();
+    });
+    return shards.loading;
+}
+
+async function loadShardsThrough(month) {
+    if (!state.shards) return;
+    const shards = state.shards;
+    while (shards.loaded.length < shards.list.length && shards.list[shards.loaded.length].month <= month) {
+        await loadShard();
+    }
+}
+
+function loadAllShards() {
+    return loadShardsThrough('9999-99');
+}
+
+function totalCommitCount() {
+    return state.shards ? state.data.summary.totalCommits : state.data.commits.length;
+}
+
+// nth commit in chronological order, if loaded
+function chronologicalCommit(index) {
+    return state.data.commits[state.data.commits.length - 1 - index];
+}
+
+// Fetch the next shard when the slider gets near the end of the loaded commits
+function requestTimelineShards(loadedCount) {
+    const shards = state.shards;
+    if (!shards || shards.busy || shards.loaded.length >= shards.list.length) return;
+    if (loadedCount > state.currentTimelineIndex + SHARD_PREFETCH_COMMITS) return;
+    shards.busy = true;
+    loadShard().then(() => {
+        shards.busy = false;
+        document.getElementById('timelineSlider').max = totalCommitCount() - 1;
+        if (state.currentView === 'timeline') renderTimeline();
+    });
+}
+
+// Race frames and deleted files for the evolution view, fetched on first use
+function loadEvolutionData() {
+    if (!state.evolutionData) {
+        state.evolutionData = (async () => {
+            const [raceData] = await Promise.all([
+                fetch('race_data.json').then(res => res.json()),
+                loadAllShards()
+            ]);
+            state.data.frames = decodeRaceFrames(raceData);
+
+            // Construct Deleted Files List from Frames
+            const deletedFilesMap = new Map();
+            state.data.frames.forEach(frame => {
+                if (frame.files) {
+                    frame.files.forEach(f => {
+                        if (f.status === 'deleted') {
+                            deletedFilesMap.set(f.file, {
+                                file: f.file,
+                                deleted: frame.date,
+                                created: 'Unknown', // Could derive if we scanned creation events
+                                category: f.category
+                            });
+                        }
+                    });
+                }
+            });
+            state.data.deletedFiles = Array.from(deletedFilesMap.values());
+            populateFileSelect();
+        })();
+    }
+    return state.evolutionData;
+}
+
+// Expand delta-encoded race frames (see encode_delta_frames in git_race_mining.py)
+function decodeRaceFrames(raceData) {
+    if (!raceData.config || raceData.config.frameFormat !== 'delta') {
+        return raceData.frames;
+    }
+    const active = new Map();
+    const fileEntry = (fileId, lines, status) => {
+        const info = raceData.fileTable[fileId];
+        return { file: info.file, name: info.file.split('/').pop(), lines, category: info.category, status };
+    };
+    // Rank events are not used by the timeline
+    return raceData.frames.map(({ key, lines, gone, deleted, events, ...frame }) => {
+        if (key) active.clear();
+        (gone || []).forEach(fileId => active.delete(fileId));
+        for (let i = 0; i < lines.length; i += 2) {
+            active.set(lines[i], lines[i + 1]);
+        }
+        frame.files = [...active.entries()]
+            .sort((a, b) => b[1] - a[1] || (raceData.fileTable[a[0]].file < raceData.fileTable[b[0]].file ? -1 : 1))
+            .map(([fileId, fileLines]) => fileEntry(fileId, fileLines, 'active'))
+            .concat((deleted || []).map(fileId => fileEntry(fileId, 0, 'deleted')));
+        return frame;
     });
 }
 
@@ -199,7 +358,11 @@ function switchView(view) {
   }
 
   // Trigger resize for charts
-  setTimeout(() => renderCurrentView(), 50);
+  if (view === 'evolution') {
+      loadEvolutionData().then(() => renderCurrentView());
+  } else {
+      setTimeout(() => renderCurrentView(), 50);
+  }
 }
 
 function renderCurrentView() {
@@ -281,7 +444,7 @@ function setupNarrativeOverlay() {
   });
 }
 
-function showPhaseNarrative(index) {
+async function showPhaseNarrative(index) {
   const phase = state.data.architecturePhases[index];
   const overlay = document.getElementById('narrativeOverlay');
 
@@ -294,6 +457,11 @@ function showPhaseNarrative(index) {
   const startDate = new Date(phase.startDate);
   const nextPhase = state.data.architecturePhases[index + 1];
   const endDate = nextPhase ? new Date(nextPhase.startDate) : new Date();
+  if (nextPhase) {
+    await loadShardsThrough(nextPhase.startDate.slice(0, 7));
+  } else {
+    await loadAllShards();
+  }
 
   const phaseCommits = state.data.commits.filter((c) => {
     const d = new Date(c.date);
@@ -316,6 +484,17 @@ function showPhaseNarrative(index) {
         </div>
     `;
 
+  // Most churned directory of the phase; its hottest files show on hover
+  const hotspot = phase.hotspots?.directories?.[0];
+  if (hotspot) {
+    const stat = document.createElement('div');
+    stat.className = 'narrative-stat';
+    stat.title = phase.hotspots.files.map((f) => `${f.file} (${f.commits} commits)`).join('\n');
+    stat.innerHTML = '<div class="narrative-stat-value"></div><div class="narrative-stat-label">Hotspot</div>';
+    stat.firstChild.textContent = `${hotspot.directory}/`;
+    statsContainer.appendChild(stat);
+  }
+
   // Highlight phase in sidebar
   document.querySelectorAll('.phase-item').forEach((p, i) => {
     p.classList.toggle('active', i === index);
@@ -336,7 +515,7 @@ function setupTimelineControls() {
     state.animationSpeed = e.target.value;
   });
 
-  slider.max = state.data.commits.length - 1;
+  slider.max = totalCommitCount() - 1;
   slider.value = slider.max;
   slider.addEventListener('input', (e) => {
     state.currentTimelineIndex = parseInt(e.target.value);
@@ -369,7 +548,7 @@ function animateTimeline() {
   if (!state.isPlaying) return;
 
   const slider = document.getElementById('timelineSlider');
-  const maxIndex = state.data.commits.length - 1;
+  const maxIndex = totalCommitCount() - 1;
 
   if (state.currentTimelineIndex < maxIndex) {
     state.currentTimelineIndex++;
@@ -378,16 +557,18 @@ function animateTimeline() {
 
     // Determine delay based on speed mode
     let delay = 50;
-    if (state.animationSpeed === 'realtime') {
+    const commit = chronologicalCommit(state.currentTimelineIndex);
+    if (!commit) {
+      delay = 200; // Waiting for the next shard
+    } else if (state.animationSpeed === 'realtime') {
       // Proportional to actual time between commits
-      const current = new Date(state.data.commits[maxIndex - state.currentTimelineIndex].date);
-      const next = state.data.commits[maxIndex - state.currentTimelineIndex - 1];
+      const current = new Date(commit.date);
+      const next = chronologicalCommit(state.currentTimelineIndex + 1);
       if (next) {
         const diff = new Date(next.date) - current;
         delay = Math.min(Math.max((diff / 86400000) * 100, 30), 1000); // Scale days to ms
       }
     } else if (state.animationSpeed === 'milestone') {
-      const commit = state.data.commits[maxIndex - state.currentTimelineIndex];
       if (commit.type === 'feature' || commit.message.toLowerCase().includes('major')) {
         delay = 500;
       }
@@ -407,6 +588,7 @@ function renderTimeline() {
   // Filter by types
   const filteredCommits = commits.filter((c) => state.filteredTypes.has(c.type));
   const visibleCommits = filteredCommits.slice(0, state.currentTimelineIndex + 1);
+  requestTimelineShards(filteredCommits.length);
 
   // Clear and set up SVG
   container.innerHTML = '';
@@ -416,8 +598,10 @@ function renderTimeline() {
 
   const svg = d3.select(container).append('svg').attr('width', width).attr('height', height);
 
-  // Time scale
-  const timeExtent = d3.extent(filteredCommits, (d) => new Date(d.date));
+  // Time scale (fixed to the whole history when shards are still loading)
+  const timeExtent = state.shards
+    ? [new Date(state.data.summary.dateRange.start), new Date(state.data.summary.dateRange.end)]
+    : d3.extent(filteredCommits, (d) => new Date(d.date));
   const xScale = d3
     .scaleTime()
     .domain(timeExtent)
@@ -870,13 +1054,14 @@ function renderFileTree(customTreeData = null, newPaths = []) {
   return nodeEnter;
 }
 
-function showFileNodeDetails(node) {
+async function showFileNodeDetails(node) {
     const container = document.getElementById('detailsContent');
     const isDir = !!node.children;
     const path = node.data.path;
     const name = node.data.name;
     
     let createdDate = 'Unknown';
+    await loadAllShards();
     if (state.data.fileCreationTimeline) {
         const event = state.data.fileCreationTimeline.find(e => e.file === path || e.file.endsWith('/'+name));
         if (event) {
@@ -936,7 +1121,8 @@ function setupTreeControls() {
     }
 }
 
-function animateTreeGrowth(dateDisplay) {
+async function animateTreeGrowth(dateDisplay) {
+    await loadAllShards();
     if (!state.data.fileCreationTimeline) {
         console.error("No file creation timeline found");
         return;
@@ -1544,12 +1730,18 @@ function renderEvolution(filePath) {
     .attr('x', width / 2)
     .attr('y', margin.top / 2)
     .attr('text-anchor', 'middle')
-    .text(`Evolution of ${filePath}`)
+    .text(`Evolution of ${filePath}${formerPathsNote(filePath)}`)
     .style('font-size', '14px')
     .style('font-weight', '600')
     .style('fill', 'var(--text-primary)');
 }
 
+// "(formerly a, b)" for files that were renamed (see git_file_lineage.py)
+function formerPathsNote(filePath) {
+  const former = state.data.fileLineage && state.data.fileLineage[filePath];
+  return former && former.length ? ` (formerly ${former.join(', ')})` : '';
+}
+
 // Resize handler
 window.addEventListener('resize', () => {
   if (state.data) {